@@ -0,0 +1,175 @@
+"""Admission control for sync writes.
+
+SQLite has a single writer, so letting every reconnecting client hit it at once
+only turns into lock waits and ``database is locked`` errors. Writes instead
+take one of a few slots; excess requests wait briefly in a per-device
+round-robin queue and are shed with ``503`` + ``Retry-After`` once their
+deadline passes, which the client's persisted backoff honours.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request
+
+from api.settings import scoped_state
+
+
+MAX_RETRY_AFTER_S = 60
+
+
+@dataclass
+class AdmissionStats:
+    admitted: int = 0
+    queued: int = 0
+    shed_queue_full: int = 0
+    shed_device_busy: int = 0
+    shed_timeout: int = 0
+
+
+class AdmissionController:
+    """Caps concurrent writes and queues the overflow fairly across devices.
+
+    Each device holds at most one slot and may have ``max_queued_per_device``
+    requests waiting; freed slots are handed to waiting devices in round-robin
+    order, so one device draining a huge outbox cannot starve the others. Must
+    be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 1,
+        max_queued: int = 64,
+        max_queued_per_device: int = 1,
+        queue_timeout_s: float = 2.0,
+        retry_after_s: int = 2,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_queued_per_device = max_queued_per_device
+        self.queue_timeout_s = queue_timeout_s
+        self.retry_after_s = retry_after_s
+        self._active = 0
+        self._active_devices: Counter[str] = Counter()
+        self._waiters: OrderedDict[str, deque[asyncio.Future[None]]] = OrderedDict()
+        self._queued = 0
+        self._stats = AdmissionStats()
+
+    @asynccontextmanager
+    async def write_slot(self, device_id: str) -> AsyncIterator[None]:
+        await self.acquire(device_id)
+        try:
+            yield
+        finally:
+            self.release(device_id)
+
+    async def acquire(self, device_id: str) -> None:
+        if self._can_admit(device_id) and not self._queued:
+            self._admit(device_id)
+            return
+
+        waiting = self._waiters.get(device_id)
+        if waiting is not None and len(waiting) >= self.max_queued_per_device:
+            self._stats.shed_device_busy += 1
+            raise self._overloaded()
+        if self._queued >= self.max_queued:
+            self._stats.shed_queue_full += 1
+            raise self._overloaded()
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(device_id, deque()).append(future)
+        self._queued += 1
+        self._stats.queued += 1
+        # A slot may be free while every queued device is already busy.
+        self._grant_next()
+        if future.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout_s)
+        except BaseException as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up; pass it on.
+                self.release(device_id)
+            else:
+                future.cancel()
+                self._forget(device_id, future)
+            if isinstance(exc, asyncio.TimeoutError):
+                self._stats.shed_timeout += 1
+                raise self._overloaded()
+            raise
+
+    def release(self, device_id: str) -> None:
+        self._active -= 1
+        self._active_devices[device_id] -= 1
+        if self._active_devices[device_id] <= 0:
+            del self._active_devices[device_id]
+        if device_id in self._waiters:
+            # Let other devices go first before this one writes again.
+            self._waiters.move_to_end(device_id)
+        self._grant_next()
+
+    @property
+    def idle(self) -> bool:
+        """No write holds or waits for a slot; background work may use the DB."""
+        return self._active == 0 and self._queued == 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **asdict(self._stats),
+            "active": self._active,
+            "waiting": self._queued,
+        }
+
+    def retry_after(self) -> int:
+        backlog = self._queued / max(self.max_concurrent, 1)
+        return min(MAX_RETRY_AFTER_S, math.ceil(self.retry_after_s * (1 + backlog)))
+
+    def _can_admit(self, device_id: str) -> bool:
+        return self._active < self.max_concurrent and not self._active_devices.get(
+            device_id
+        )
+
+    def _admit(self, device_id: str) -> None:
+        self._active += 1
+        self._active_devices[device_id] += 1
+        self._stats.admitted += 1
+
+    def _grant_next(self) -> None:
+        for device_id in list(self._waiters):
+            if not self._can_admit(device_id):
+                continue
+            waiting = self._waiters.pop(device_id)
+            future = waiting.popleft()
+            self._queued -= 1
+            if waiting:
+                # Re-queue the device behind everyone else who is waiting.
+                self._waiters[device_id] = waiting
+            self._admit(device_id)
+            future.set_result(None)
+            return
+
+    def _forget(self, device_id: str, future: asyncio.Future[None]) -> None:
+        waiting = self._waiters.get(device_id)
+        if waiting is None or future not in waiting:
+            return
+        waiting.remove(future)
+        self._queued -= 1
+        if not waiting:
+            del self._waiters[device_id]
+
+    def _overloaded(self) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="Server busy, retry later",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+
+def get_admission(request: Request) -> AdmissionController:
+    return scoped_state(request).admission
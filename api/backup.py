@@ -0,0 +1,205 @@
+"""Online SQLite snapshots through the backup API, plus the matching restore.
+
+Copying ``wildlings.db`` while the server runs can tear the copy or miss pages
+that still live in the ``-wal`` file. ``backup_database`` instead copies pages
+with ``sqlite3.Connection.backup`` a few at a time (sleeping between steps, so
+the source is never locked for long), checks the copy with
+``PRAGMA integrity_check``, gzips it next to earlier snapshots and prunes the
+oldest. A write from another connection makes SQLite restart an incremental
+backup; after ``max_restarts`` the remaining copy is done in one step, which in
+WAL mode only holds a read transaction and so still does not block writers.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from api.time import utc_now
+
+
+SNAPSHOT_PREFIX = "wildlings-"
+SNAPSHOT_SUFFIX = ".db.gz"
+DEFAULT_PAGES_PER_STEP = 256
+DEFAULT_STEP_SLEEP_S = 0.005
+DEFAULT_MAX_RESTARTS = 3
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_backup_lock = threading.Lock()
+
+
+class BackupError(RuntimeError):
+    pass
+
+
+class BackupInProgressError(BackupError):
+    pass
+
+
+@dataclass
+class BackupResult:
+    path: str
+    database_bytes: int
+    compressed_bytes: int
+    sha256: str
+    duration_ms: float
+    restarts: int
+    pruned: list[str] = field(default_factory=list)
+
+
+def _verify(path: Path) -> None:
+    connection = sqlite3.connect(path)
+    try:
+        result = connection.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        connection.close()
+    if result != "ok":
+        raise BackupError(f"integrity_check failed for {path}: {result}")
+
+
+def _copy_pages(
+    source: sqlite3.Connection,
+    target: sqlite3.Connection,
+    pages_per_step: int,
+    step_sleep_s: float,
+    max_restarts: int,
+) -> int:
+    restarts = 0
+    last_remaining: Optional[int] = None
+
+    class _Restarted(Exception):
+        pass
+
+    def progress(_status: int, remaining: int, _total: int) -> None:
+        nonlocal last_remaining, restarts
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _Restarted
+        last_remaining = remaining
+        # ``backup(sleep=...)`` only sleeps after SQLITE_BUSY; pause between
+        # every step so writers get the database in between.
+        if remaining:
+            time.sleep(step_sleep_s)
+
+    try:
+        source.backup(target, pages=pages_per_step, progress=progress)
+    except _Restarted:
+        source.backup(target, pages=-1)
+    return restarts
+
+
+def snapshots(directory: Path) -> list[Path]:
+    """Existing snapshots, oldest first (names sort by their UTC timestamp)."""
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob(f"{SNAPSHOT_PREFIX}*{SNAPSHOT_SUFFIX}"))
+
+
+def backup_database(
+    database_path: str,
+    directory: Path,
+    keep: int = 7,
+    pages_per_step: int = DEFAULT_PAGES_PER_STEP,
+    step_sleep_s: float = DEFAULT_STEP_SLEEP_S,
+    max_restarts: int = DEFAULT_MAX_RESTARTS,
+) -> BackupResult:
+    """Write a verified, gzipped snapshot of ``database_path`` into ``directory``."""
+    if not _backup_lock.acquire(blocking=False):
+        raise BackupInProgressError("A backup is already running")
+    try:
+        started = time.perf_counter()
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = utc_now().strftime("%Y%m%dT%H%M%S%fZ")
+        final = directory / f"{SNAPSHOT_PREFIX}{stamp}{SNAPSHOT_SUFFIX}"
+        raw = directory / f".{final.name}.db.partial"
+        packed = directory / f".{final.name}.partial"
+        try:
+            source = sqlite3.connect(database_path)
+            target = sqlite3.connect(raw)
+            try:
+                restarts = _copy_pages(
+                    source, target, pages_per_step, step_sleep_s, max_restarts
+                )
+                # A standalone file: no -wal sidecar needed to open the snapshot.
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+                source.close()
+            _verify(raw)
+
+            digest = hashlib.sha256()
+            with raw.open("rb") as plain, packed.open("wb") as handle:
+                with gzip.GzipFile(fileobj=handle, mode="wb", mtime=0) as zipped:
+                    while chunk := plain.read(COPY_CHUNK_SIZE):
+                        zipped.write(chunk)
+                handle.flush()
+                os.fsync(handle.fileno())
+            with packed.open("rb") as handle:
+                while chunk := handle.read(COPY_CHUNK_SIZE):
+                    digest.update(chunk)
+            database_bytes = raw.stat().st_size
+            os.replace(packed, final)
+        finally:
+            raw.unlink(missing_ok=True)
+            packed.unlink(missing_ok=True)
+
+        pruned = []
+        existing = snapshots(directory)
+        for old in existing[: max(len(existing) - keep, 0)]:
+            old.unlink(missing_ok=True)
+            pruned.append(old.name)
+
+        return BackupResult(
+            path=str(final),
+            database_bytes=database_bytes,
+            compressed_bytes=final.stat().st_size,
+            sha256=digest.hexdigest(),
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            restarts=restarts,
+            pruned=pruned,
+        )
+    finally:
+        _backup_lock.release()
+
+
+def restore_database(snapshot: Path, database_path: str) -> Optional[Path]:
+    """Replace ``database_path`` with a verified snapshot; run with the server stopped.
+
+    The current file, if any, is kept as ``<db>.pre-restore``; its path is
+    returned. Stale ``-wal``/``-shm`` files are removed so SQLite cannot replay
+    them onto the restored pages.
+    """
+    target = Path(database_path)
+    staged = target.with_name(f".{target.name}.restore")
+    try:
+        with gzip.open(snapshot, "rb") as zipped, staged.open("wb") as handle:
+            shutil.copyfileobj(zipped, handle, COPY_CHUNK_SIZE)
+            handle.flush()
+            os.fsync(handle.fileno())
+        _verify(staged)
+
+        previous = None
+        if target.exists():
+            # Fold the WAL into the file first so the kept copy is complete.
+            current = sqlite3.connect(target)
+            try:
+                current.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                current.close()
+            previous = target.with_name(f"{target.name}.pre-restore")
+            os.replace(target, previous)
+        for suffix in ("-wal", "-shm"):
+            Path(f"{database_path}{suffix}").unlink(missing_ok=True)
+        os.replace(staged, target)
+        return previous
+    finally:
+        staged.unlink(missing_ok=True)
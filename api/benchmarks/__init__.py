@@ -0,0 +1 @@
+"""Ad-hoc performance benchmarks; not part of the test suite."""
@@ -0,0 +1,125 @@
+"""Compare a sequential initial pull with the partitioned bootstrap.
+
+Usage (from the repo root)::
+
+    python -m api.benchmarks.bootstrap --logs 20000 --partitions 1 4 8 --latency-ms 80
+
+A fresh SQLite database is seeded with ``--logs`` rows and the app is driven
+in-process; every request is delayed by ``--latency-ms`` to stand in for the
+network round trip a phone pays on first sync. ``1`` partition is the existing
+cursor loop; higher counts fetch ``GET /sync/pull/plan`` ranges concurrently.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+from sqlmodel import Session, SQLModel
+
+from api.models import Log
+
+PAGE_SIZE = 1000
+
+
+class DelayedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, latency_s: float):
+        self.inner = inner
+        self.latency_s = latency_s
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.latency_s)
+        return await self.inner.handle_async_request(request)
+
+
+def seed(engine, count: int) -> None:
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with Session(engine) as session:
+        for index in range(count):
+            session.add(
+                Log(
+                    id=f"log-{index:07d}",
+                    start_at=base,
+                    note="Benchmark",
+                    updated_at_server=base + timedelta(milliseconds=index),
+                )
+            )
+        session.commit()
+
+
+async def pull_range(
+    client: httpx.AsyncClient, cursor: str | None, until: str | None
+) -> int:
+    pulled = 0
+    while True:
+        params: dict[str, str | int] = {"limit": PAGE_SIZE}
+        if cursor:
+            params["cursor"] = cursor
+        if until:
+            params["until"] = until
+        data = (await client.get("/sync/pull", params=params)).json()
+        logs = data["changes"]["logs"]
+        if not logs:
+            return pulled
+        pulled += len(logs)
+        cursor = data["next_cursor"]
+
+
+async def bootstrap(client: httpx.AsyncClient, partitions: int) -> int:
+    if partitions <= 1:
+        return await pull_range(client, None, None)
+    plan = (
+        await client.get("/sync/pull/plan", params={"partitions": partitions})
+    ).json()
+    counts = await asyncio.gather(
+        *(
+            pull_range(client, partition["cursor"], partition["until"])
+            for partition in plan["partitions"]
+        )
+    )
+    return sum(counts)
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        os.environ["PULL_CACHE_MAX_ENTRIES"] = "0"
+        from api.db import dispose_engine, get_engine
+        from api.main import create_app
+
+        engine = get_engine()
+        SQLModel.metadata.create_all(engine)
+        seed(engine, args.logs)
+
+        app = create_app()
+        transport = DelayedTransport(
+            httpx.ASGITransport(app=app), args.latency_ms / 1000
+        )
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            print(f"{'partitions':>10} {'pulled':>8} {'seconds':>8}")
+            for partitions in args.partitions:
+                started = time.perf_counter()
+                pulled = await bootstrap(client, partitions)
+                elapsed = time.perf_counter() - started
+                print(f"{partitions:>10} {pulled:>8} {elapsed:>8.2f}")
+        dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=20000)
+    parser.add_argument("--partitions", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
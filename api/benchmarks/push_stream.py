@@ -0,0 +1,122 @@
+"""Compare one buffered ``/sync/push`` with the chunked ``/sync/push/stream``.
+
+Usage (from the repo root)::
+
+    python -m api.benchmarks.push_stream --ops 20000 --chunk-ops 1000
+
+Both modes push ``--ops`` fresh upserts from one device into a fresh SQLite
+database, with the app driven in-process. Both bodies are encoded before the
+clock starts. The buffered push hands over one JSON document. The streamed
+push feeds its NDJSON body in 64 KiB pieces, as a socket read would. Peak
+memory is the ``tracemalloc`` high-water mark over the request, taken on a
+separate run so that tracing does not skew the timings. Both modes also count
+the applied-op cache, which grows up to ``APPLIED_OP_CACHE_ENTRIES`` ids, and
+the ack body, which the in-process transport buffers in full.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import httpx
+from sqlmodel import SQLModel
+
+from api.benchmarks.workers import push_body
+
+READ_SIZE = 64 * 1024
+
+
+def buffered_body(payload: dict) -> bytes:
+    return json.dumps(payload).encode()
+
+
+def streamed_body(payload: dict) -> list[bytes]:
+    header = {key: payload[key] for key in ("device_id", "client_time")}
+    body = b"".join(
+        json.dumps(line).encode() + b"\n" for line in [header, *payload["ops"]]
+    )
+    return [body[start : start + READ_SIZE] for start in range(0, len(body), READ_SIZE)]
+
+
+async def push_buffered(client: httpx.AsyncClient, body: bytes) -> int:
+    response = await client.post(
+        "/sync/push", content=body, headers={"Content-Type": "application/json"}
+    )
+    return len(response.json()["ack_op_ids"])
+
+
+async def push_streamed(client: httpx.AsyncClient, body: list[bytes]) -> int:
+    async def reads() -> AsyncIterator[bytes]:
+        for piece in body:
+            yield piece
+
+    response = await client.post(
+        "/sync/push/stream",
+        content=reads(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    return json.loads(response.text.splitlines()[-1])["acked"]
+
+
+MODES: dict[str, tuple[Callable[[dict], Any], Callable[..., Awaitable[int]]]] = {
+    "buffered": (buffered_body, push_buffered),
+    "streamed": (streamed_body, push_streamed),
+}
+
+
+async def measure(
+    client: httpx.AsyncClient, mode: str, ops: int
+) -> tuple[int, float, float]:
+    encode, push = MODES[mode]
+    body = encode(push_body(ops))
+    started = time.perf_counter()
+    acked = await push(client, body)
+    elapsed = time.perf_counter() - started
+
+    body = encode(push_body(ops))
+    tracemalloc.start()
+    try:
+        await push(client, body)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return acked, elapsed, peak / 1024 / 1024
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        os.environ["SYNC_STREAM_CHUNK_OPS"] = str(args.chunk_ops)
+        from api.db import dispose_engine, get_engine
+        from api.main import create_app
+
+        SQLModel.metadata.create_all(get_engine())
+        app = create_app()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            print(f"{'mode':>9} {'acked':>7} {'seconds':>8} {'peak MiB':>9}")
+            for mode in MODES:
+                acked, elapsed, peak = await measure(client, mode, args.ops)
+                print(f"{mode:>9} {acked:>7} {elapsed:>8.2f} {peak:>9.1f}")
+        dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--chunk-ops", type=int, default=1000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
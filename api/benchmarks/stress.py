@@ -0,0 +1,398 @@
+"""Hammer one SQLite file with concurrent pushes and pulls and check sync semantics.
+
+Usage (from the repo root)::
+
+    python -m api.benchmarks.stress --workers 2 --devices 16 --rounds 40
+
+Each worker is a separate app instance with its own engine, admission queue
+and pull cache. Like uvicorn workers, they share the database file and the
+data-version file. Every device pushes one batch per round. A batch writes one
+of a few hot records that all devices fight over, creates a fresh record, and
+now and then deletes an earlier one. Some batches are sent twice at once
+through different workers, as a client retry would be. Meanwhile pullers page
+through ``/sync/pull`` with a small limit, applying rows the way the app does.
+Afterwards:
+
+- convergence: every puller's replica equals the server's rows;
+- no lost updates: each record holds its acknowledged write with the greatest
+  ``updated_at_server``, no two acknowledged writes to a record share a stamp,
+  and every acknowledged op is recorded exactly once;
+- no missed rows: because replicas are built only from pulled pages, any row
+  committed behind a cursor shows up as a convergence failure.
+
+Throughput, ``503`` retries, admission queueing and write-lock waits are
+reported alongside.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+from uuid import uuid4
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, func, select
+
+from api.db import create_db_engine, get_session, lock_stats
+from api.main import create_app
+from api.models import Log, SyncOp
+from api.settings import override_environ
+from api.time import format_iso
+
+BASE_START = "2026-01-01T09:00:00Z"
+
+
+@dataclass
+class StressConfig:
+    workers: int = 2
+    devices: int = 16
+    rounds: int = 12
+    hot_records: int = 4
+    pullers: int = 3
+    page_size: int = 7
+    max_concurrent_writes: int = 2
+    duplicate_every: int = 5
+    delete_every: int = 4
+
+
+@dataclass
+class StressReport:
+    config: StressConfig
+    elapsed_s: float = 0.0
+    pushes: int = 0
+    ops: int = 0
+    pulls: int = 0
+    pulled_rows: int = 0
+    busy_retries: int = 0
+    push_latency_ms: list[float] = field(default_factory=list)
+    admission: dict[str, int] = field(default_factory=dict)
+    locks: dict[str, Any] = field(default_factory=dict)
+    violations: list[str] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        latencies = sorted(self.push_latency_ms)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            index = min(int(len(latencies) * fraction), len(latencies) - 1)
+            return round(latencies[index], 2)
+
+        elapsed = max(self.elapsed_s, 1e-9)
+        return {
+            "config": asdict(self.config),
+            "elapsed_s": round(self.elapsed_s, 3),
+            "pushes": self.pushes,
+            "ops": self.ops,
+            "ops_per_s": round(self.ops / elapsed, 1),
+            "pushes_per_s": round(self.pushes / elapsed, 1),
+            "pulls": self.pulls,
+            "pulls_per_s": round(self.pulls / elapsed, 1),
+            "pulled_rows": self.pulled_rows,
+            "busy_retries": self.busy_retries,
+            "push_p50_ms": percentile(0.5),
+            "push_p95_ms": percentile(0.95),
+            "admission": self.admission,
+            "locks": self.locks,
+            "violations": len(self.violations),
+        }
+
+
+@dataclass
+class AckedWrite:
+    stamp: str
+    note: Optional[str]
+    deleted: bool
+
+
+def _make_worker(engine: Engine, config: StressConfig, version_file: str) -> FastAPI:
+    with override_environ(
+        DATA_VERSION_FILE=version_file,
+        SYNC_MAX_CONCURRENT_WRITES=str(config.max_concurrent_writes),
+        SYNC_MAX_QUEUED_WRITES=str(config.devices * 4),
+        SYNC_WRITE_QUEUE_TIMEOUT_MS="30000",
+        SYNC_RETRY_AFTER_S="1",
+        CAPTURE_DIR=None,
+        PROFILE_DIR=None,
+        INTERNAL_SYNC_TOKEN=None,
+    ):
+        app = create_app()
+
+    def get_worker_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_worker_session
+    return app
+
+
+def _upsert(record_id: str, note: str) -> dict[str, Any]:
+    return {
+        "op_id": str(uuid4()),
+        "entity": "log",
+        "action": "upsert",
+        "record_id": record_id,
+        "payload": {
+            "id": record_id,
+            "start_at": BASE_START,
+            "end_at": None,
+            "note": note,
+            "updated_at_local": BASE_START,
+            "deleted_at_local": None,
+            "updated_at_server": None,
+            "deleted_at_server": None,
+        },
+    }
+
+
+def _delete(record_id: str) -> dict[str, Any]:
+    return {
+        "op_id": str(uuid4()),
+        "entity": "log",
+        "action": "delete",
+        "record_id": record_id,
+        "payload": {"id": record_id, "deleted_at_local": BASE_START},
+    }
+
+
+class Harness:
+    def __init__(self, clients: list[httpx.AsyncClient], config: StressConfig):
+        self.clients = clients
+        self.config = config
+        self.report = StressReport(config=config)
+        self.acked: dict[str, list[AckedWrite]] = {}
+        self.acked_op_ids: set[str] = set()
+        self.writing = True
+
+    async def push(self, worker: int, payload: dict[str, Any]) -> None:
+        notes = {
+            op["record_id"]: op["payload"].get("note")
+            for op in payload["ops"]
+            if op["action"] == "upsert"
+        }
+        client = self.clients[worker % len(self.clients)]
+        while True:
+            started = time.perf_counter()
+            response = await client.post("/sync/push", json=payload)
+            if response.status_code == 503:
+                self.report.busy_retries += 1
+                await asyncio.sleep(0.01)
+                continue
+            break
+        self.report.push_latency_ms.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            self.report.violations.append(
+                f"push {payload['ops'][0]['op_id']} failed: {response.status_code}"
+            )
+            return
+        body = response.json()
+        self.report.pushes += 1
+        if body["rejected"]:
+            self.report.violations.append(f"push rejected ops: {body['rejected']}")
+        self.acked_op_ids.update(body["ack_op_ids"])
+        for log in body["applied"]["logs"]:
+            self.report.ops += 1
+            deleted = log["deleted_at_server"] is not None
+            self.acked.setdefault(log["id"], []).append(
+                AckedWrite(
+                    stamp=log["updated_at_server"],
+                    note=None if deleted else notes.get(log["id"]),
+                    deleted=deleted,
+                )
+            )
+
+    async def device(self, index: int) -> None:
+        device_id = f"device-{index:03d}"
+        for round_ in range(self.config.rounds):
+            hot = f"hot-{(index + round_) % self.config.hot_records}"
+            ops = [
+                _upsert(hot, f"{device_id}:{round_}"),
+                _upsert(f"{device_id}-{round_:04d}", f"{device_id}:{round_}"),
+            ]
+            if round_ >= 2 and round_ % self.config.delete_every == 0:
+                ops.append(_delete(f"{device_id}-{round_ - 2:04d}"))
+            payload = {
+                "device_id": device_id,
+                "client_time": BASE_START,
+                "ops": ops,
+            }
+            if round_ % self.config.duplicate_every == 0:
+                # A retry racing the original through another worker.
+                await asyncio.gather(
+                    self.push(index, payload), self.push(index + 1, payload)
+                )
+            else:
+                await self.push(index, payload)
+
+    async def puller(self, index: int) -> dict[str, dict[str, Any]]:
+        client = self.clients[index % len(self.clients)]
+        replica: dict[str, dict[str, Any]] = {}
+        cursor: Optional[str] = None
+        while True:
+            writing = self.writing
+            params: dict[str, Any] = {"limit": self.config.page_size}
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get("/sync/pull", params=params)
+            if response.status_code == 503:
+                self.report.busy_retries += 1
+                await asyncio.sleep(0.01)
+                continue
+            data = response.json()
+            self.report.pulls += 1
+            logs = data["changes"]["logs"]
+            self.report.pulled_rows += len(logs)
+            for log in logs:
+                replica[log["id"]] = log
+            cursor = data["next_cursor"]
+            if not logs:
+                if not writing:
+                    return replica
+                await asyncio.sleep(0.005)
+
+
+def _parse(stamp: str) -> datetime:
+    return datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+
+
+def _server_rows(engine: Engine) -> dict[str, dict[str, Any]]:
+    with Session(engine) as session:
+        return {
+            log.id: {
+                "note": log.note,
+                "updated_at_server": format_iso(log.updated_at_server),
+                "deleted_at_server": (
+                    format_iso(log.deleted_at_server) if log.deleted_at_server else None
+                ),
+            }
+            for log in session.exec(select(Log)).all()
+        }
+
+
+def check(
+    harness: Harness, replicas: list[dict[str, dict[str, Any]]], engine: Engine
+) -> list[str]:
+    violations: list[str] = []
+    server = _server_rows(engine)
+
+    for record_id, writes in harness.acked.items():
+        stamps = [write.stamp for write in writes]
+        if len(set(stamps)) != len(stamps):
+            violations.append(f"{record_id}: acknowledged writes share a stamp")
+        winner = max(writes, key=lambda write: _parse(write.stamp))
+        row = server.get(record_id)
+        if row is None:
+            violations.append(f"{record_id}: acknowledged but missing")
+            continue
+        if row["updated_at_server"] != winner.stamp:
+            violations.append(
+                f"{record_id}: holds {row['updated_at_server']}, "
+                f"newest acknowledged write is {winner.stamp}"
+            )
+        elif not winner.deleted and row["note"] != winner.note:
+            violations.append(f"{record_id}: lost update ({row['note']!r})")
+        elif winner.deleted and row["deleted_at_server"] is None:
+            violations.append(f"{record_id}: delete was lost")
+
+    with Session(engine) as session:
+        recorded = session.exec(select(func.count()).select_from(SyncOp)).one()
+    if recorded != len(harness.acked_op_ids):
+        violations.append(
+            f"sync_op holds {recorded} ops, {len(harness.acked_op_ids)} acknowledged"
+        )
+
+    for index, replica in enumerate(replicas):
+        missing = server.keys() - replica.keys()
+        if missing:
+            violations.append(f"puller {index} never saw {sorted(missing)[:5]}")
+        for record_id, row in server.items():
+            seen = replica.get(record_id)
+            if seen is None:
+                continue
+            pulled = {key: seen[key] for key in row}
+            if pulled != row:
+                violations.append(
+                    f"puller {index} diverged on {record_id}: {pulled} != {row}"
+                )
+    return violations
+
+
+async def run_stress(database_path: Path, config: StressConfig) -> StressReport:
+    engines = [
+        create_db_engine(f"sqlite:///{database_path}") for _ in range(config.workers)
+    ]
+    SQLModel.metadata.create_all(engines[0])
+    apps = [
+        _make_worker(engine, config, f"{database_path}-version") for engine in engines
+    ]
+    clients = [
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://stress"
+        )
+        for app in apps
+    ]
+    harness = Harness(clients, config)
+    locks_before = lock_stats.snapshot()
+    started = time.perf_counter()
+    try:
+        pullers = [
+            asyncio.create_task(harness.puller(index))
+            for index in range(config.pullers)
+        ]
+        await asyncio.gather(
+            *(harness.device(index) for index in range(config.devices))
+        )
+        harness.writing = False
+        replicas = await asyncio.gather(*pullers)
+        harness.report.elapsed_s = time.perf_counter() - started
+
+        harness.report.violations.extend(check(harness, replicas, engines[0]))
+        locks_after = lock_stats.snapshot()
+        harness.report.locks = {
+            "write_locks": locks_after["write_locks"] - locks_before["write_locks"],
+            "wait_ms_total": round(
+                locks_after["wait_ms_total"] - locks_before["wait_ms_total"], 3
+            ),
+            "wait_ms_max": locks_after["wait_ms_max"],
+            "retries": locks_after["retries"] - locks_before["retries"],
+            "exhausted": locks_after["exhausted"] - locks_before["exhausted"],
+        }
+        for app in apps:
+            for key, value in app.state.admission.stats().items():
+                harness.report.admission[key] = (
+                    harness.report.admission.get(key, 0) + value
+                )
+    finally:
+        for client in clients:
+            await client.aclose()
+        for engine in engines:
+            engine.dispose()
+    return harness.report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = StressConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    args = parser.parse_args()
+    config = StressConfig(**vars(args))
+    with tempfile.TemporaryDirectory(prefix="wildlings-stress-") as scratch:
+        report = asyncio.run(run_stress(Path(scratch) / "stress.db", config))
+    print(json.dumps(report.summary(), indent=2))
+    for violation in report.violations[:20]:
+        print(f"VIOLATION {violation}")
+    raise SystemExit(1 if report.violations else 0)
+
+
+if __name__ == "__main__":
+    main()
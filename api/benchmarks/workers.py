@@ -0,0 +1,200 @@
+"""Measure sync throughput as the number of uvicorn workers grows.
+
+Usage (from the repo root)::
+
+    python -m api.benchmarks.workers --workers 1 2 4 --duration 10
+
+Each run migrates a fresh SQLite database, starts
+``uvicorn --factory api.main:create_app`` with ``--workers N`` and drives it
+with concurrent clients issuing a push/pull mix (``--push-ratio``). Requests
+per second, latency percentiles and the number of ``503`` responses are printed
+per worker count.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+
+
+ROOT = Path(__file__).resolve().parents[2]
+API_DIR = ROOT / "api"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def push_body(batch_size: int) -> dict:
+    ops = []
+    for _ in range(batch_size):
+        log_id = str(uuid4())
+        ops.append(
+            {
+                "op_id": str(uuid4()),
+                "entity": "log",
+                "action": "upsert",
+                "record_id": log_id,
+                "payload": {
+                    "id": log_id,
+                    "start_at": "2026-01-01T09:00:00Z",
+                    "end_at": "2026-01-01T10:00:00Z",
+                    "note": "Benchmark",
+                    "updated_at_local": "2026-01-01T10:00:00Z",
+                    "deleted_at_local": None,
+                    "updated_at_server": None,
+                    "deleted_at_server": None,
+                },
+            }
+        )
+    return {
+        "device_id": str(uuid4()),
+        "client_time": "2026-01-01T12:00:00Z",
+        "ops": ops,
+    }
+
+
+def start_server(workers: int, port: int, env: dict[str, str]) -> subprocess.Popen:
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "alembic",
+            "-c",
+            str(API_DIR / "alembic.ini"),
+            "upgrade",
+            "head",
+        ],
+        cwd=API_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "--factory",
+            "api.main:create_app",
+            "--app-dir",
+            str(ROOT),
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+async def wait_ready(base_url: str, timeout_s: float = 30) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/sync/pull")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+async def drive(
+    base_url: str, clients: int, duration_s: float, push_ratio: float, batch: int
+) -> dict[str, float]:
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    deadline = time.monotonic() + duration_s
+
+    async def client_loop() -> None:
+        limits = httpx.Limits(max_connections=1)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                if random.random() < push_ratio:
+                    response = await client.post("/sync/push", json=push_body(batch))
+                else:
+                    response = await client.get("/sync/pull", params={"limit": 100})
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = (
+                    statuses.get(response.status_code, 0) + 1
+                )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "shed_503": statuses.get(503, 0),
+        "errors": sum(n for code, n in statuses.items() if code >= 500 and code != 503),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--push-ratio", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args()
+
+    print("workers  requests      rps   p50_ms   p99_ms  shed_503  errors")
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            port = free_port()
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+                "DATA_VERSION_FILE": f"{tmp}/bench.db-version",
+                "WEB_CONCURRENCY": str(workers),
+                "PYTHONPATH": str(ROOT),
+            }
+            server = start_server(workers, port, env)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                asyncio.run(wait_ready(base_url))
+                result = asyncio.run(
+                    drive(
+                        base_url,
+                        args.clients,
+                        args.duration,
+                        args.push_ratio,
+                        args.batch_size,
+                    )
+                )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        print(
+            f"{workers:>7} {result['requests']:>9.0f} {result['rps']:>8.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+            f"{result['shed_503']:>9.0f} {result['errors']:>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
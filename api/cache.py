@@ -0,0 +1,203 @@
+"""In-process caching of serialized ``/sync/pull`` pages."""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Hashable, Optional, Union
+
+from fastapi import Request
+
+from api.db import get_database_url, sqlite_database_path
+from api.settings import scoped_state
+
+if TYPE_CHECKING:
+    from api.settings import Settings
+
+
+class DataVersion:
+    """Monotonic counter bumped after every committed write to the sync tables."""
+
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class SharedDataVersion:
+    """``DataVersion`` kept in a small file so every worker process shares it.
+
+    Reads are a single ``pread`` (no lock, no database query); bumps take an
+    exclusive ``flock`` so concurrent writers never lose an increment. Other
+    processes that write to the database (e.g. ``python -m api.cli import``)
+    bump the same file. The file is opened on first use, so building an app
+    (or importing ``api.main``) does not create it.
+    """
+
+    def __init__(self, path: str) -> None:
+        import fcntl
+
+        self._flock = fcntl.flock
+        self._lock_ex = fcntl.LOCK_EX
+        self._unlock = fcntl.LOCK_UN
+        self.path = path
+        self._fd: Optional[int] = None
+        self._open_lock = threading.Lock()
+
+    def _file(self) -> int:
+        if self._fd is None:
+            with self._open_lock:
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    def current(self) -> int:
+        return int.from_bytes(os.pread(self._file(), 8, 0).ljust(8, b"\0"), "little")
+
+    def bump(self) -> int:
+        fd = self._file()
+        self._flock(fd, self._lock_ex)
+        try:
+            value = self.current() + 1
+            os.pwrite(fd, value.to_bytes(8, "little"), 0)
+            return value
+        finally:
+            self._flock(fd, self._unlock)
+
+    def close(self) -> None:
+        with self._open_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+AnyDataVersion = Union[DataVersion, SharedDataVersion]
+
+
+def default_data_version_path(database_url: str) -> Optional[str]:
+    db_path = sqlite_database_path(database_url)
+    return f"{db_path}-version" if db_path else None
+
+
+def create_data_version(settings: Settings) -> AnyDataVersion:
+    """Pick the data version the app's caches are keyed on.
+
+    ``DATA_VERSION_FILE`` wins; on a SQLite file the path defaults to
+    ``<db>-version``, even with one worker, so that ``import`` runs in another
+    process still invalidate cached pages. Otherwise the counter is
+    process-local and ``create_app`` turns the pull cache off.
+    """
+    path = settings.data_version_file or default_data_version_path(get_database_url())
+    return SharedDataVersion(path) if path else DataVersion()
+
+
+def open_shared_data_version(database_url: str) -> Optional[SharedDataVersion]:
+    """The shared version file a server on ``database_url`` may be watching."""
+    path = os.getenv("DATA_VERSION_FILE") or default_data_version_path(database_url)
+    if path and (os.getenv("DATA_VERSION_FILE") or os.path.exists(path)):
+        return SharedDataVersion(path)
+    return None
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    version: int
+    next_cursor: Optional[str]
+    changes_json: bytes
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    stale: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+
+class PullPageCache:
+    """LRU of serialized pull pages bounded by entry count and total bytes.
+
+    Entries are tagged with the ``DataVersion`` read *before* the page was
+    queried; a lookup only hits when that tag equals the current version, so a
+    write committed at any point during or after the query can never be hidden
+    by a cached page. ``max_entries=0`` disables caching.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, CachedPage] = OrderedDict()
+        self._bytes = 0
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable, version: int) -> Optional[CachedPage]:
+        with self._lock:
+            page = self._entries.get(key)
+            if page is None:
+                self._stats.misses += 1
+                return None
+            if page.version != version:
+                self._remove(key)
+                self._stats.stale += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return page
+
+    def put(self, key: Hashable, page: CachedPage, current_version: int) -> None:
+        size = len(page.changes_json)
+        if not self.enabled or size > self.max_bytes:
+            return
+        if page.version != current_version:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = page
+            self._bytes += size
+            self._stats.stores += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            self._stats.entries = len(self._entries)
+            self._stats.bytes = self._bytes
+            return asdict(self._stats)
+
+    def _remove(self, key: Hashable) -> None:
+        page = self._entries.pop(key)
+        self._bytes -= len(page.changes_json)
+
+
+def get_data_version(request: Request) -> AnyDataVersion:
+    return scoped_state(request).data_version
+
+
+def get_pull_cache(request: Request) -> PullPageCache:
+    return scoped_state(request).pull_cache
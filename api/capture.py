@@ -0,0 +1,192 @@
+"""Opt-in capture of sync traffic to rotating NDJSON files, for ``api.replay``.
+
+Installed only when ``CAPTURE_DIR`` is set. Every request under ``/sync`` is
+written as one JSON line: method, path, query, headers (credentials replaced by
+``[redacted]``), the request body, the instant the request was received, and
+the status, duration and a sha256 of the response. The receive instant is also
+pinned on ``request.state.now`` so ``get_now`` hands the route the exact time
+that was recorded, which is what lets a replay reproduce the same responses.
+Files roll over at ``CAPTURE_MAX_BYTES`` and only the newest
+``CAPTURE_MAX_FILES`` are kept.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import heapq
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.time import format_iso, to_epoch_us, utc_now
+
+
+CAPTURE_PREFIX = "sync-capture-"
+CAPTURE_SUFFIX = ".ndjson"
+REDACTED = "[redacted]"
+REDACTED_HEADERS = frozenset({"x-internal-token", "authorization", "cookie"})
+DEFAULT_MAX_BODY_BYTES = 4 * 1024 * 1024
+
+
+class CaptureWriter:
+    """Appends records to the newest capture file, rolling over by size."""
+
+    def __init__(self, directory: str, max_bytes: int, max_files: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._path: Optional[Path] = None
+        self._size = 0
+        self.written = 0
+
+    def _roll(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = utc_now().strftime("%Y%m%dT%H%M%S%fZ")
+        self._path = self.directory / f"{CAPTURE_PREFIX}{stamp}{CAPTURE_SUFFIX}"
+        self._size = 0
+        existing = capture_files(self.directory)
+        for stale in existing[: max(len(existing) - self.max_files + 1, 0)]:
+            stale.unlink(missing_ok=True)
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._path is None or self._size + len(line) > self.max_bytes:
+                self._roll()
+            assert self._path is not None
+            with self._path.open("ab") as handle:
+                handle.write(line)
+            self._size += len(line)
+            self.written += 1
+
+
+def capture_files(directory: Path) -> list[Path]:
+    """Capture files, oldest first (names sort by their UTC timestamp)."""
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob(f"{CAPTURE_PREFIX}*{CAPTURE_SUFFIX}"))
+
+
+def _arrival_key(record: dict[str, Any]) -> tuple[int, int]:
+    return record["received_us"], record["seq"]
+
+
+def _read_capture_file(path: Path) -> Iterator[dict[str, Any]]:
+    # Records are appended as responses finish, so a file is only nearly in
+    # arrival order; sorting one file (at most ``CAPTURE_MAX_BYTES``) is close
+    # to linear.
+    with path.open(encoding="utf-8") as handle:
+        records = [json.loads(line) for line in handle if line.strip()]
+    records.sort(key=_arrival_key)
+    yield from records
+
+
+def read_capture(paths: Iterable[Path]) -> Iterator[dict[str, Any]]:
+    """Records from capture files or directories of them, in arrival order.
+
+    Files are merged with ``heapq.merge`` rather than concatenated and sorted,
+    so the records are never gathered into one list.
+    """
+    files: list[Path] = []
+    for path in paths:
+        files.extend(capture_files(path) if path.is_dir() else [path])
+    yield from heapq.merge(*map(_read_capture_file, files), key=_arrival_key)
+
+
+def encode_body(body: bytes) -> dict[str, Any]:
+    try:
+        return {"body": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body": base64.b64encode(body).decode("ascii"), "body_encoding": "b64"}
+
+
+def decode_body(record: dict[str, Any]) -> bytes:
+    if record.get("body_encoding") == "b64":
+        return base64.b64decode(record["body"])
+    return record["body"].encode("utf-8")
+
+
+class CaptureMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        directory: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_files: int = 10,
+        path_prefix: str = "/sync",
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+    ):
+        self.app = app
+        self.writer = CaptureWriter(directory, max_bytes, max_files)
+        self.path_prefix = path_prefix
+        self.max_body_bytes = max_body_bytes
+        self._counter = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        received_at = utc_now()
+        scope.setdefault("state", {})["now"] = received_at
+        self._counter += 1
+        seq = self._counter
+        body = bytearray()
+        truncated = False
+        status_code = 500
+        digest = hashlib.sha256()
+        response_bytes = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal truncated
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                if len(body) + len(chunk) <= self.max_body_bytes:
+                    body.extend(chunk)
+                else:
+                    truncated = True
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                digest.update(chunk)
+                response_bytes += len(chunk)
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            headers = {}
+            for raw_name, raw_value in scope["headers"]:
+                name = raw_name.decode("latin-1").lower()
+                value = raw_value.decode("latin-1")
+                headers[name] = REDACTED if name in REDACTED_HEADERS else value
+            record = {
+                "seq": seq,
+                "received_at": format_iso(received_at),
+                "received_us": to_epoch_us(received_at),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope["query_string"].decode("latin-1"),
+                "headers": headers,
+                **encode_body(bytes(body)),
+                "truncated": truncated,
+                "status_code": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "response_bytes": response_bytes,
+                "response_sha256": digest.hexdigest(),
+            }
+            await run_in_threadpool(self.writer.write, record)
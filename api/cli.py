@@ -0,0 +1,262 @@
+"""Operator commands: ``python -m api.cli <command> --help``."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Sequence
+
+from api.backup import backup_database, restore_database
+from api.cache import open_shared_data_version
+from api.capture import read_capture
+from api.db import (
+    create_db_engine,
+    dispose_engine,
+    get_database_url,
+    sqlite_database_path,
+)
+from api.exporter import export_logs
+from api.importer import DEFAULT_BATCH_SIZE, import_logs
+from api.maintenance import (
+    MaintenanceScheduler,
+    Step,
+    StepReport,
+    enable_incremental_vacuum,
+)
+from api.migrate import ensure_schema
+from api.replay import replay
+from api.settings import override_environ
+from api.time import ensure_utc
+
+
+def _import(args: argparse.Namespace) -> int:
+    engine = create_db_engine(args.database_url)
+    report = import_logs(
+        engine,
+        args.source,
+        fmt=args.format,
+        batch_size=args.batch_size,
+        checkpoint=args.checkpoint,
+        data_version=open_shared_data_version(args.database_url or get_database_url()),
+    )
+    for error in report.errors:
+        print(error, file=sys.stderr)
+    print(
+        f"processed={report.processed} attempted={report.attempted} "
+        f"written={report.written} invalid={report.invalid} "
+        f"resumed_from={report.resumed_from}"
+    )
+    return 1 if report.invalid and args.strict else 0
+
+
+def _parse_time(value: str) -> datetime:
+    return ensure_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def _export(args: argparse.Namespace) -> int:
+    engine = create_db_engine(args.database_url)
+    chunks = export_logs(
+        engine,
+        args.format,
+        since=args.since,
+        until=args.until,
+        include_deleted=args.include_deleted,
+    )
+    if args.output is None:
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+        return 0
+    newline = "" if args.format == "csv" else None
+    with args.output.open("w", encoding="utf-8", newline=newline) as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+    return 0
+
+
+def _maintenance(args: argparse.Namespace) -> int:
+    database_path = _sqlite_path(args)
+    if database_path is None:
+        return 2
+    scheduler = MaintenanceScheduler(database_path)
+    if args.enable_incremental_vacuum:
+        scheduler.steps.insert(
+            0, Step("enable_incremental_vacuum", 1, enable_incremental_vacuum)
+        )
+        scheduler.reports["enable_incremental_vacuum"] = StepReport()
+    failed = False
+    for step in scheduler.steps:
+        report = scheduler.run_step(step)
+        outcome = report.last_result if report.last_error is None else report.last_error
+        print(f"{step.name}: {report.last_duration_ms} ms {outcome}")
+        failed = failed or report.last_error is not None
+    return 1 if failed else 0
+
+
+def _sqlite_path(args: argparse.Namespace) -> Optional[str]:
+    database_path = sqlite_database_path(args.database_url or get_database_url())
+    if database_path is None:
+        print(f"{args.command} only applies to a SQLite database file", file=sys.stderr)
+    return database_path
+
+
+def _backup(args: argparse.Namespace) -> int:
+    database_path = _sqlite_path(args)
+    if database_path is None:
+        return 2
+    directory = args.directory or os.getenv("BACKUP_DIR")
+    if not directory:
+        print("pass --directory or set BACKUP_DIR", file=sys.stderr)
+        return 2
+    result = backup_database(database_path, Path(directory), keep=args.keep)
+    print(
+        f"{result.path} bytes={result.database_bytes} "
+        f"compressed={result.compressed_bytes} sha256={result.sha256} "
+        f"restarts={result.restarts} duration_ms={result.duration_ms}"
+    )
+    for name in result.pruned:
+        print(f"pruned {name}")
+    return 0
+
+
+def _restore(args: argparse.Namespace) -> int:
+    database_path = _sqlite_path(args)
+    if database_path is None:
+        return 2
+    previous = restore_database(args.snapshot, database_path)
+    print(f"restored {args.snapshot} -> {database_path}")
+    if previous is not None:
+        print(f"previous database kept at {previous}")
+    return 0
+
+
+def _replay(args: argparse.Namespace) -> int:
+    from api.main import create_app
+
+    records = list(read_capture(args.capture))
+    with tempfile.TemporaryDirectory(prefix="wildlings-replay-") as scratch:
+        database_url = args.database_url or f"sqlite:///{Path(scratch) / 'replay.db'}"
+        ensure_schema(database_url)
+        # A fresh app on the replay database that does not capture its own traffic.
+        with override_environ(
+            DATABASE_URL=database_url, CAPTURE_DIR=None, DATA_VERSION_FILE=None
+        ):
+            dispose_engine()
+            try:
+                report = asyncio.run(replay(create_app(), records, speed=args.speed))
+            finally:
+                dispose_engine()
+    print(json.dumps(report.as_dict(), indent=2))
+    mismatched = report.status_mismatches + report.body_mismatches
+    return 1 if mismatched and args.strict else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m api.cli")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Defaults to $DATABASE_URL.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser(
+        "import", help="Stream historical logs from CSV, NDJSON or a JSON array."
+    )
+    import_parser.add_argument("source", type=Path)
+    import_parser.add_argument("--format", choices=["csv", "ndjson", "json"])
+    import_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    import_parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=None,
+        help="Defaults to <source>.import-checkpoint.json.",
+    )
+    import_parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Exit non-zero when any record was rejected.",
+    )
+    import_parser.set_defaults(handler=_import)
+
+    export_parser = commands.add_parser(
+        "export", help="Stream logs as CSV or NDJSON to a file or stdout."
+    )
+    export_parser.add_argument("--format", choices=["csv", "ndjson"], default="ndjson")
+    export_parser.add_argument("--output", type=Path, default=None)
+    export_parser.add_argument(
+        "--since", type=_parse_time, help="Only logs starting at or after this time."
+    )
+    export_parser.add_argument(
+        "--until", type=_parse_time, help="Only logs starting before this time."
+    )
+    export_parser.add_argument("--include-deleted", action="store_true")
+    export_parser.set_defaults(handler=_export)
+
+    maintenance_parser = commands.add_parser(
+        "maintenance",
+        help="Checkpoint the WAL, refresh planner statistics and vacuum once.",
+    )
+    maintenance_parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="Convert an existing file to auto_vacuum=INCREMENTAL (runs VACUUM).",
+    )
+    maintenance_parser.set_defaults(handler=_maintenance)
+
+    backup_parser = commands.add_parser(
+        "backup", help="Write a verified, gzipped online snapshot of the database."
+    )
+    backup_parser.add_argument(
+        "--directory", type=Path, default=None, help="Defaults to $BACKUP_DIR."
+    )
+    backup_parser.add_argument(
+        "--keep", type=int, default=int(os.getenv("BACKUP_KEEP", "7"))
+    )
+    backup_parser.set_defaults(handler=_backup)
+
+    restore_parser = commands.add_parser(
+        "restore",
+        help="Replace the database with a snapshot. Stop the server first.",
+    )
+    restore_parser.add_argument("snapshot", type=Path)
+    restore_parser.set_defaults(handler=_restore)
+
+    replay_parser = commands.add_parser(
+        "replay",
+        help=(
+            "Re-drive captured sync traffic (CAPTURE_DIR) through the app, on a "
+            "scratch SQLite file unless --database-url is given explicitly."
+        ),
+    )
+    replay_parser.add_argument(
+        "capture", type=Path, nargs="+", help="Capture files or directories."
+    )
+    replay_parser.add_argument(
+        "--speed",
+        type=float,
+        default=0.0,
+        help="0 replays back to back; N keeps the original pacing N times faster.",
+    )
+    replay_parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Exit non-zero when any response differs from the capture.",
+    )
+    replay_parser.set_defaults(handler=_replay)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
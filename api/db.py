@@ -1,34 +1,226 @@
 from __future__ import annotations
 
 import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Optional, TypeVar
 
+from fastapi import Request
 from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
 from sqlmodel import Session, create_engine
 
 
-def create_db_engine():
-    database_url = os.getenv("DATABASE_URL", "sqlite:///./wildlings.db")
-    connect_args = {}
-    if database_url.startswith("sqlite"):
-        connect_args = {"check_same_thread": False}
-    engine = create_engine(database_url, connect_args=connect_args)
+DEFAULT_DATABASE_URL = "sqlite:///./wildlings.db"
+LOCK_ERROR_MARKERS = (
+    "database is locked",
+    "database table is locked",
+    # Postgres: concurrent pushes row-locking the same logs in another order.
+    "deadlock detected",
+)
+# Arbitrary; distinct from the migration lock in ``api.migrate``. The write lock
+# uses the two-key form, paired with a hash of the current schema.
+POSTGRES_WRITE_LOCK_KEY = 0x77696C65
 
-    if database_url.startswith("sqlite"):
+T = TypeVar("T")
+
+
+def normalize_database_url(database_url: str) -> str:
+    """Route bare Postgres URLs to the psycopg (v3) driver we ship."""
+    for prefix in ("postgres://", "postgresql://"):
+        if database_url.startswith(prefix):
+            return "postgresql+psycopg://" + database_url[len(prefix) :]
+    return database_url
+
+
+def get_database_url() -> str:
+    return normalize_database_url(os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+
+
+def _postgres_pool_options() -> dict[str, Any]:
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
+def create_db_engine(database_url: Optional[str] = None) -> Engine:
+    database_url = normalize_database_url(database_url or get_database_url())
+    backend = make_url(database_url).get_backend_name()
+
+    if backend == "sqlite":
+        busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+        engine = create_engine(database_url, connect_args={"check_same_thread": False})
 
         @event.listens_for(engine, "connect")
         def _set_sqlite_pragmas(dbapi_connection, _connection_record):
             cursor = dbapi_connection.cursor()
             try:
+                # Only takes effect before the first table is created; existing
+                # files are converted by ``python -m api.cli maintenance``.
+                cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
                 cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
             finally:
                 cursor.close()
 
-    return engine
+        return engine
+
+    if backend == "postgresql":
+        return create_engine(database_url, **_postgres_pool_options())
+
+    return create_engine(database_url)
+
+
+def sqlite_database_path(database_url: str) -> Optional[str]:
+    """Filesystem path of a file-backed SQLite URL, else ``None``."""
+    url = make_url(normalize_database_url(database_url))
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return url.database
+
+
+def is_lock_conflict(exc: BaseException) -> bool:
+    return isinstance(exc, OperationalError) and any(
+        marker in str(exc.orig) for marker in LOCK_ERROR_MARKERS
+    )
+
+
+@dataclass
+class LockStats:
+    write_locks: int = 0
+    wait_ms_total: float = 0.0
+    wait_ms_max: float = 0.0
+    retries: int = 0
+    exhausted: int = 0
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def record_wait(self, wait_ms: float) -> None:
+        with self._lock:
+            self.write_locks += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def record_conflict(self, exhausted: bool) -> None:
+        with self._lock:
+            if exhausted:
+                self.exhausted += 1
+            else:
+                self.retries += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            stats = asdict(self)
+        stats["wait_ms_total"] = round(stats["wait_ms_total"], 3)
+        stats["wait_ms_max"] = round(stats["wait_ms_max"], 3)
+        return stats
+
+
+# Process-wide: every engine in this process reports here.
+lock_stats = LockStats()
+
+
+def begin_write(session: Session) -> None:
+    """Take the database's write lock for the rest of the transaction.
+
+    Sync writers stamp ``updated_at_server`` while holding it, so rows commit in
+    timestamp order and a pull cursor never passes a row that commits later
+    with an older stamp. SQLite gets ``BEGIN IMMEDIATE`` (waiting up to
+    ``busy_timeout``), so it must come before the first statement; Postgres a
+    transaction-scoped advisory lock keyed on ``current_schema()``, so tenants
+    kept as schemas of one database (see ``api.tenants``) each get their own
+    writer. ``stamps_at_commit`` says when pushes take it.
+    """
+    connection = session.connection()
+    dialect_name = connection.dialect.name
+    started = time.perf_counter()
+    if dialect_name == "sqlite":
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    elif dialect_name == "postgresql":
+        connection.exec_driver_sql(
+            f"SELECT pg_advisory_xact_lock({POSTGRES_WRITE_LOCK_KEY},"
+            " hashtext(current_schema()))"
+        )
+    else:
+        return
+    lock_stats.record_wait((time.perf_counter() - started) * 1000)
+
+
+def stamps_at_commit(session: Session) -> bool:
+    """Whether pushes write first and take ``begin_write`` only to stamp.
+
+    True on Postgres, where row locks keep concurrent writers apart and the
+    write lock only has to order the stamps. SQLite has one writer anyway, so
+    there ``begin_write`` is taken up front.
+    """
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def retry_on_lock(
+    session: Session,
+    func: Callable[..., T],
+    *args: Any,
+    attempts: int = 4,
+    base_delay_s: float = 0.05,
+) -> T:
+    """Run a blocking write, retrying from scratch when it hits a lock conflict.
+
+    ``busy_timeout`` already waits inside SQLite; this covers the cases it
+    cannot (e.g. a deferred transaction upgrading to a writer), which surface
+    immediately as ``database is locked``, and Postgres deadlocks between
+    pushes. The last failure is re-raised.
+    """
+    for attempt in range(attempts):
+        try:
+            return func(session, *args)
+        except OperationalError as exc:
+            session.rollback()
+            if not is_lock_conflict(exc):
+                raise
+            lock_stats.record_conflict(exhausted=attempt == attempts - 1)
+            if attempt == attempts - 1:
+                raise
+            time.sleep(base_delay_s * (2**attempt))
+    raise AssertionError("unreachable")
+
+
+def dialect_insert(session: Session) -> Callable[..., Any]:
+    """Return the dialect's ``INSERT`` construct that supports ``ON CONFLICT``."""
+    dialect_name = session.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        return sqlite.insert
+    if dialect_name == "postgresql":
+        return postgresql.insert
+    raise NotImplementedError(f"Upserts are not supported on {dialect_name}")
+
+
+_engine: Optional[Engine] = None
+
+
+def get_engine() -> Engine:
+    """The process-wide engine, created on first use rather than at import."""
+    global _engine
+    if _engine is None:
+        _engine = create_db_engine()
+    return _engine
 
 
-engine = create_db_engine()
+def dispose_engine() -> None:
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
 
 
-def get_session():
-    with Session(engine) as session:
+def get_session(request: Request):
+    tenant = getattr(request.state, "tenant", None)
+    with Session(tenant.engine if tenant is not None else get_engine()) as session:
         yield session
@@ -0,0 +1,125 @@
+"""Streaming export of the server's logs as CSV or NDJSON."""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Iterator, Optional, cast
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine, Row
+
+from api.models import Log
+from api.time import format_iso
+
+
+DEFAULT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = (
+    "id",
+    "start_at",
+    "end_at",
+    "note",
+    "updated_at_server",
+    "deleted_at_server",
+)
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def iter_log_rows(
+    engine: Engine,
+    *,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_deleted: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Row]:
+    """Yield logs in ``id`` order, one short read per chunk.
+
+    ``since``/``until`` bound ``start_at`` (inclusive/exclusive). Each chunk is
+    read on its own connection and transaction, so an export of any size never
+    pins a read snapshot that would block WAL checkpoints or writers for long.
+    Paging on the immutable ``id`` emits every row exactly once: a row updated
+    mid-export comes out in whichever version its chunk read, instead of once
+    per version as it would when paging on ``updated_at_server``.
+    """
+    table = cast(Any, Log).__table__
+    base = select(*(table.c[name] for name in EXPORT_FIELDS))
+    if since is not None:
+        base = base.where(table.c.start_at >= since)
+    if until is not None:
+        base = base.where(table.c.start_at < until)
+    if not include_deleted:
+        base = base.where(table.c.deleted_at_server.is_(None))
+    base = base.order_by(table.c.id).limit(chunk_size)
+
+    last: Optional[str] = None
+    while True:
+        stmt = base if last is None else base.where(table.c.id > last)
+        with engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=chunk_size
+            ).execute(stmt)
+            count = 0
+            for row in result:
+                count += 1
+                last = row.id
+                yield row
+        if count < chunk_size:
+            return
+
+
+def _row_values(row: Row) -> list[Optional[str]]:
+    return [
+        row.id,
+        format_iso(row.start_at),
+        format_iso(row.end_at) if row.end_at else None,
+        row.note,
+        format_iso(row.updated_at_server),
+        format_iso(row.deleted_at_server) if row.deleted_at_server else None,
+    ]
+
+
+def _batched(rows: Iterator[Row], size: int) -> Iterator[list[Row]]:
+    batch: list[Row] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def format_csv(
+    rows: Iterator[Row], batch_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+    for batch in _batched(rows, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_row_values(row) for row in batch)
+        yield buffer.getvalue()
+
+
+def format_ndjson(
+    rows: Iterator[Row], batch_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[str]:
+    for batch in _batched(rows, batch_size):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, _row_values(row)))) + "\n"
+            for row in batch
+        )
+
+
+def export_logs(engine: Engine, fmt: str, **filters: Any) -> Iterator[str]:
+    rows = iter_log_rows(engine, **filters)
+    if fmt == "csv":
+        return format_csv(rows)
+    if fmt == "ndjson":
+        return format_ndjson(rows)
+    raise ValueError(f"Unsupported export format: {fmt}")
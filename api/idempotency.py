@@ -0,0 +1,181 @@
+"""In-memory fast path for ``(device_id, op_id)`` idempotency checks.
+
+Clients replay a whole push when its response is lost, so most probes of
+``sync_op`` either find every op (a retry) or none (fresh work). An LRU of
+recently committed pairs answers retries without the database, and a Bloom
+filter over every committed pair lets fresh ops skip the probe once it has been
+seeded from the table.
+
+Neither structure is authoritative: another worker may commit ops this process
+never saw. The ``sync_op`` primary key still rejects a duplicate insert, and
+``apply_push`` then reruns the batch against the database (``fallbacks``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable, Optional, cast
+
+from fastapi import Request
+from sqlalchemy import and_, or_, select
+from sqlalchemy.engine import Engine
+
+from api.models import SyncOp
+from api.settings import scoped_state
+
+
+SEED_BATCH_SIZE = 10_000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter; no false negatives, ``error_rate`` at capacity."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.size = bits
+        self.hash_count = max(1, round(bits / max(capacity, 1) * math.log(2)))
+        self._bits = bytearray((bits + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+@dataclass
+class AppliedOpStats:
+    cache_hits: int = 0
+    probes_skipped: int = 0
+    probed: int = 0
+    fallbacks: int = 0
+    entries: int = 0
+    seeded: bool = False
+
+
+def _key(device_id: str, op_id: str) -> str:
+    return f"{device_id}\x1f{op_id}"
+
+
+class AppliedOpCache:
+    """Recently applied op ids (LRU) plus a Bloom filter of all applied ops.
+
+    ``max_entries=0`` disables the LRU and ``filter_capacity=0`` the filter.
+    """
+
+    def __init__(self, max_entries: int = 65_536, filter_capacity: int = 1_000_000):
+        self.max_entries = max_entries
+        self._recent: OrderedDict[str, None] = OrderedDict()
+        self._filter = BloomFilter(filter_capacity) if filter_capacity > 0 else None
+        self._seeded = False
+        self._stop = threading.Event()
+        self._stats = AppliedOpStats()
+        self._lock = threading.Lock()
+
+    def split(self, device_id: str, op_ids: Iterable[str]) -> tuple[set[str], set[str]]:
+        """Return ``(known_applied, needs_probe)``; the rest are surely new."""
+        known: set[str] = set()
+        unknown: set[str] = set()
+        skipped = 0
+        with self._lock:
+            for op_id in dict.fromkeys(op_ids):
+                key = _key(device_id, op_id)
+                if key in self._recent:
+                    self._recent.move_to_end(key)
+                    known.add(op_id)
+                elif (
+                    self._seeded
+                    and self._filter is not None
+                    and key not in self._filter
+                ):
+                    skipped += 1
+                else:
+                    unknown.add(op_id)
+            self._stats.cache_hits += len(known)
+            self._stats.probes_skipped += skipped
+            self._stats.probed += len(unknown)
+        return known, unknown
+
+    def add(self, device_id: str, op_ids: Iterable[str]) -> None:
+        """Record committed ops; call only after the transaction commits."""
+        with self._lock:
+            for op_id in op_ids:
+                key = _key(device_id, op_id)
+                if self._filter is not None:
+                    self._filter.add(key)
+                if self.max_entries <= 0:
+                    continue
+                self._recent[key] = None
+                self._recent.move_to_end(key)
+            while len(self._recent) > self.max_entries:
+                self._recent.popitem(last=False)
+
+    def record_fallback(self) -> None:
+        with self._lock:
+            self._stats.fallbacks += 1
+
+    def seed(self, engine: Engine, batch_size: int = SEED_BATCH_SIZE) -> None:
+        """Load every committed pair into the filter so fresh ops skip probes.
+
+        Pages through ``sync_op`` by primary key with one short read per batch,
+        so a large table never pins a snapshot (and the SQLite WAL) for the
+        whole scan. Ops committed while this runs are added by ``apply_push``
+        as usual, so the filter is complete once the scan finishes.
+        ``stop_seeding`` ends the scan after the current batch, leaving the
+        cache unseeded.
+        """
+        if self._filter is None:
+            return
+        table = cast(Any, SyncOp).__table__
+        base = (
+            select(table.c.device_id, table.c.op_id)
+            .order_by(table.c.device_id, table.c.op_id)
+            .limit(batch_size)
+        )
+        last: Optional[tuple[str, str]] = None
+        while not self._stop.is_set():
+            stmt = base
+            if last is not None:
+                stmt = stmt.where(
+                    or_(
+                        table.c.device_id > last[0],
+                        and_(table.c.device_id == last[0], table.c.op_id > last[1]),
+                    )
+                )
+            with engine.connect() as connection:
+                rows = connection.execute(stmt).all()
+            with self._lock:
+                for device_id, op_id in rows:
+                    self._filter.add(_key(device_id, op_id))
+            if len(rows) < batch_size:
+                with self._lock:
+                    self._seeded = True
+                return
+            last = (rows[-1].device_id, rows[-1].op_id)
+
+    def stop_seeding(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._stats.entries = len(self._recent)
+            self._stats.seeded = self._seeded
+            return asdict(self._stats)
+
+
+def get_applied_ops(request: Request) -> AppliedOpCache:
+    return scoped_state(request).applied_ops
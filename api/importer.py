@@ -0,0 +1,252 @@
+"""Streaming bulk import of historical logs from CSV, NDJSON or JSON files."""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator, Optional, TextIO
+from uuid import NAMESPACE_URL, uuid5
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from api.cache import AnyDataVersion
+from api.db import begin_write
+from api.routes.sync import validate_log_times
+from api.store import insert_new_logs, next_server_time
+from api.time import ensure_utc, format_iso, utc_now
+
+
+DEFAULT_BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 64 * 1024
+IMPORT_ID_NAMESPACE = uuid5(NAMESPACE_URL, "https://wildlings/import")
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "json"}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    processed: int = 0
+    # Valid rows sent to the database; ``written`` is how many were new.
+    attempted: int = 0
+    written: int = 0
+    invalid: int = 0
+    resumed_from: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+def detect_format(path: Path) -> str:
+    try:
+        return FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Cannot infer import format from {path.name}")
+
+
+def _iter_json_array(handle: TextIO) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array without loading the file."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if started:
+            buffer = buffer.lstrip(",").lstrip()
+        if buffer:
+            if not started:
+                if buffer[0] != "[":
+                    raise ImportRowError("Expected a JSON array of logs")
+                started = True
+                buffer = buffer[1:]
+                continue
+            if buffer[0] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ImportRowError("Truncated JSON array")
+            else:
+                yield item
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            raise ImportRowError("Truncated JSON array")
+        chunk = handle.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_source_records(handle: TextIO, fmt: str) -> Iterator[Any]:
+    if fmt == "csv":
+        yield from csv.DictReader(handle)
+    elif fmt == "ndjson":
+        for line in handle:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as exc:
+                    # Counted as an invalid record, like a row that fails
+                    # validation, instead of aborting the import.
+                    yield ImportRowError(f"invalid JSON: {exc.msg}")
+    elif fmt == "json":
+        yield from _iter_json_array(handle)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _parse_time(record: dict[str, Any], key: str) -> Optional[datetime]:
+    raw = record.get(key)
+    if raw in (None, ""):
+        return None
+    try:
+        return ensure_utc(datetime.fromisoformat(str(raw).replace("Z", "+00:00")))
+    except ValueError:
+        raise ImportRowError(f"{key} is not an ISO-8601 timestamp")
+
+
+def record_to_row(record: Any) -> dict[str, Any]:
+    """Validate one source record and map it onto ``Log`` columns.
+
+    Records without an ``id`` get one derived from their content, so running
+    the same import twice never duplicates logs. A record with a
+    ``deleted_at_server`` (as written by ``export --include-deleted``) comes
+    back as a tombstone.
+    """
+    if not isinstance(record, dict):
+        raise ImportRowError("Expected an object per log")
+    start_at = _parse_time(record, "start_at")
+    if start_at is None:
+        raise ImportRowError("start_at is required")
+    end_at = _parse_time(record, "end_at")
+    error = validate_log_times(start_at, end_at)
+    if error:
+        raise ImportRowError(error)
+    deleted = _parse_time(record, "deleted_at_server") is not None
+    note = record.get("note") or None
+    log_id = record.get("id")
+    if not log_id:
+        end_iso = format_iso(end_at) if end_at else ""
+        content_key = f"{format_iso(start_at)}|{end_iso}|{note or ''}"
+        log_id = uuid5(IMPORT_ID_NAMESPACE, content_key)
+    return {
+        "id": str(log_id),
+        "start_at": start_at,
+        "end_at": end_at,
+        "note": note,
+        "deleted": deleted,
+    }
+
+
+def _stamp(row: dict[str, Any], server_time: datetime) -> dict[str, Any]:
+    # Tombstones take the batch stamp as their deletion time, as pushed
+    # deletes do.
+    values = {key: value for key, value in row.items() if key != "deleted"}
+    values["updated_at_server"] = server_time
+    values["deleted_at_server"] = server_time if row["deleted"] else None
+    return values
+
+
+def _source_fingerprint(path: Path) -> dict[str, Any]:
+    stat = path.stat()
+    return {
+        "source": str(path.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def load_checkpoint(checkpoint: Path, source: Path) -> int:
+    """Return how many source records a previous run already committed."""
+    if not checkpoint.is_file():
+        return 0
+    state = json.loads(checkpoint.read_text(encoding="utf-8"))
+    fingerprint = _source_fingerprint(source)
+    if any(state.get(key) != value for key, value in fingerprint.items()):
+        raise ValueError(
+            f"Checkpoint {checkpoint} belongs to a different or modified source"
+        )
+    return int(state["processed"])
+
+
+def save_checkpoint(checkpoint: Path, source: Path, processed: int) -> None:
+    state = {**_source_fingerprint(source), "processed": processed}
+    tmp_path = checkpoint.with_name(checkpoint.name + ".tmp")
+    tmp_path.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp_path, checkpoint)
+
+
+def default_checkpoint_path(source: Path) -> Path:
+    return source.with_name(source.name + ".import-checkpoint.json")
+
+
+def import_logs(
+    engine: Engine,
+    source: Path,
+    *,
+    fmt: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    checkpoint: Optional[Path] = None,
+    max_errors: int = 20,
+    data_version: Optional[AnyDataVersion] = None,
+) -> ImportReport:
+    """Stream ``source`` into ``Log`` in transactional batches.
+
+    Each batch commits with a fresh ``updated_at_server`` so devices pick the
+    rows up through ``/sync/pull``. Progress is checkpointed after every commit;
+    rerunning after a failure resumes from the last committed batch. Invalid
+    records are skipped and reported. ``data_version`` is bumped after each
+    commit so running servers drop cached pull pages.
+    """
+    fmt = fmt or detect_format(source)
+    checkpoint = checkpoint or default_checkpoint_path(source)
+    report = ImportReport(resumed_from=load_checkpoint(checkpoint, source))
+
+    batch: dict[str, dict[str, Any]] = {}
+
+    def flush() -> None:
+        if batch:
+            with Session(engine) as session:
+                # Stamped under the write lock, like pushes, so pulls see it.
+                begin_write(session)
+                server_time = next_server_time(session, utc_now())
+                rows = [_stamp(row, server_time) for row in batch.values()]
+                written = insert_new_logs(session, rows)
+                session.commit()
+            if data_version is not None and written:
+                data_version.bump()
+            report.attempted += len(rows)
+            report.written += written
+            batch.clear()
+        save_checkpoint(checkpoint, source, report.processed)
+
+    newline = "" if fmt == "csv" else None
+    with source.open("r", encoding="utf-8", newline=newline) as handle:
+        for index, record in enumerate(iter_source_records(handle, fmt), start=1):
+            if index <= report.resumed_from:
+                continue
+            report.processed = index
+            try:
+                if isinstance(record, ImportRowError):
+                    raise record
+                row = record_to_row(record)
+            except ImportRowError as exc:
+                report.invalid += 1
+                if len(report.errors) < max_errors:
+                    report.errors.append(f"record {index}: {exc}")
+                continue
+            batch[row["id"]] = row
+            if len(batch) >= batch_size:
+                flush()
+        report.processed = max(report.processed, report.resumed_from)
+        flush()
+
+    checkpoint.unlink(missing_ok=True)
+    return report
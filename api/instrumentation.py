@@ -0,0 +1,102 @@
+"""Per-request SQL statement counting and timing via SQLAlchemy engine events."""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger("api.queries")
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    statements: list[str] = field(default_factory=list)
+    record_statements: bool = False
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "wildlings_query_stats", default=None
+)
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("wildlings_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get("wildlings_query_started")
+    if not started:
+        return
+    stats.count += 1
+    stats.total_ms += (time.perf_counter() - started.pop()) * 1000
+    if stats.record_statements:
+        stats.statements.append(statement)
+
+
+def install_query_instrumentation() -> None:
+    """Listen on every engine; idle unless a ``count_queries`` block is active."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+@contextmanager
+def count_queries(record_statements: bool = False) -> Iterator[QueryStats]:
+    """Count statements executed in this context, including threadpool work."""
+    install_query_instrumentation()
+    stats = QueryStats(record_statements=record_statements)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+class QueryCountMiddleware:
+    """Adds ``X-Query-Count``/``X-Query-Time-Ms`` headers and a debug log line."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Query-Count"] = str(stats.count)
+                    headers["X-Query-Time-Ms"] = f"{stats.total_ms:.3f}"
+                    logger.debug(
+                        "%s %s: %d queries in %.3f ms",
+                        scope["method"],
+                        scope["path"],
+                        stats.count,
+                        stats.total_ms,
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
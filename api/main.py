@@ -1,22 +1,140 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
-from typing import Any, cast
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, cast
 
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+import anyio
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import OperationalError
+
+from api.admission import AdmissionController
+from api.cache import DataVersion, PullPageCache, create_data_version
+from api.capture import CaptureMiddleware
+from api.db import (
+    dispose_engine,
+    get_database_url,
+    get_engine,
+    is_lock_conflict,
+    sqlite_database_path,
+)
+from api.idempotency import AppliedOpCache
+from api.instrumentation import QueryCountMiddleware, install_query_instrumentation
+from api.maintenance import MaintenanceScheduler
+from api.profiling import ProfilingMiddleware
+from api.routes.admin import router as admin_router
 from api.routes.sync import router as sync_router
-from api.settings import load_settings
+from api.settings import Settings, load_settings
+from api.static import IndexPage, PrecompressedStaticFiles
+from api.tenants import TenantMiddleware, TenantPool
+
+
+logger = logging.getLogger("api.startup")
+
+
+def _startup(settings: Settings) -> dict[str, Any]:
+    """Migrate if asked, then open the engine and one connection; return timings."""
+    timings: dict[str, Any] = {}
+    started = time.perf_counter()
+    if settings.migrate_on_startup:
+        from api.migrate import ensure_schema
+
+        result = ensure_schema()
+        timings["migrate_ms"] = round(result.elapsed_ms, 1)
+        timings["migrated"] = result.upgraded
+        timings["schema_revision"] = ",".join(result.head)
+
+    engine_started = time.perf_counter()
+    with get_engine().connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+    timings["engine_ms"] = round((time.perf_counter() - engine_started) * 1000, 1)
+    timings["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
+
+
+def _seed_applied_ops(applied_ops: AppliedOpCache) -> None:
+    started = time.perf_counter()
+    applied_ops.seed(get_engine())
+    logger.info(
+        "applied-op filter seeded in %.0f ms", (time.perf_counter() - started) * 1000
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    timings = _startup(app.state.settings)
+    timings["create_app_ms"] = app.state.startup["create_app_ms"]
+    app.state.startup = timings
+    logger.info("startup %s", timings)
+    # Off the startup path: until it finishes, unknown ops are simply probed.
+    seeding = asyncio.create_task(
+        anyio.to_thread.run_sync(_seed_applied_ops, app.state.applied_ops)
+    )
+    maintenance: MaintenanceScheduler | None = app.state.maintenance
+    upkeep = asyncio.create_task(maintenance.run_forever()) if maintenance else None
+    try:
+        yield
+    finally:
+        if upkeep is not None:
+            upkeep.cancel()
+            try:
+                await upkeep
+            except asyncio.CancelledError:
+                pass
+            maintenance.release_lock()
+        # A long seed would otherwise hold shutdown until the scan finishes.
+        app.state.applied_ops.stop_seeding()
+        await seeding
+        if app.state.tenants is not None:
+            app.state.tenants.close()
+        dispose_engine()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Wildlings API")
-    app.state.settings = load_settings()
+    created = time.perf_counter()
+    app = FastAPI(title="Wildlings API", lifespan=lifespan)
+    app.state.settings = settings = load_settings()
+    app.state.data_version = data_version = create_data_version(settings)
+    app.state.pull_cache = PullPageCache(
+        # Without a shared version, writes from other processes (workers or
+        # ``import``) would go unnoticed, so cached pages could go stale.
+        max_entries=(
+            0
+            if isinstance(data_version, DataVersion)
+            else settings.pull_cache_max_entries
+        ),
+        max_bytes=settings.pull_cache_max_bytes,
+    )
+    app.state.applied_ops = AppliedOpCache(
+        max_entries=settings.applied_op_cache_entries,
+        filter_capacity=settings.applied_op_filter_capacity,
+    )
+    app.state.admission = AdmissionController(
+        max_concurrent=settings.sync_max_concurrent_writes,
+        max_queued=settings.sync_max_queued_writes,
+        queue_timeout_s=settings.sync_write_queue_timeout_ms / 1000,
+        retry_after_s=settings.sync_retry_after_s,
+    )
+    database_path = sqlite_database_path(get_database_url())
+    app.state.maintenance = (
+        MaintenanceScheduler(
+            database_path,
+            admission=app.state.admission,
+            checkpoint_interval_s=settings.maintenance_checkpoint_s,
+            analyze_interval_s=settings.maintenance_analyze_s,
+            vacuum_interval_s=settings.maintenance_vacuum_s,
+            vacuum_pages=settings.maintenance_vacuum_pages,
+        )
+        if database_path
+        else None
+    )
 
     allow_origins = [
         origin.strip()
@@ -28,10 +146,47 @@ def create_app() -> FastAPI:
         allow_origins=allow_origins,
         allow_credentials=False,
         allow_methods=["GET", "POST"],
-        allow_headers=["Content-Type", "X-Internal-Token"],
+        allow_headers=["Content-Type", "X-Internal-Token", "X-Tenant-Id"],
+        expose_headers=["Retry-After"],
     )
+    app.state.tenants = None
+    if settings.tenant_database_url:
+        app.state.tenants = TenantPool(
+            settings.tenant_database_url, settings, max_open=settings.tenant_pool_size
+        )
+        app.add_middleware(cast(Any, TenantMiddleware), pool=app.state.tenants)
+
+    install_query_instrumentation()
+    if settings.debug_query_headers:
+        app.add_middleware(cast(Any, QueryCountMiddleware))
+    if settings.profiling_enabled:
+        app.add_middleware(
+            cast(Any, ProfilingMiddleware),
+            directory=settings.profile_dir,
+            sample_rate=settings.profile_sample_rate,
+            slow_ms=settings.profile_slow_ms,
+            max_files=settings.profile_max_files,
+        )
+    if settings.capture_dir:
+        app.add_middleware(
+            cast(Any, CaptureMiddleware),
+            directory=settings.capture_dir,
+            max_bytes=settings.capture_max_bytes,
+            max_files=settings.capture_max_files,
+        )
+
+    @app.exception_handler(OperationalError)
+    async def database_busy(request: Request, exc: OperationalError):
+        if not is_lock_conflict(exc):
+            raise exc
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Database busy, retry later"},
+            headers={"Retry-After": str(app.state.admission.retry_after())},
+        )
 
     app.include_router(sync_router)
+    app.include_router(admin_router)
 
     static_dir = os.getenv("STATIC_DIR")
     if static_dir:
@@ -42,23 +197,36 @@ def create_app() -> FastAPI:
         if assets_path.is_dir():
             app.mount(
                 "/assets",
-                StaticFiles(directory=assets_path),
+                PrecompressedStaticFiles(directory=assets_path),
                 name="assets",
             )
 
         if index_file.is_file():
+            index_page = IndexPage(index_file)
+            # Top-level build output (service worker, manifest, icons) is served
+            # as files; every other path falls through to the SPA shell.
+            root_files = PrecompressedStaticFiles(directory=static_path)
+            root_names = {
+                entry.name
+                for entry in static_path.iterdir()
+                if entry.is_file()
+                and entry.name != "index.html"
+                and not entry.name.endswith((".br", ".gz"))
+            }
 
             @app.get("/", include_in_schema=False)
-            async def serve_index() -> FileResponse:
-                return FileResponse(index_file)
+            async def serve_index(request: Request) -> Response:
+                return index_page.response(request.headers)
 
             @app.get("/{full_path:path}", include_in_schema=False)
-            async def spa_fallback(full_path: str) -> FileResponse:
-                if full_path.startswith("sync"):
+            async def spa_fallback(request: Request, full_path: str) -> Response:
+                if full_path.startswith(("sync", "admin")):
                     raise HTTPException(status_code=404, detail="Not Found")
-                return FileResponse(index_file)
+                if full_path in root_names:
+                    return await root_files.get_response(full_path, request.scope)
+                return index_page.response(request.headers)
 
+    app.state.startup = {
+        "create_app_ms": round((time.perf_counter() - created) * 1000, 1)
+    }
     return app
-
-
-app = create_app()
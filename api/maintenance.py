@@ -0,0 +1,206 @@
+"""Periodic SQLite upkeep: WAL checkpoints, planner statistics, incremental vacuum.
+
+In WAL mode the ``-wal`` file only shrinks when a checkpoint truncates it,
+planner statistics are never gathered unless asked for, and pages freed by deletes
+stay in the file without ``auto_vacuum``. ``MaintenanceScheduler`` runs each
+step on its own interval from the app's event loop, waits for the write
+admission queue to drain first, and uses its own connection with a short busy
+timeout so a step gives up rather than holding writers back. Only one process
+per database file runs maintenance (``flock`` on ``<db>-maintenance.lock``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Optional
+
+import anyio
+
+from api.admission import AdmissionController
+from api.time import format_iso, utc_now
+
+
+IDLE_POLL_S = 0.05
+STEP_BUSY_TIMEOUT_MS = 100
+
+logger = logging.getLogger("api.maintenance")
+
+
+def checkpoint(connection: sqlite3.Connection) -> dict[str, Any]:
+    busy, wal_pages, checkpointed = connection.execute(
+        "PRAGMA wal_checkpoint(TRUNCATE)"
+    ).fetchone()
+    return {"busy": bool(busy), "wal_pages": wal_pages, "checkpointed": checkpointed}
+
+
+def analyze(connection: sqlite3.Connection, analysis_limit: int) -> dict[str, Any]:
+    # ``PRAGMA optimize`` only looks at tables queried on the same connection
+    # before SQLite 3.46, which a short-lived maintenance connection never has;
+    # a sampled ANALYZE bounds the cost the same way on every version.
+    connection.executescript(
+        f"PRAGMA analysis_limit={int(analysis_limit)}; ANALYZE; PRAGMA optimize;"
+    )
+    tables = connection.execute("SELECT COUNT(DISTINCT tbl) FROM sqlite_stat1")
+    return {"tables": tables.fetchone()[0], "analysis_limit": analysis_limit}
+
+
+def incremental_vacuum(
+    connection: sqlite3.Connection, max_pages: int
+) -> dict[str, Any]:
+    mode = connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+    free_before = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    if mode != 2:
+        # Needs a one-off VACUUM to switch; see ``python -m api.cli maintenance``.
+        return {"skipped": "auto_vacuum is not INCREMENTAL", "free_pages": free_before}
+    # ``execute`` would step the pragma once, freeing a single page.
+    connection.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+    free_after = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    return {"freed_pages": free_before - free_after, "free_pages": free_after}
+
+
+def enable_incremental_vacuum(connection: sqlite3.Connection) -> dict[str, Any]:
+    """Switch an existing database to ``auto_vacuum=INCREMENTAL`` (rewrites it)."""
+    connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    connection.execute("VACUUM")
+    return {"auto_vacuum": connection.execute("PRAGMA auto_vacuum").fetchone()[0]}
+
+
+@dataclass
+class StepReport:
+    runs: int = 0
+    failures: int = 0
+    last_started_at: Optional[str] = None
+    last_duration_ms: Optional[float] = None
+    last_result: Optional[dict[str, Any]] = None
+    last_error: Optional[str] = None
+
+
+@dataclass
+class Step:
+    name: str
+    interval_s: float
+    run: Callable[[sqlite3.Connection], dict[str, Any]]
+    next_due: float = 0.0
+
+
+class MaintenanceScheduler:
+    def __init__(
+        self,
+        database_path: str,
+        admission: Optional[AdmissionController] = None,
+        checkpoint_interval_s: float = 300,
+        analyze_interval_s: float = 6 * 3600,
+        analysis_limit: int = 1000,
+        vacuum_interval_s: float = 24 * 3600,
+        vacuum_pages: int = 1000,
+        max_defer_s: float = 30.0,
+    ):
+        self.database_path = database_path
+        self.admission = admission
+        self.max_defer_s = max_defer_s
+        self.steps = [
+            step
+            for step in (
+                Step("checkpoint", checkpoint_interval_s, checkpoint),
+                Step(
+                    "analyze",
+                    analyze_interval_s,
+                    lambda connection: analyze(connection, analysis_limit),
+                ),
+                Step(
+                    "incremental_vacuum",
+                    vacuum_interval_s,
+                    lambda connection: incremental_vacuum(connection, vacuum_pages),
+                ),
+            )
+            if step.interval_s > 0
+        ]
+        self.reports = {step.name: StepReport() for step in self.steps}
+        self._lock_fd: Optional[int] = None
+
+    def acquire_lock(self) -> bool:
+        """Become this database's maintenance process; ``False`` if another is."""
+        import fcntl
+
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(f"{self.database_path}-maintenance.lock", os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def release_lock(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def run_step(self, step: Step) -> StepReport:
+        """Run one step now on a fresh connection; blocking."""
+        report = self.reports[step.name]
+        report.runs += 1
+        report.last_started_at = format_iso(utc_now())
+        started = time.perf_counter()
+        connection = sqlite3.connect(
+            self.database_path,
+            timeout=STEP_BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+        )
+        try:
+            report.last_result = step.run(connection)
+            report.last_error = None
+        except sqlite3.Error as exc:
+            report.failures += 1
+            report.last_result = None
+            report.last_error = str(exc)
+            logger.warning("maintenance step %s failed: %s", step.name, exc)
+        finally:
+            connection.close()
+            report.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        return report
+
+    async def wait_for_idle_writes(self) -> None:
+        if self.admission is None:
+            return
+        deadline = time.monotonic() + self.max_defer_s
+        while not self.admission.idle and time.monotonic() < deadline:
+            await asyncio.sleep(IDLE_POLL_S)
+
+    async def run_due(self, now: Optional[float] = None) -> list[str]:
+        now = time.monotonic() if now is None else now
+        ran = []
+        for step in self.steps:
+            if step.next_due > now:
+                continue
+            await self.wait_for_idle_writes()
+            await anyio.to_thread.run_sync(self.run_step, step)
+            step.next_due = time.monotonic() + step.interval_s
+            ran.append(step.name)
+        return ran
+
+    async def run_forever(self) -> None:
+        if not self.steps:
+            return
+        # Start one interval in so maintenance never competes with startup.
+        started = time.monotonic()
+        for step in self.steps:
+            step.next_due = started + step.interval_s
+        tick = min(step.interval_s for step in self.steps)
+        while True:
+            await asyncio.sleep(max(tick, 1.0))
+            if self.acquire_lock():
+                await self.run_due()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "active": self._lock_fd is not None,
+            "steps": {name: asdict(report) for name, report in self.reports.items()},
+        }
@@ -0,0 +1,143 @@
+"""Bring the schema to head, skipping Alembic's env when it is already current.
+
+Checking the revision only needs the script headers and one ``SELECT`` on
+``alembic_version``; the full ``alembic upgrade head`` (which imports the models
+and configures a migration context) only runs when the database is behind.
+The app calls ``ensure_schema`` from its lifespan when ``MIGRATE_ON_STARTUP`` is
+set; ``python -m api.migrate`` runs the same check by hand.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, make_url
+
+from api.db import get_database_url, normalize_database_url, sqlite_database_path
+
+API_DIR = Path(__file__).resolve().parent
+
+
+@dataclass(frozen=True)
+class MigrationResult:
+    before: tuple[str, ...]
+    head: tuple[str, ...]
+    upgraded: bool
+    elapsed_ms: float
+
+
+def alembic_config(database_url: str) -> Config:
+    """Alembic config for ``database_url``, which wins over ``DATABASE_URL``."""
+    config = Config(str(API_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(API_DIR / "migrations"))
+    # configparser treats '%' as interpolation, e.g. in encoded passwords.
+    config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+    config.attributes["database_url"] = database_url
+    return config
+
+
+def current_revisions(database_url: str) -> tuple[str, ...]:
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            heads = MigrationContext.configure(connection).get_current_heads()
+    finally:
+        engine.dispose()
+    return tuple(sorted(heads))
+
+
+# Arbitrary constant shared by every process migrating the same Postgres database.
+POSTGRES_LOCK_KEY = 0x77696C64
+
+
+@contextmanager
+def _migration_lock(database_url: str) -> Iterator[None]:
+    """Serialize upgrades when several workers start against one database."""
+    if make_url(database_url).get_backend_name() == "postgresql":
+        engine = create_engine(database_url)
+        try:
+            with engine.connect() as connection:
+                connection.exec_driver_sql(
+                    f"SELECT pg_advisory_lock({POSTGRES_LOCK_KEY})"
+                )
+                try:
+                    yield
+                finally:
+                    connection.exec_driver_sql(
+                        f"SELECT pg_advisory_unlock({POSTGRES_LOCK_KEY})"
+                    )
+        finally:
+            engine.dispose()
+        return
+
+    path = sqlite_database_path(database_url)
+    if path is None:
+        yield
+        return
+
+    import fcntl
+
+    fd = os.open(f"{path}-migrate.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def ensure_schema(database_url: Optional[str] = None) -> MigrationResult:
+    started = time.perf_counter()
+    database_url = normalize_database_url(database_url or get_database_url())
+    config = alembic_config(database_url)
+    head = tuple(sorted(ScriptDirectory.from_config(config).get_heads()))
+
+    before = current_revisions(database_url)
+    upgraded = False
+    if before != head:
+        with _migration_lock(database_url):
+            # Another process may have finished the upgrade while we waited.
+            before = current_revisions(database_url)
+            if before != head:
+                command.upgrade(config, "head")
+                upgraded = True
+
+    return MigrationResult(
+        before=before,
+        head=head,
+        upgraded=upgraded,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m api.migrate",
+        description="Upgrade the schema to head unless it is already current.",
+    )
+    parser.add_argument(
+        "--database-url", help="Defaults to DATABASE_URL or the local SQLite file."
+    )
+    args = parser.parse_args(argv)
+
+    result = ensure_schema(args.database_url)
+    before = ",".join(result.before) or "empty"
+    head = ",".join(result.head)
+    if result.upgraded:
+        print(f"upgraded {before} -> {head} in {result.elapsed_ms:.0f} ms")
+    else:
+        print(f"schema current at {head}, checked in {result.elapsed_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
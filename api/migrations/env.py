@@ -6,16 +6,23 @@ from alembic import context
 from sqlmodel import SQLModel
 
 from api import models  # noqa: F401
+from api.db import create_db_engine, normalize_database_url
 
 
 config = context.config
 
 
 def get_url() -> str:
-    url = os.getenv("DATABASE_URL") or config.get_main_option("sqlalchemy.url")
+    # ``api.migrate.alembic_config`` passes its URL; the ``alembic`` CLI reads
+    # DATABASE_URL and falls back to the dev default in alembic.ini.
+    url = (
+        config.attributes.get("database_url")
+        or os.getenv("DATABASE_URL")
+        or config.get_main_option("sqlalchemy.url")
+    )
     if not url:
         raise RuntimeError("DATABASE_URL is not configured")
-    return url
+    return normalize_database_url(url)
 
 
 def run_migrations_offline() -> None:
@@ -32,9 +39,9 @@ def run_migrations_offline() -> None:
 
 
 def run_migrations_online() -> None:
-    from sqlalchemy import create_engine
-
-    connectable = create_engine(get_url())
+    # Same connect-time pragmas as the app, so new SQLite files are created in
+    # WAL mode with incremental auto-vacuum.
+    connectable = create_db_engine(get_url())
 
     with connectable.connect() as connection:
         context.configure(
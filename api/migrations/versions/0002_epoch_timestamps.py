@@ -0,0 +1,105 @@
+"""store log timestamps as epoch microseconds
+
+Not optional: ``Log`` only reads and writes integer columns, so this is on the
+head path and ``ensure_schema`` applies it like any other revision.
+
+Revision ID: 0002_epoch_timestamps
+Revises: 0001_init_sync_tables
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_epoch_timestamps"
+down_revision = "0001_init_sync_tables"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+TIMESTAMP_COLUMNS = ("start_at", "end_at", "updated_at_server", "deleted_at_server")
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_epoch_us(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_epoch_us(value):
+    if value is None:
+        return None
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def _log_table(name: str, column_type) -> sa.Table:
+    return sa.table(
+        name,
+        sa.column("id", sa.String()),
+        sa.column("note", sa.String()),
+        *(sa.column(column, column_type) for column in TIMESTAMP_COLUMNS),
+    )
+
+
+def _create_log_table(name: str, column_type) -> None:
+    op.create_table(
+        name,
+        sa.Column("id", sa.String(), primary_key=True, nullable=False),
+        sa.Column("start_at", column_type, nullable=False),
+        sa.Column("end_at", column_type, nullable=True),
+        sa.Column("note", sa.String(), nullable=True),
+        sa.Column("updated_at_server", column_type, nullable=False),
+        sa.Column("deleted_at_server", column_type, nullable=True),
+    )
+
+
+def _copy_logs(source: sa.Table, target: sa.Table, convert) -> None:
+    """Copy rows in primary-key order, one bounded batch at a time."""
+    bind = op.get_bind()
+    last_id = None
+    while True:
+        stmt = sa.select(source).order_by(source.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            stmt = stmt.where(source.c.id > last_id)
+        rows = bind.execute(stmt).mappings().all()
+        if not rows:
+            return
+        bind.execute(
+            target.insert(),
+            [
+                {
+                    "id": row["id"],
+                    "note": row["note"],
+                    **{column: convert(row[column]) for column in TIMESTAMP_COLUMNS},
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1]["id"]
+
+
+def _swap_log_table(source_type, target_type, convert) -> None:
+    _create_log_table("log_new", target_type)
+    _copy_logs(
+        _log_table("log", source_type), _log_table("log_new", target_type), convert
+    )
+    op.drop_table("log")
+    op.rename_table("log_new", "log")
+
+
+def upgrade() -> None:
+    _swap_log_table(sa.DateTime(timezone=True), sa.BigInteger(), _to_epoch_us)
+    op.create_index("ix_log_updated_at_server_id", "log", ["updated_at_server", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_log_updated_at_server_id", table_name="log")
+    _swap_log_table(sa.BigInteger(), sa.DateTime(timezone=True), _from_epoch_us)
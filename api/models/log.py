@@ -3,13 +3,20 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
+from api.models.types import EpochMicroseconds
+
 
 class Log(SQLModel, table=True):
+    __table_args__ = (Index("ix_log_updated_at_server_id", "updated_at_server", "id"),)
+
     id: str = Field(primary_key=True)
-    start_at: datetime
-    end_at: Optional[datetime] = None
+    start_at: datetime = Field(sa_type=EpochMicroseconds)
+    end_at: Optional[datetime] = Field(default=None, sa_type=EpochMicroseconds)
     note: Optional[str] = None
-    updated_at_server: datetime
-    deleted_at_server: Optional[datetime] = None
+    updated_at_server: datetime = Field(sa_type=EpochMicroseconds)
+    deleted_at_server: Optional[datetime] = Field(
+        default=None, sa_type=EpochMicroseconds
+    )
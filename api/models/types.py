@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+from api.time import from_epoch_us, to_epoch_us
+
+
+class EpochMicroseconds(TypeDecorator):
+    """UTC datetimes stored as integer microseconds since the Unix epoch.
+
+    Integer storage keeps keyset comparisons and index entries compact on every
+    dialect, while the model layer keeps working with aware datetimes.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    @property
+    def python_type(self) -> type:
+        return datetime
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[int]:
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return to_epoch_us(value)
+        return int(value)
+
+    def process_result_value(self, value: Any, dialect) -> Optional[datetime]:
+        if value is None:
+            return None
+        return from_epoch_us(int(value))
@@ -0,0 +1,175 @@
+"""Opt-in request profiling that dumps cProfile stats to a local directory.
+
+Only installed when ``PROFILE_DIR`` is set together with a sample rate and/or a
+latency threshold, so the disabled path costs nothing beyond one context
+variable lookup per offloaded call. Profiles combine the event-loop thread and
+any threadpool work started through ``run_profiled``.
+
+Every request is timed, but only one at a time is profiled: cProfile hooks the
+event-loop thread, which all concurrent requests share, and their event-loop
+work may appear in that profile. A sampled or slow request that overlapped
+another's profile still writes its ``.json`` record, with ``"profiled": false``
+and no ``.prof`` file, so a threshold never silently drops a slow request.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import pstats
+import random
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class RequestProfile:
+    profilers: list[cProfile.Profile] = field(default_factory=list)
+    metadata: dict[str, Any] = field(default_factory=dict)
+    # False while another request holds the profiler: only ``annotate`` applies.
+    profiling: bool = True
+
+
+_active_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "wildlings_active_profile", default=None
+)
+
+
+def annotate(**fields: Any) -> None:
+    """Attach metadata (op counts, rows returned, ...) to the active profile."""
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.metadata.update(fields)
+
+
+def _call_profiled(func: Callable[..., T], *args: Any) -> T:
+    profile = _active_profile.get()
+    if profile is None or not profile.profiling:
+        return func(*args)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ profiles through sys.monitoring, which is process-wide:
+        # the request's profiler already sees this thread.
+        return func(*args)
+    profile.profilers.append(profiler)
+    try:
+        return func(*args)
+    finally:
+        profiler.disable()
+
+
+async def run_profiled(func: Callable[..., T], *args: Any) -> T:
+    """``run_in_threadpool`` that extends an active request profile to the thread."""
+    return await run_in_threadpool(_call_profiled, func, *args)
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", value).strip("-") or "root"
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        directory: str,
+        sample_rate: float = 0.0,
+        slow_ms: int = 0,
+        max_files: int = 50,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.app = app
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.max_files = max_files
+        self.rng = rng
+        self._busy = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sampled = self.sample_rate > 0 and self.rng() < self.sample_rate
+        if not sampled and self.slow_ms <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profile = RequestProfile(profiling=not self._busy)
+        profiler: Optional[cProfile.Profile] = None
+        if profile.profiling:
+            profiler = cProfile.Profile()
+            profile.profilers.append(profiler)
+            self._busy = True
+        token = _active_profile.set(profile)
+        started = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._busy = False
+            duration_ms = (time.perf_counter() - started) * 1000
+            _active_profile.reset(token)
+
+        if sampled or duration_ms >= self.slow_ms:
+            route = scope.get("route")
+            profile.metadata.update(
+                method=scope["method"],
+                path=scope["path"],
+                route=getattr(route, "path", scope["path"]),
+                status_code=status_code,
+                duration_ms=round(duration_ms, 3),
+                reason="sampled" if sampled else "slow",
+                profiled=profile.profiling,
+                recorded_at=datetime.now(timezone.utc).isoformat(),
+            )
+            await run_in_threadpool(self._dump, profile)
+
+    def _dump(self, profile: RequestProfile) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        metadata = profile.metadata
+        stem = "{}-{}-{}-{}ms".format(
+            datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ"),
+            metadata["method"].lower(),
+            _slug(metadata["route"]),
+            int(metadata["duration_ms"]),
+        )
+        if profile.profilers:
+            stats = pstats.Stats(profile.profilers[0])
+            for extra in profile.profilers[1:]:
+                stats.add(extra)
+            stats.dump_stats(self.directory / f"{stem}.prof")
+        (self.directory / f"{stem}.json").write_text(
+            json.dumps(metadata, indent=2, default=str), encoding="utf-8"
+        )
+        self._rotate()
+
+    def _rotate(self) -> None:
+        # Every record has a ``.json``; unprofiled ones have no ``.prof``.
+        records = sorted(self.directory.glob("*.json"), key=lambda path: path.name)
+        for stale in records[: max(len(records) - self.max_files, 0)]:
+            stale.unlink(missing_ok=True)
+            stale.with_suffix(".prof").unlink(missing_ok=True)
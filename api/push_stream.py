@@ -0,0 +1,141 @@
+"""Incremental NDJSON push bodies for ``POST /sync/push/stream``.
+
+A device with a long outbox sends one ``SyncPushStreamHeader`` line and then
+one ``SyncOp`` per line. ``read_ndjson_lines`` splits the body as it arrives.
+It holds no more than the unread tail of the current network chunk, and a line
+may not exceed ``SYNC_STREAM_MAX_LINE_BYTES``. ``read_op_chunks`` groups the
+parsed ops into sub-batches of ``SYNC_STREAM_CHUNK_OPS``. The route applies
+each sub-batch with ``apply_push`` in its own transaction and write slot, then
+writes an ack line for it. ``read_ahead`` reads and parses the next chunk
+while the current one commits, so the upload keeps moving during the write.
+Server memory then depends on the chunk size, not on the length of the
+backlog, and a dropped connection keeps every chunk that was already acked.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, Optional, TypeVar
+
+from pydantic import TypeAdapter, ValidationError
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from api.schemas import SyncOp, SyncPushStreamHeader
+
+MEDIA_TYPE = "application/x-ndjson"
+
+T = TypeVar("T")
+
+_op_adapter: TypeAdapter[SyncOp] = TypeAdapter(SyncOp)
+
+
+class PushStreamError(ValueError):
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(message if line is None else f"line {line}: {message}")
+        self.line = line
+
+
+def _first_error(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+async def read_ndjson_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int
+) -> AsyncIterator[tuple[int, bytes]]:
+    """Yield ``(line_number, line)`` for each non-blank line of ``chunks``."""
+    buffer = bytearray()
+    number = 0
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while (end := buffer.find(b"\n", start)) >= 0:
+            number += 1
+            if end - start > max_line_bytes:
+                raise PushStreamError("line too long", number)
+            line = bytes(buffer[start:end]).strip()
+            start = end + 1
+            if line:
+                yield number, line
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise PushStreamError("line too long", number + 1)
+    line = bytes(buffer).strip()
+    if line:
+        yield number + 1, line
+
+
+async def read_push_header(
+    lines: AsyncIterator[tuple[int, bytes]],
+) -> SyncPushStreamHeader:
+    try:
+        number, line = await anext(lines)
+    except StopAsyncIteration:
+        raise PushStreamError("empty body") from None
+    try:
+        return SyncPushStreamHeader.model_validate_json(line)
+    except ValidationError as exc:
+        raise PushStreamError(_first_error(exc), number) from None
+
+
+async def read_op_chunks(
+    lines: AsyncIterator[tuple[int, bytes]], chunk_ops: int
+) -> AsyncIterator[list[SyncOp]]:
+    """Group op lines into lists of at most ``chunk_ops``.
+
+    A line that does not parse ends the stream, but only after the valid ops
+    before it have been yielded, so they are still applied in order.
+    """
+    chunk: list[SyncOp] = []
+    async for number, line in lines:
+        try:
+            chunk.append(_op_adapter.validate_json(line))
+        except ValidationError as exc:
+            if chunk:
+                yield chunk
+            raise PushStreamError(_first_error(exc), number) from None
+        if len(chunk) >= max(chunk_ops, 1):
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def read_ahead(items: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Yield from ``items``, fetching the next item while this one is used.
+
+    At most one item is fetched ahead. An error raised by ``items`` is
+    re-raised only after every item before it has been yielded.
+    """
+    pending = asyncio.ensure_future(anext(items))
+    try:
+        while True:
+            try:
+                item = await pending
+            except StopAsyncIteration:
+                return
+            pending = asyncio.ensure_future(anext(items))
+            yield item
+    finally:
+        pending.cancel()
+        await asyncio.wait([pending])
+        if not pending.cancelled():
+            pending.exception()  # retrieved, so asyncio does not log it
+
+
+class PushStreamResponse(StreamingResponse):
+    """A ``StreamingResponse`` that leaves ``receive`` to the body iterator.
+
+    Starlette's version polls ``receive`` for a disconnect while it streams.
+    Here the iterator is still reading the request body from that same
+    channel, so the poll would take body messages away from it. A disconnect
+    still shows up, as ``ClientDisconnect`` from ``request.stream()`` or as a
+    failed send.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
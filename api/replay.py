@@ -0,0 +1,178 @@
+"""Re-drive captured sync traffic (see ``api.capture``) through the ASGI app.
+
+Each record is sent in-process with its original method, path, query, headers
+and body. ``app.state.now_override`` returns the instant that record was
+received, so server timestamps and cursors come out the same as in the
+capture. With ``speed=0`` records run back to back in arrival order; on a fresh
+database the responses then match the capture byte for byte, which the report
+checks through the recorded sha256. With ``speed > 0`` each request starts at
+its original offset divided by ``speed`` and may overlap others, as it did in
+production. The clock is still exact per request, but commit order, and so
+the data, can differ.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import statistics
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+import httpx
+from fastapi import FastAPI
+
+from api.capture import REDACTED, decode_body
+from api.time import from_epoch_us, utc_now
+
+
+SKIPPED_HEADERS = frozenset({"host", "content-length"})
+
+_replay_now: ContextVar[Optional[datetime]] = ContextVar(
+    "wildlings_replay_now", default=None
+)
+
+
+def _replayed_now() -> datetime:
+    return _replay_now.get() or utc_now()
+
+
+@dataclass
+class RouteTiming:
+    requests: int = 0
+    captured_ms: list[float] = field(default_factory=list)
+    replayed_ms: list[float] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        def percentile(values: list[float], fraction: float) -> Optional[float]:
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(
+                ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 3
+            )
+
+        return {
+            "requests": self.requests,
+            "captured_p50_ms": percentile(self.captured_ms, 0.5),
+            "captured_p95_ms": percentile(self.captured_ms, 0.95),
+            "replayed_p50_ms": percentile(self.replayed_ms, 0.5),
+            "replayed_p95_ms": percentile(self.replayed_ms, 0.95),
+            "replayed_mean_ms": (
+                round(statistics.fmean(self.replayed_ms), 3)
+                if self.replayed_ms
+                else None
+            ),
+        }
+
+
+@dataclass
+class ReplayReport:
+    replayed: int = 0
+    skipped: int = 0
+    status_mismatches: int = 0
+    body_mismatches: int = 0
+    elapsed_s: float = 0.0
+    routes: dict[str, RouteTiming] = field(default_factory=dict)
+    mismatches: list[dict[str, Any]] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "replayed": self.replayed,
+            "skipped": self.skipped,
+            "status_mismatches": self.status_mismatches,
+            "body_mismatches": self.body_mismatches,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "routes": {name: timing.summary() for name, timing in self.routes.items()},
+            "mismatches": self.mismatches[:20],
+        }
+
+
+async def _send(
+    client: httpx.AsyncClient, record: dict[str, Any], report: ReplayReport
+) -> None:
+    _replay_now.set(from_epoch_us(record["received_us"]))
+    headers = {
+        name: value
+        for name, value in record["headers"].items()
+        if name not in SKIPPED_HEADERS and value != REDACTED
+    }
+    query = f"?{record['query']}" if record["query"] else ""
+    started = time.perf_counter()
+    response = await client.request(
+        record["method"],
+        f"{record['path']}{query}",
+        headers=headers,
+        content=decode_body(record),
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    timing = report.routes.setdefault(
+        f"{record['method']} {record['path']}", RouteTiming()
+    )
+    timing.requests += 1
+    timing.captured_ms.append(record["duration_ms"])
+    timing.replayed_ms.append(elapsed_ms)
+    report.replayed += 1
+
+    status_differs = response.status_code != record["status_code"]
+    body_differs = (
+        hashlib.sha256(response.content).hexdigest() != record["response_sha256"]
+    )
+    report.status_mismatches += status_differs
+    report.body_mismatches += body_differs
+    if status_differs or body_differs:
+        report.mismatches.append(
+            {
+                "seq": record["seq"],
+                "received_at": record["received_at"],
+                "path": record["path"],
+                "captured_status": record["status_code"],
+                "replayed_status": response.status_code,
+            }
+        )
+
+
+async def replay(
+    app: FastAPI, records: Iterable[dict[str, Any]], speed: float = 0.0
+) -> ReplayReport:
+    """Send ``records`` (in arrival order) to ``app`` and compare the responses."""
+    report = ReplayReport()
+    state = app.state
+    previous_override = getattr(state, "now_override", None)
+    state.now_override = _replayed_now
+    # The capture holds no credentials; the replayed app must not ask for them.
+    previous_settings = state.settings
+    state.settings = replace(previous_settings, internal_sync_token=None)
+    transport = httpx.ASGITransport(app=app)
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://replay"
+        ) as client:
+            pending: list[asyncio.Task[None]] = []
+            first_us: Optional[int] = None
+            for record in records:
+                if record.get("truncated"):
+                    report.skipped += 1
+                    continue
+                if speed <= 0:
+                    await _send(client, record, report)
+                    continue
+                if first_us is None:
+                    first_us = record["received_us"]
+                due = (record["received_us"] - first_us) / 1_000_000 / speed
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Each task copies the context, so its clock stays its own.
+                pending.append(asyncio.create_task(_send(client, record, report)))
+            await asyncio.gather(*pending)
+    finally:
+        state.now_override = previous_override
+        state.settings = previous_settings
+        report.elapsed_s = time.perf_counter() - started
+    return report
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from api.admission import AdmissionController, get_admission
+from api.cache import PullPageCache, get_pull_cache
+from api.backup import BackupError, BackupInProgressError, backup_database
+from api.db import get_database_url, get_session, lock_stats, sqlite_database_path
+from api.idempotency import AppliedOpCache, get_applied_ops
+from api.exporter import MEDIA_TYPES, export_logs
+from api.settings import Settings, get_settings
+from api.routes.sync import require_internal_token
+from api.time import ensure_utc
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/export")
+def export(
+    fmt: Literal["csv", "ndjson"] = Query(default="ndjson", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_deleted: bool = False,
+    session: Session = Depends(get_session),
+):
+    engine = session.get_bind()
+    body = export_logs(
+        engine,
+        fmt,
+        since=ensure_utc(since) if since else None,
+        until=ensure_utc(until) if until else None,
+        include_deleted=include_deleted,
+    )
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="wildlings-logs.{fmt}"'},
+    )
+
+
+@router.get("/stats")
+def stats(
+    request: Request,
+    cache: PullPageCache = Depends(get_pull_cache),
+    admission: AdmissionController = Depends(get_admission),
+    applied_ops: AppliedOpCache = Depends(get_applied_ops),
+):
+    maintenance = request.app.state.maintenance
+    return {
+        "pull_cache": cache.stats(),
+        "admission": admission.stats(),
+        "applied_ops": applied_ops.stats(),
+        "maintenance": maintenance.stats() if maintenance else None,
+        "locks": lock_stats.snapshot(),
+        "tenants": (
+            request.app.state.tenants.stats() if request.app.state.tenants else None
+        ),
+        "startup": request.app.state.startup,
+    }
+
+
+@router.post("/maintenance")
+async def run_maintenance(request: Request):
+    """Run every enabled maintenance step now, after pending writes drain."""
+    maintenance = request.app.state.maintenance
+    if maintenance is None:
+        raise HTTPException(status_code=404, detail="Maintenance needs SQLite")
+    for step in maintenance.steps:
+        await maintenance.wait_for_idle_writes()
+        await run_in_threadpool(maintenance.run_step, step)
+    return maintenance.stats()
+
+
+@router.post("/backup")
+async def backup(request: Request, settings: Settings = Depends(get_settings)):
+    """Write a verified, compressed snapshot of the SQLite file to ``BACKUP_DIR``."""
+    database_path = sqlite_database_path(get_database_url())
+    if database_path is None or not settings.backup_dir:
+        raise HTTPException(
+            status_code=404, detail="Backups need SQLite and BACKUP_DIR"
+        )
+    try:
+        result = await run_in_threadpool(
+            backup_database,
+            database_path,
+            Path(settings.backup_dir),
+            keep=settings.backup_keep,
+        )
+    except BackupInProgressError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except BackupError as exc:
+        # The snapshot failed its integrity check; nothing was kept.
+        raise HTTPException(status_code=500, detail=str(exc))
+    return asdict(result)
@@ -1,33 +1,90 @@
 from __future__ import annotations
 
+import json
+import logging
 from datetime import datetime
 from typing import Any, Optional, cast
 
-from sqlalchemy import and_, or_
-
-from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy import and_, func, or_, true
+from sqlalchemy.exc import IntegrityError
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
 from sqlmodel import Session, select
-
-from api.db import get_session
-from api.models import Log, SyncOp
+from starlette.requests import ClientDisconnect
+
+from api.admission import AdmissionController, get_admission
+from api.cache import (
+    AnyDataVersion,
+    CachedPage,
+    PullPageCache,
+    get_data_version,
+    get_pull_cache,
+)
+from api.db import (
+    begin_write,
+    get_session,
+    is_lock_conflict,
+    retry_on_lock,
+    stamps_at_commit,
+)
+from api.idempotency import AppliedOpCache, get_applied_ops
+from api.models import Log
+from api.profiling import annotate, run_profiled
+from api.push_stream import (
+    MEDIA_TYPE as STREAM_MEDIA_TYPE,
+    PushStreamError,
+    PushStreamResponse,
+    read_ahead,
+    read_ndjson_lines,
+    read_op_chunks,
+    read_push_header,
+)
 from api.schemas import (
     AppliedLog,
     AppliedLogs,
     PullChanges,
     PullLog,
+    PullPartition,
     RejectedOp,
     SyncOpDelete,
     SyncOpUpsert,
+    SyncPullPlanResponse,
     SyncPullResponse,
     SyncPushRequest,
     SyncPushResponse,
+    SyncPushStreamChunk,
+    SyncPushStreamEnd,
+    SyncPushStreamError,
 )
 from api.settings import Settings, get_settings
-from api.time import ensure_utc, format_iso, get_now
+from api.store import (
+    find_applied_op_ids,
+    insert_sync_ops,
+    next_server_time,
+    restamp_logs,
+    tombstone_logs,
+    upsert_logs,
+)
+from api.time import EPOCH, ensure_utc, format_iso, get_now
 
 
 DEFAULT_PAGE_SIZE = 100
 
+logger = logging.getLogger("api.sync")
+MAX_PAGE_SIZE = 1000
+MAX_PARTITIONS = 16
+# Handed out while nothing has been committed. A cursor at the request's clock
+# could pass a push that was stamped earlier but commits later.
+EMPTY_CURSOR = f"{format_iso(EPOCH)}|"
+
 router = APIRouter(prefix="/sync", tags=["sync"])
 
 
@@ -61,24 +118,62 @@ def validate_log_times(start_at: datetime, end_at: Optional[datetime]) -> Option
     return None
 
 
-@router.post("/push", response_model=SyncPushResponse)
-async def sync_push(
+def resolve_applied_op_ids(
+    session: Session,
+    device_id: str,
+    op_ids: list[str],
+    applied_ops: Optional[AppliedOpCache],
+) -> set[str]:
+    """Which ``op_ids`` are already applied, asking the database only when needed."""
+    if applied_ops is None:
+        return find_applied_op_ids(session, device_id, op_ids)
+    known, unknown = applied_ops.split(device_id, op_ids)
+    if unknown:
+        probed = find_applied_op_ids(session, device_id, unknown)
+        applied_ops.add(device_id, probed)
+        known |= probed
+    return known
+
+
+def apply_push(
+    session: Session,
     payload: SyncPushRequest,
-    session: Session = Depends(get_session),
-    now: datetime = Depends(get_now),
-    _token: None = Depends(require_internal_token),
-):
-    server_time = ensure_utc(now)
+    server_time: datetime,
+    data_version: AnyDataVersion,
+    applied_ops: Optional[AppliedOpCache] = None,
+) -> SyncPushResponse:
+    """Apply a push batch atomically; blocking, so run it off the event loop."""
+    try:
+        return _apply_push(session, payload, server_time, data_version, applied_ops)
+    except IntegrityError:
+        # An op this batch called new was committed meanwhile (by a concurrent
+        # retry of the same push, or another process the cache has not seen);
+        # the sync_op primary key caught it, so redo the batch against the
+        # database.
+        session.rollback()
+        if applied_ops is not None:
+            applied_ops.record_fallback()
+        return _apply_push(session, payload, server_time, data_version, None)
+
+
+def _apply_push(
+    session: Session,
+    payload: SyncPushRequest,
+    server_time: datetime,
+    data_version: AnyDataVersion,
+    applied_ops: Optional[AppliedOpCache],
+) -> SyncPushResponse:
     server_time_iso = format_iso(server_time)
 
     ack_op_ids: list[str] = []
     rejected: list[RejectedOp] = []
-    applied_logs: list[AppliedLog] = []
+
+    applied_op_ids = resolve_applied_op_ids(
+        session, payload.device_id, [op.op_id for op in payload.ops], applied_ops
+    )
 
     for op in payload.ops:
-        existing = session.get(SyncOp, (payload.device_id, op.op_id))
-        if existing:
-            ack_op_ids.append(op.op_id)
+        if op.op_id in applied_op_ids:
             continue
         if isinstance(op, SyncOpUpsert):
             error = validate_log_times(op.payload.start_at, op.payload.end_at)
@@ -90,83 +185,107 @@ async def sync_push(
     if rejected:
         return SyncPushResponse(
             server_time=server_time_iso,
-            ack_op_ids=ack_op_ids,
+            ack_op_ids=[op.op_id for op in payload.ops if op.op_id in applied_op_ids],
             rejected=rejected,
             applied=AppliedLogs(logs=[]),
             next_cursor=server_time_iso,
         )
 
+    # On Postgres the rows are written with a placeholder stamp and the write
+    # lock is held only to stamp them just before commit; SQLite takes it (and
+    # stamps) up front.
+    at_commit = stamps_at_commit(session)
+    stamp = server_time
+    if any(op.op_id not in applied_op_ids for op in payload.ops):
+        if at_commit:
+            stamp = EPOCH
+        else:
+            begin_write(session)
+            server_time = stamp = next_server_time(session, server_time)
+
+    # Fold the batch into one write per record so each upsert statement touches
+    # a row at most once; later ops for the same record win, as if applied in
+    # order.
+    log_writes: dict[str, tuple[str, dict[str, Any]]] = {}
+    sync_op_rows: list[dict[str, Any]] = []
+    # (record id, deleted) per applied op, reported once the stamp is final.
+    applied: list[tuple[str, bool]] = []
+
     for op in payload.ops:
-        existing = session.get(SyncOp, (payload.device_id, op.op_id))
-        if existing:
+        if op.op_id in applied_op_ids:
             ack_op_ids.append(op.op_id)
             continue
 
         if isinstance(op, SyncOpUpsert):
-            log = session.get(Log, op.record_id)
-            if log:
-                log.start_at = ensure_utc(op.payload.start_at)
-                log.end_at = (
-                    ensure_utc(op.payload.end_at) if op.payload.end_at else None
-                )
-                log.note = op.payload.note
-                log.updated_at_server = server_time
-                log.deleted_at_server = None
-            else:
-                log = Log(
-                    id=op.record_id,
-                    start_at=ensure_utc(op.payload.start_at),
-                    end_at=ensure_utc(op.payload.end_at) if op.payload.end_at else None,
-                    note=op.payload.note,
-                    updated_at_server=server_time,
-                    deleted_at_server=None,
-                )
-                session.add(log)
-
-            applied_logs.append(
-                AppliedLog(
-                    id=op.record_id,
-                    updated_at_server=server_time_iso,
-                    deleted_at_server=None,
-                )
+            log_writes[op.record_id] = (
+                "upsert",
+                {
+                    "id": op.record_id,
+                    "start_at": ensure_utc(op.payload.start_at),
+                    "end_at": (
+                        ensure_utc(op.payload.end_at) if op.payload.end_at else None
+                    ),
+                    "note": op.payload.note,
+                    "updated_at_server": stamp,
+                    "deleted_at_server": None,
+                },
             )
+            applied.append((op.record_id, False))
         elif isinstance(op, SyncOpDelete):
-            log = session.get(Log, op.record_id)
-            if log:
-                log.deleted_at_server = server_time
-                log.updated_at_server = server_time
+            pending = log_writes.get(op.record_id)
+            if pending and pending[0] == "upsert":
+                pending[1]["deleted_at_server"] = stamp
             else:
-                log = Log(
-                    id=op.record_id,
-                    start_at=ensure_utc(op.payload.deleted_at_local),
-                    end_at=None,
-                    note=None,
-                    updated_at_server=server_time,
-                    deleted_at_server=server_time,
+                log_writes[op.record_id] = (
+                    "tombstone",
+                    {
+                        "id": op.record_id,
+                        "start_at": ensure_utc(op.payload.deleted_at_local),
+                        "end_at": None,
+                        "note": None,
+                        "updated_at_server": stamp,
+                        "deleted_at_server": stamp,
+                    },
                 )
-                session.add(log)
-
-            applied_logs.append(
-                AppliedLog(
-                    id=op.record_id,
-                    updated_at_server=server_time_iso,
-                    deleted_at_server=server_time_iso,
-                )
-            )
-
-        session.add(
-            SyncOp(
-                device_id=payload.device_id,
-                op_id=op.op_id,
-                entity=op.entity,
-                action=op.action,
-                applied_at=server_time,
-            )
+            applied.append((op.record_id, True))
+
+        applied_op_ids.add(op.op_id)
+        sync_op_rows.append(
+            {
+                "device_id": payload.device_id,
+                "op_id": op.op_id,
+                "entity": op.entity,
+                "action": op.action,
+                "applied_at": server_time,
+            }
         )
         ack_op_ids.append(op.op_id)
 
+    # Rows go in id order so concurrent pushes to the same logs usually take
+    # their row locks in the same order; ``retry_on_lock`` reruns a deadlock.
+    writes = sorted(log_writes.items())
+    upsert_logs(session, [row for _, (kind, row) in writes if kind == "upsert"])
+    tombstone_logs(session, [row for _, (kind, row) in writes if kind == "tombstone"])
+    insert_sync_ops(session, sync_op_rows)
+    if at_commit and sync_op_rows:
+        begin_write(session)
+        server_time = next_server_time(session, server_time)
+        restamp_logs(session, log_writes.keys(), server_time)
     session.commit()
+    if sync_op_rows:
+        data_version.bump()
+        if applied_ops is not None:
+            applied_ops.add(payload.device_id, (row["op_id"] for row in sync_op_rows))
 
+    server_time_iso = format_iso(server_time)
+    applied_logs = [
+        AppliedLog(
+            id=record_id,
+            updated_at_server=server_time_iso,
+            deleted_at_server=server_time_iso if deleted else None,
+        )
+        for record_id, deleted in applied
+    ]
     return SyncPushResponse(
         server_time=server_time_iso,
         ack_op_ids=ack_op_ids,
@@ -176,6 +295,134 @@ async def sync_push(
     )
 
 
+@router.post("/push", response_model=SyncPushResponse)
+async def sync_push(
+    payload: SyncPushRequest,
+    session: Session = Depends(get_session),
+    now: datetime = Depends(get_now),
+    data_version: AnyDataVersion = Depends(get_data_version),
+    admission: AdmissionController = Depends(get_admission),
+    applied_ops: AppliedOpCache = Depends(get_applied_ops),
+    _token: None = Depends(require_internal_token),
+):
+    annotate(op_count=len(payload.ops), device_id=payload.device_id)
+    async with admission.write_slot(payload.device_id):
+        return await run_profiled(
+            retry_on_lock,
+            session,
+            apply_push,
+            payload,
+            ensure_utc(now),
+            data_version,
+            applied_ops,
+        )
+
+
+@router.post("/push/stream", response_class=PushStreamResponse)
+async def sync_push_stream(
+    request: Request,
+    session: Session = Depends(get_session),
+    now: datetime = Depends(get_now),
+    data_version: AnyDataVersion = Depends(get_data_version),
+    admission: AdmissionController = Depends(get_admission),
+    applied_ops: AppliedOpCache = Depends(get_applied_ops),
+    settings: Settings = Depends(get_settings),
+    _token: None = Depends(require_internal_token),
+):
+    """Apply an NDJSON push (header line, then one op per line) chunk by chunk.
+
+    Each chunk of ``SYNC_STREAM_CHUNK_OPS`` ops commits on its own and is
+    acked with one ``SyncPushStreamChunk`` line. The last line is a
+    ``SyncPushStreamEnd``. Once the response has started, errors are reported
+    in that line rather than in the status code. The stream stops at the
+    first malformed line, rejected chunk or shed write slot.
+    """
+    lines = read_ndjson_lines(request.stream(), settings.sync_stream_max_line_bytes)
+    try:
+        header = await read_push_header(lines)
+    except PushStreamError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    annotate(device_id=header.device_id, streamed=True)
+    server_time = ensure_utc(now)
+
+    async def acks():
+        chunks = ops = acked = 0
+        error: Optional[SyncPushStreamError] = None
+        batches = read_ahead(read_op_chunks(lines, settings.sync_stream_chunk_ops))
+        try:
+            async for batch in batches:
+                payload = SyncPushRequest(
+                    device_id=header.device_id,
+                    client_time=header.client_time,
+                    ops=batch,
+                )
+                async with admission.write_slot(header.device_id):
+                    result = await run_profiled(
+                        retry_on_lock,
+                        session,
+                        apply_push,
+                        payload,
+                        server_time,
+                        data_version,
+                        applied_ops,
+                    )
+                chunks += 1
+                ops += len(batch)
+                acked += len(result.ack_op_ids)
+                chunk = SyncPushStreamChunk(
+                    chunk=chunks, ops=len(batch), **result.model_dump()
+                )
+                yield chunk.model_dump_json() + "\n"
+                if result.rejected:
+                    # Later ops may depend on the rejected ones; stop here.
+                    error = SyncPushStreamError(
+                        status=422, detail=f"chunk {chunks} was rejected"
+                    )
+                    break
+        except Exception as exc:
+            error = _stream_error(exc, admission)
+        finally:
+            await batches.aclose()
+        end = SyncPushStreamEnd(
+            chunks=chunks, ops=ops, acked=acked, complete=error is None, error=error
+        )
+        yield end.model_dump_json() + "\n"
+
+    return PushStreamResponse(acks(), media_type=STREAM_MEDIA_TYPE)
+
+
+def _stream_error(
+    exc: Exception, admission: AdmissionController
+) -> SyncPushStreamError:
+    """The end-line error for a push stream that stopped on ``exc``.
+
+    Mirrors the status codes of ``/sync/push``; the chunks acked before the
+    error stay committed either way.
+    """
+    if isinstance(exc, PushStreamError):
+        return SyncPushStreamError(status=400, detail=str(exc), line=exc.line)
+    if isinstance(exc, HTTPException):
+        # Shed by admission control; the client resumes after Retry-After.
+        retry_after = (exc.headers or {}).get("Retry-After")
+        return SyncPushStreamError(
+            status=exc.status_code,
+            detail=str(exc.detail),
+            retry_after=int(retry_after) if retry_after else None,
+        )
+    if is_lock_conflict(exc):
+        # ``retry_on_lock`` gave up, as the ``database_busy`` handler reports.
+        return SyncPushStreamError(
+            status=503,
+            detail="Database busy, retry later",
+            retry_after=admission.retry_after(),
+        )
+    if isinstance(exc, ClientDisconnect):
+        logger.info("push stream client disconnected")
+    else:
+        logger.exception("push stream failed")
+    return SyncPushStreamError(status=500, detail="Internal Server Error")
+
+
 def serialize_log(log: Log) -> PullLog:
     return PullLog(
         id=log.id,
@@ -189,45 +436,176 @@ def serialize_log(log: Log) -> PullLog:
     )
 
 
-@router.get("/pull", response_model=SyncPullResponse)
-async def sync_pull(
-    cursor: Optional[str] = None,
-    session: Session = Depends(get_session),
-    now: datetime = Depends(get_now),
-    _token: None = Depends(require_internal_token),
-):
-    server_time = ensure_utc(now)
+def _after_cursor(log_table: Any, cursor: Optional[str]) -> Any:
+    """Keyset condition for rows strictly after ``cursor`` (``None``: all rows)."""
     cursor_dt, cursor_id = parse_cursor(cursor)
-    log_table = cast(Any, Log).__table__
+    if cursor_dt is None:
+        return true()
+    if cursor_id is None:
+        return log_table.c.updated_at_server > cursor_dt
+    return or_(
+        log_table.c.updated_at_server > cursor_dt,
+        and_(
+            log_table.c.updated_at_server == cursor_dt,
+            log_table.c.id > cursor_id,
+        ),
+    )
 
-    stmt = select(Log)
-    if cursor_dt:
-        if cursor_id:
-            stmt = stmt.where(
-                or_(
-                    log_table.c.updated_at_server > cursor_dt,
-                    and_(
-                        log_table.c.updated_at_server == cursor_dt,
-                        log_table.c.id > cursor_id,
-                    ),
-                )
-            )
-        else:
-            stmt = stmt.where(log_table.c.updated_at_server > cursor_dt)
-    stmt = stmt.order_by(log_table.c.updated_at_server, log_table.c.id).limit(
-        DEFAULT_PAGE_SIZE
+
+def _up_to_cursor(log_table: Any, until: str) -> Any:
+    """Keyset condition for rows at or before ``until``."""
+    until_dt, until_id = parse_cursor(until)
+    if until_dt is None:
+        return true()
+    if until_id is None:
+        return log_table.c.updated_at_server <= until_dt
+    return or_(
+        log_table.c.updated_at_server < until_dt,
+        and_(
+            log_table.c.updated_at_server == until_dt,
+            log_table.c.id <= until_id,
+        ),
     )
 
+
+def _row_cursor(updated_at_server: datetime, log_id: str) -> str:
+    return f"{format_iso(updated_at_server)}|{log_id}"
+
+
+def query_pull_page(
+    session: Session, cursor: Optional[str], limit: int, until: Optional[str] = None
+) -> tuple[Optional[str], bytes]:
+    """Run the keyset query for one page and serialize its ``changes`` object."""
+    log_table = cast(Any, Log).__table__
+
+    stmt = select(Log).where(_after_cursor(log_table, cursor))
+    if until:
+        stmt = stmt.where(_up_to_cursor(log_table, until))
+    stmt = stmt.order_by(log_table.c.updated_at_server, log_table.c.id).limit(limit)
+
     logs = session.exec(stmt).all()
+    annotate(rows_returned=len(logs))
 
+    next_cursor = None
     if logs:
         last_log = logs[-1]
-        next_cursor = f"{format_iso(last_log.updated_at_server)}|{last_log.id}"
-    else:
-        next_cursor = cursor or f"{format_iso(server_time)}|"
+        next_cursor = _row_cursor(last_log.updated_at_server, last_log.id)
+    changes = PullChanges(logs=[serialize_log(log) for log in logs])
+    return next_cursor, changes.model_dump_json().encode()
+
+
+def plan_pull_partitions(
+    session: Session, cursor: Optional[str], partitions: int
+) -> tuple[Optional[str], int, list[PullPartition]]:
+    """Split the changes after ``cursor`` into up to ``partitions`` keyset ranges.
+
+    The ranges are contiguous and end at a snapshot, the newest row right now.
+    A row written later, including a newer version of a row inside some range,
+    sorts after the snapshot, so an ordinary pull from the snapshot cursor picks
+    up everything the ranges miss. Counts are approximate under concurrent
+    writes; coverage is not.
+    """
+    log_table = cast(Any, Log).__table__
+    order = (log_table.c.updated_at_server, log_table.c.id)
+    after = _after_cursor(log_table, cursor)
+
+    newest = session.exec(
+        select(*order).where(after).order_by(*(c.desc() for c in order)).limit(1)
+    ).first()
+    if newest is None:
+        return None, 0, []
+    snapshot = _row_cursor(*newest)
+    up_to_snapshot = _up_to_cursor(log_table, snapshot)
+    in_range = and_(after, up_to_snapshot)
+    total = session.exec(
+        select(func.count()).select_from(log_table).where(in_range)
+    ).one()
+
+    ranges: list[PullPartition] = []
+    start, previous = cursor, 0
+    for end in sorted({index * total // partitions for index in range(1, partitions)}):
+        if end <= previous:
+            continue
+        # Resume from the previous boundary so each query skips one partition,
+        # not every row since ``cursor``.
+        row = session.exec(
+            select(*order)
+            .where(_after_cursor(log_table, start), up_to_snapshot)
+            .order_by(*order)
+            .offset(end - previous - 1)
+            .limit(1)
+        ).first()
+        if row is None:
+            break
+        until = _row_cursor(*row)
+        ranges.append(PullPartition(cursor=start, until=until, count=end - previous))
+        start, previous = until, end
+    ranges.append(
+        PullPartition(cursor=start, until=snapshot, count=max(total - previous, 0))
+    )
+    return snapshot, total, ranges
+
+
+@router.get("/pull/plan", response_model=SyncPullPlanResponse)
+async def sync_pull_plan(
+    cursor: Optional[str] = None,
+    partitions: int = Query(default=4, ge=1, le=MAX_PARTITIONS),
+    session: Session = Depends(get_session),
+    now: datetime = Depends(get_now),
+    _token: None = Depends(require_internal_token),
+):
+    server_time_iso = format_iso(ensure_utc(now))
+    snapshot, total, ranges = await run_profiled(
+        plan_pull_partitions, session, cursor, partitions
+    )
+    return SyncPullPlanResponse(
+        server_time=server_time_iso,
+        snapshot_cursor=snapshot or cursor or EMPTY_CURSOR,
+        total=total,
+        partitions=ranges,
+    )
 
-    return SyncPullResponse(
-        server_time=format_iso(server_time),
-        next_cursor=next_cursor,
-        changes=PullChanges(logs=[serialize_log(log) for log in logs]),
+
+@router.get("/pull", response_model=SyncPullResponse)
+async def sync_pull(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    until: Optional[str] = None,
+    session: Session = Depends(get_session),
+    now: datetime = Depends(get_now),
+    cache: PullPageCache = Depends(get_pull_cache),
+    data_version: AnyDataVersion = Depends(get_data_version),
+    _token: None = Depends(require_internal_token),
+):
+    server_time = ensure_utc(now)
+    page_size = limit or DEFAULT_PAGE_SIZE
+    key = (cursor or "", page_size, until or "")
+
+    # Read the version before querying so a concurrent commit invalidates the
+    # page we are about to cache rather than hiding behind it.
+    version = data_version.current()
+    page = cache.get(key, version) if cache.enabled else None
+    annotate(cache_hit=page is not None)
+    if page is None:
+        next_cursor, changes_json = await run_profiled(
+            query_pull_page, session, cursor, page_size, until
+        )
+        page = CachedPage(
+            version=version, next_cursor=next_cursor, changes_json=changes_json
+        )
+        cache.put(key, page, data_version.current())
+
+    server_time_iso = format_iso(server_time)
+    next_cursor = page.next_cursor or cursor or EMPTY_CURSOR
+    body = b"".join(
+        (
+            b'{"server_time":',
+            json.dumps(server_time_iso).encode(),
+            b',"next_cursor":',
+            json.dumps(next_cursor).encode(),
+            b',"changes":',
+            page.changes_json,
+            b"}",
+        )
     )
+    return Response(content=body, media_type="application/json")
@@ -47,6 +47,13 @@ class SyncPushRequest(BaseModel):
     ops: list[SyncOp]
 
 
+class SyncPushStreamHeader(BaseModel):
+    """First line of a ``/sync/push/stream`` body; one ``SyncOp`` per line follows."""
+
+    device_id: str
+    client_time: datetime
+
+
 class RejectedOp(BaseModel):
     op_id: str
     code: str
@@ -71,6 +78,27 @@ class SyncPushResponse(BaseModel):
     next_cursor: str
 
 
+class SyncPushStreamChunk(SyncPushResponse):
+    chunk: int
+    ops: int
+
+
+class SyncPushStreamError(BaseModel):
+    status: int
+    detail: str
+    line: int | None = None
+    retry_after: int | None = None
+
+
+class SyncPushStreamEnd(BaseModel):
+    done: Literal[True] = True
+    chunks: int
+    ops: int
+    acked: int
+    complete: bool
+    error: SyncPushStreamError | None = None
+
+
 class PullLog(BaseModel):
     id: str
     start_at: str
@@ -88,3 +116,16 @@ class SyncPullResponse(BaseModel):
     server_time: str
     next_cursor: str
     changes: PullChanges
+
+
+class PullPartition(BaseModel):
+    cursor: str | None
+    until: str
+    count: int
+
+
+class SyncPullPlanResponse(BaseModel):
+    server_time: str
+    snapshot_cursor: str
+    total: int
+    partitions: list[PullPartition]
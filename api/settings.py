@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Iterator, Optional
 
 import os
 
@@ -11,12 +12,143 @@ from fastapi import Request
 @dataclass(frozen=True)
 class Settings:
     internal_sync_token: Optional[str]
+    pull_cache_max_entries: int = 256
+    pull_cache_max_bytes: int = 8 * 1024 * 1024
+    sync_max_concurrent_writes: int = 1
+    sync_max_queued_writes: int = 64
+    sync_write_queue_timeout_ms: int = 2000
+    sync_retry_after_s: int = 2
+    sync_stream_chunk_ops: int = 1000
+    sync_stream_max_line_bytes: int = 256 * 1024
+    profile_dir: Optional[str] = None
+    profile_sample_rate: float = 0.0
+    profile_slow_ms: int = 0
+    profile_max_files: int = 50
+    debug_query_headers: bool = False
+    web_concurrency: int = 1
+    data_version_file: Optional[str] = None
+    migrate_on_startup: bool = False
+    applied_op_cache_entries: int = 65_536
+    applied_op_filter_capacity: int = 1_000_000
+    maintenance_checkpoint_s: int = 300
+    maintenance_analyze_s: int = 6 * 3600
+    maintenance_vacuum_s: int = 24 * 3600
+    maintenance_vacuum_pages: int = 1000
+    backup_dir: Optional[str] = None
+    backup_keep: int = 7
+    capture_dir: Optional[str] = None
+    capture_max_bytes: int = 64 * 1024 * 1024
+    capture_max_files: int = 10
+    tenant_database_url: Optional[str] = None
+    tenant_pool_size: int = 32
+
+    @property
+    def profiling_enabled(self) -> bool:
+        return bool(self.profile_dir) and (
+            self.profile_sample_rate > 0 or self.profile_slow_ms > 0
+        )
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    return int(raw) if raw else default
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    return float(raw) if raw else default
 
 
 def load_settings() -> Settings:
     token = os.getenv("INTERNAL_SYNC_TOKEN")
-    return Settings(internal_sync_token=token or None)
+    return Settings(
+        internal_sync_token=token or None,
+        pull_cache_max_entries=_env_int(
+            "PULL_CACHE_MAX_ENTRIES", Settings.pull_cache_max_entries
+        ),
+        pull_cache_max_bytes=_env_int(
+            "PULL_CACHE_MAX_BYTES", Settings.pull_cache_max_bytes
+        ),
+        sync_max_concurrent_writes=_env_int(
+            "SYNC_MAX_CONCURRENT_WRITES", Settings.sync_max_concurrent_writes
+        ),
+        sync_max_queued_writes=_env_int(
+            "SYNC_MAX_QUEUED_WRITES", Settings.sync_max_queued_writes
+        ),
+        sync_write_queue_timeout_ms=_env_int(
+            "SYNC_WRITE_QUEUE_TIMEOUT_MS", Settings.sync_write_queue_timeout_ms
+        ),
+        sync_retry_after_s=_env_int("SYNC_RETRY_AFTER_S", Settings.sync_retry_after_s),
+        sync_stream_chunk_ops=_env_int(
+            "SYNC_STREAM_CHUNK_OPS", Settings.sync_stream_chunk_ops
+        ),
+        sync_stream_max_line_bytes=_env_int(
+            "SYNC_STREAM_MAX_LINE_BYTES", Settings.sync_stream_max_line_bytes
+        ),
+        profile_dir=os.getenv("PROFILE_DIR") or None,
+        profile_sample_rate=_env_float(
+            "PROFILE_SAMPLE_RATE", Settings.profile_sample_rate
+        ),
+        profile_slow_ms=_env_int("PROFILE_SLOW_MS", Settings.profile_slow_ms),
+        profile_max_files=_env_int("PROFILE_MAX_FILES", Settings.profile_max_files),
+        debug_query_headers=os.getenv("DEBUG_QUERY_HEADERS", "").lower()
+        in ("1", "true", "yes"),
+        web_concurrency=_env_int("WEB_CONCURRENCY", Settings.web_concurrency),
+        data_version_file=os.getenv("DATA_VERSION_FILE") or None,
+        migrate_on_startup=os.getenv("MIGRATE_ON_STARTUP", "").lower()
+        in ("1", "true", "yes"),
+        applied_op_cache_entries=_env_int(
+            "APPLIED_OP_CACHE_ENTRIES", Settings.applied_op_cache_entries
+        ),
+        applied_op_filter_capacity=_env_int(
+            "APPLIED_OP_FILTER_CAPACITY", Settings.applied_op_filter_capacity
+        ),
+        maintenance_checkpoint_s=_env_int(
+            "MAINTENANCE_CHECKPOINT_S", Settings.maintenance_checkpoint_s
+        ),
+        maintenance_analyze_s=_env_int(
+            "MAINTENANCE_ANALYZE_S", Settings.maintenance_analyze_s
+        ),
+        maintenance_vacuum_s=_env_int(
+            "MAINTENANCE_VACUUM_S", Settings.maintenance_vacuum_s
+        ),
+        maintenance_vacuum_pages=_env_int(
+            "MAINTENANCE_VACUUM_PAGES", Settings.maintenance_vacuum_pages
+        ),
+        backup_dir=os.getenv("BACKUP_DIR") or None,
+        backup_keep=_env_int("BACKUP_KEEP", Settings.backup_keep),
+        capture_dir=os.getenv("CAPTURE_DIR") or None,
+        capture_max_bytes=_env_int("CAPTURE_MAX_BYTES", Settings.capture_max_bytes),
+        capture_max_files=_env_int("CAPTURE_MAX_FILES", Settings.capture_max_files),
+        tenant_database_url=os.getenv("TENANT_DATABASE_URL") or None,
+        tenant_pool_size=_env_int("TENANT_POOL_SIZE", Settings.tenant_pool_size),
+    )
 
 
 def get_settings(request: Request) -> Settings:
     return request.app.state.settings
+
+
+def scoped_state(request: Request) -> Any:
+    """Per-database state: the request's tenant in tenant mode, else the app."""
+    tenant = getattr(request.state, "tenant", None)
+    return tenant if tenant is not None else request.app.state
+
+
+@contextmanager
+def override_environ(**values: Optional[str]) -> Iterator[None]:
+    """Set (or, with ``None``, unset) variables while building an app in-process."""
+    previous = {name: os.environ.get(name) for name in values}
+    for name, value in values.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
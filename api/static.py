@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import re
+import stat
+from mimetypes import guess_type
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Preferred first; files are looked up as `<path><suffix>` next to the original.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# Vite emits `name-<hash>.ext` into /assets; those never change in place.
+HASHED_ASSET = re.compile(r"-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+
+def accepted_encodings(header: str | None) -> set[str]:
+    accepted: set[str] = set()
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if token == "*":
+            accepted.update(name for name, _ in ENCODINGS)
+        else:
+            accepted.add(token)
+    return accepted
+
+
+def cache_control_for(path: str) -> str:
+    return IMMUTABLE_CACHE if HASHED_ASSET.search(path) else REVALIDATE_CACHE
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that prefers `.br`/`.gz` siblings and sets cache headers."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        request_headers = Headers(scope=scope)
+        response = await self._encoded_response(path, scope, request_headers)
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["Cache-Control"] = cache_control_for(path)
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    async def _encoded_response(
+        self, path: str, scope: Scope, request_headers: Headers
+    ) -> Response | None:
+        accepted = accepted_encodings(request_headers.get("accept-encoding"))
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted or path.endswith(suffix):
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path + suffix
+            )
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                media_type=guess_type(path)[0] or "application/octet-stream",
+                headers={"Content-Encoding": encoding},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
+
+
+class IndexPage:
+    """`index.html` held in memory with a content ETag and compressed variants."""
+
+    def __init__(self, index_file: Path) -> None:
+        body = index_file.read_bytes()
+        self.etag = f'W/"{hashlib.sha256(body).hexdigest()[:20]}"'
+        self.bodies: dict[str, bytes] = {"identity": body}
+        for encoding, suffix in ENCODINGS:
+            sibling = index_file.with_name(index_file.name + suffix)
+            if sibling.is_file():
+                self.bodies[encoding] = sibling.read_bytes()
+        if "gzip" not in self.bodies:
+            self.bodies["gzip"] = gzip.compress(body, mtime=0)
+
+    def response(self, request_headers: Headers) -> Response:
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": REVALIDATE_CACHE,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request_headers.get("if-none-match", "")
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if self.etag.removeprefix("W/") in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+
+        accepted = accepted_encodings(request_headers.get("accept-encoding"))
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.bodies:
+                headers["Content-Encoding"] = encoding
+                return Response(
+                    self.bodies[encoding], media_type="text/html", headers=headers
+                )
+        return Response(
+            self.bodies["identity"], media_type="text/html", headers=headers
+        )
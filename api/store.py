@@ -0,0 +1,126 @@
+"""Dialect-native bulk writes for the sync tables."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Iterable, cast
+
+from sqlalchemy import case, func, insert, literal, select, update
+from sqlalchemy.engine import CursorResult
+from sqlmodel import Session
+
+from api.db import dialect_insert
+from api.models import Log, SyncOp
+from api.time import ensure_utc
+
+
+PROBE_CHUNK_SIZE = 500
+LOG_FIELDS = ("start_at", "end_at", "note", "updated_at_server", "deleted_at_server")
+TOMBSTONE_FIELDS = ("updated_at_server", "deleted_at_server")
+SERVER_TIME_STEP = timedelta(microseconds=1)
+
+
+def _log_table():
+    return cast(Any, Log).__table__
+
+
+def _upsert(session: Session, rows: list[dict[str, Any]], fields: Iterable[str]):
+    if not rows:
+        return
+    table = _log_table()
+    stmt = dialect_insert(session)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={field: getattr(stmt.excluded, field) for field in fields},
+    )
+    session.execute(stmt, rows)
+
+
+def next_server_time(session: Session, now: datetime) -> datetime:
+    """``now``, or one tick past the newest stamp if the clock has not passed it.
+
+    Call under ``begin_write``: stamps are then unique and increase in commit
+    order, so two writes to a record never tie on ``updated_at_server`` and a
+    clock that steps backwards cannot reorder them.
+    """
+    latest = session.execute(
+        select(func.max(_log_table().c.updated_at_server))
+    ).scalar_one_or_none()
+    if latest is not None and ensure_utc(latest) >= now:
+        return ensure_utc(latest) + SERVER_TIME_STEP
+    return now
+
+
+def upsert_logs(session: Session, rows: list[dict[str, Any]]) -> None:
+    """Insert logs, overwriting every field of rows that already exist.
+
+    Each ``id`` may appear at most once per call.
+    """
+    _upsert(session, rows, LOG_FIELDS)
+
+
+def tombstone_logs(session: Session, rows: list[dict[str, Any]]) -> None:
+    """Insert tombstones, or mark existing rows deleted keeping their fields.
+
+    Each ``id`` may appear at most once per call.
+    """
+    _upsert(session, rows, TOMBSTONE_FIELDS)
+
+
+def restamp_logs(session: Session, ids: Iterable[str], server_time: datetime) -> None:
+    """Stamp logs this transaction already wrote with ``server_time``.
+
+    Sets ``updated_at_server``, and ``deleted_at_server`` on tombstones.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    table = _log_table()
+    session.execute(
+        update(table)
+        .where(table.c.id.in_(ids))
+        .values(
+            updated_at_server=server_time,
+            deleted_at_server=case(
+                (table.c.deleted_at_server.is_(None), None),
+                else_=literal(server_time, table.c.deleted_at_server.type),
+            ),
+        )
+    )
+
+
+def find_applied_op_ids(
+    session: Session, device_id: str, op_ids: Iterable[str]
+) -> set[str]:
+    """Return which of ``op_ids`` this device has already applied."""
+    table = cast(Any, SyncOp).__table__
+    pending = list(dict.fromkeys(op_ids))
+    applied: set[str] = set()
+    for start in range(0, len(pending), PROBE_CHUNK_SIZE):
+        chunk = pending[start : start + PROBE_CHUNK_SIZE]
+        stmt = select(table.c.op_id).where(
+            table.c.device_id == device_id, table.c.op_id.in_(chunk)
+        )
+        applied.update(session.execute(stmt).scalars())
+    return applied
+
+
+def insert_sync_ops(session: Session, rows: list[dict[str, Any]]) -> None:
+    """Record applied ops; a duplicate key aborts the transaction."""
+    if rows:
+        session.execute(insert(cast(Any, SyncOp).__table__), rows)
+
+
+def insert_new_logs(session: Session, rows: list[dict[str, Any]]) -> int:
+    """Insert logs, leaving rows that already exist untouched.
+
+    Returns how many rows were actually inserted.
+    """
+    if not rows:
+        return 0
+    table = _log_table()
+    stmt = dialect_insert(session)(table).on_conflict_do_nothing(
+        index_elements=[table.c.id]
+    )
+    result = cast(CursorResult[Any], session.execute(stmt, rows))
+    return max(result.rowcount, 0)
@@ -0,0 +1,305 @@
+"""Tenant mode: one database per family, resolved per request from ``X-Tenant-Id``.
+
+Enabled by ``TENANT_DATABASE_URL``. A template with ``{tenant}`` gives every
+tenant its own database, e.g. ``sqlite:////data/tenants/{tenant}.db``, so
+SQLite writers for different families never share a file lock. A Postgres URL
+without the placeholder puts each tenant in its own schema (``tenant_<id>``)
+of that database, selected through ``search_path``.
+
+``TenantPool`` keeps at most ``TENANT_POOL_SIZE`` tenants open, least recently
+used first out. An evicted tenant is closed once the last request holding it
+has finished, so in-flight requests keep a working engine and data version.
+Each open tenant bundles the engine with the per-database state
+the app otherwise keeps on ``app.state``: pull cache, data version, applied-op
+cache and write admission. The cache budgets are split evenly across the pool
+slots. A tenant's database is created and migrated (``ensure_schema``) the
+first time it is opened. ``TenantMiddleware`` puts the tenant on
+``request.state.tenant`` for ``/sync`` requests, and the usual dependencies
+(``get_session``, ``get_pull_cache``, ...) pick it up from there.
+
+The header is trusted, like ``X-Internal-Token``: the reverse proxy in front
+must set it from its own authentication and drop any value sent by clients.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.admission import AdmissionController
+from api.cache import AnyDataVersion, DataVersion, PullPageCache, SharedDataVersion
+from api.db import create_db_engine, normalize_database_url, sqlite_database_path
+from api.idempotency import AppliedOpCache
+from api.settings import Settings
+
+
+TENANT_HEADER = "x-tenant-id"
+TENANT_PLACEHOLDER = "{tenant}"
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+logger = logging.getLogger("api.tenants")
+
+
+class TenantError(ValueError):
+    pass
+
+
+@dataclass
+class Tenant:
+    tenant_id: str
+    database_url: str
+    engine: Engine
+    pull_cache: PullPageCache
+    data_version: AnyDataVersion
+    applied_ops: AppliedOpCache
+    admission: AdmissionController
+    opened_ms: float
+    # Guarded by the pool's lock: requests holding the tenant, and whether the
+    # pool has dropped it (then the last ``release`` closes it).
+    users: int = 0
+    evicted: bool = False
+
+    def close(self) -> None:
+        self.applied_ops.stop_seeding()
+        self.engine.dispose()
+        if isinstance(self.data_version, SharedDataVersion):
+            self.data_version.close()
+
+
+def validate_tenant_id(tenant_id: Optional[str]) -> str:
+    if not tenant_id or not TENANT_ID_PATTERN.match(tenant_id):
+        raise TenantError(
+            "X-Tenant-Id must be 1-63 lowercase letters, digits, '-' or '_'"
+        )
+    return tenant_id
+
+
+def tenant_database_url(template: str, tenant_id: str) -> str:
+    """The database URL for ``tenant_id`` under ``TENANT_DATABASE_URL``."""
+    template = normalize_database_url(template)
+    if TENANT_PLACEHOLDER in template:
+        return template.replace(TENANT_PLACEHOLDER, tenant_id)
+    url = make_url(template)
+    if url.get_backend_name() != "postgresql":
+        raise TenantError(
+            "TENANT_DATABASE_URL needs a {tenant} placeholder unless it is Postgres"
+        )
+    return url.update_query_dict(
+        {"options": f"-csearch_path={tenant_schema(tenant_id)}"}
+    ).render_as_string(hide_password=False)
+
+
+def tenant_schema(tenant_id: str) -> str:
+    return "tenant_" + tenant_id.replace("-", "_")
+
+
+class TenantPool:
+    def __init__(self, template: str, settings: Settings, max_open: int = 32):
+        tenant_database_url(template, "check")  # fail at startup, not per request
+        self.template = template
+        self.settings = settings
+        self.max_open = max(max_open, 1)
+        self._tenants: OrderedDict[str, Tenant] = OrderedDict()
+        self._lock = threading.Lock()
+        self._opening: dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.opens = 0
+        self.evictions = 0
+
+    def acquire(self, tenant_id: str) -> Optional[Tenant]:
+        """An already open tenant, marked most recently used; cheap.
+
+        The caller holds it until ``release``.
+        """
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                self._tenants.move_to_end(tenant_id)
+                tenant.users += 1
+                self.hits += 1
+            return tenant
+
+    def open(self, tenant_id: str) -> Tenant:
+        """Acquire ``tenant_id``, creating and migrating it on first use; blocking."""
+        with self._lock:
+            opening = self._opening.setdefault(tenant_id, threading.Lock())
+        try:
+            with opening:
+                tenant = self.acquire(tenant_id)
+                if tenant is not None:
+                    return tenant
+                created = self._create(tenant_id)
+                with self._lock:
+                    # After a failed open, a request with a fresh opening lock
+                    # may have got here first; keep its tenant.
+                    tenant = self._tenants.setdefault(tenant_id, created)
+                    self._tenants.move_to_end(tenant_id)
+                    tenant.users += 1
+                    if tenant is created:
+                        self.opens += 1
+                    idle = self._evict()
+        finally:
+            with self._lock:
+                if self._opening.get(tenant_id) is opening:
+                    del self._opening[tenant_id]
+        if tenant is not created:
+            idle.append(created)
+        for old in idle:
+            old.close()
+        return tenant
+
+    def release(self, tenant: Tenant) -> None:
+        with self._lock:
+            tenant.users -= 1
+            idle = tenant.evicted and tenant.users == 0
+        if idle:
+            tenant.close()
+
+    def _evict(self) -> list[Tenant]:
+        """Drop tenants over ``max_open``; returns the ones nobody holds."""
+        idle = []
+        while len(self._tenants) > self.max_open:
+            old = self._tenants.popitem(last=False)[1]
+            old.evicted = True
+            self.evictions += 1
+            if old.users == 0:
+                idle.append(old)
+        return idle
+
+    def _create(self, tenant_id: str) -> Tenant:
+        started = time.perf_counter()
+        database_url = tenant_database_url(self.template, tenant_id)
+        path = sqlite_database_path(database_url)
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        elif TENANT_PLACEHOLDER not in self.template:
+            self._create_schema(tenant_schema(tenant_id))
+        from api.migrate import ensure_schema
+
+        migration = ensure_schema(database_url)
+
+        settings = self.settings
+        slots = self.max_open
+        data_version: AnyDataVersion = (
+            SharedDataVersion(f"{path}-version") if path is not None else DataVersion()
+        )
+        applied_ops = AppliedOpCache(
+            max_entries=settings.applied_op_cache_entries // slots,
+            filter_capacity=settings.applied_op_filter_capacity // slots,
+        )
+        engine = create_db_engine(database_url)
+        # Off the request path, as at startup: unseeded ops are just probed.
+        threading.Thread(
+            target=self._seed, args=(engine, applied_ops), daemon=True
+        ).start()
+        tenant = Tenant(
+            tenant_id=tenant_id,
+            database_url=database_url,
+            engine=engine,
+            pull_cache=PullPageCache(
+                # As in ``create_app``: other processes' writes need a shared
+                # version.
+                max_entries=(
+                    settings.pull_cache_max_entries // slots
+                    if isinstance(data_version, SharedDataVersion)
+                    else 0
+                ),
+                max_bytes=settings.pull_cache_max_bytes // slots,
+            ),
+            data_version=data_version,
+            applied_ops=applied_ops,
+            admission=AdmissionController(
+                max_concurrent=settings.sync_max_concurrent_writes,
+                max_queued=settings.sync_max_queued_writes,
+                queue_timeout_s=settings.sync_write_queue_timeout_ms / 1000,
+                retry_after_s=settings.sync_retry_after_s,
+            ),
+            opened_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+        logger.info(
+            "opened tenant %s in %.0f ms (migrated=%s)",
+            tenant_id,
+            tenant.opened_ms,
+            migration.upgraded,
+        )
+        return tenant
+
+    def _create_schema(self, schema: str) -> None:
+        engine = create_engine(normalize_database_url(self.template))
+        try:
+            with engine.begin() as connection:
+                connection.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        finally:
+            engine.dispose()
+
+    @staticmethod
+    def _seed(engine: Engine, applied_ops: AppliedOpCache) -> None:
+        try:
+            applied_ops.seed(engine)
+        except Exception:
+            logger.exception("seeding the applied-op filter failed")
+
+    def close(self) -> None:
+        with self._lock:
+            tenants = list(self._tenants.values())
+            self._tenants.clear()
+        for tenant in tenants:
+            tenant.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "open": len(self._tenants),
+                "max_open": self.max_open,
+                "hits": self.hits,
+                "opens": self.opens,
+                "evictions": self.evictions,
+                "tenants": list(self._tenants),
+            }
+
+
+class TenantMiddleware:
+    def __init__(self, app: ASGIApp, pool: TenantPool, path_prefix: str = "/sync"):
+        self.app = app
+        self.pool = pool
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+        raw = next(
+            (
+                value.decode("latin-1")
+                for name, value in scope["headers"]
+                if name.decode("latin-1").lower() == TENANT_HEADER
+            ),
+            None,
+        )
+        try:
+            tenant_id = validate_tenant_id(raw)
+        except TenantError as exc:
+            await JSONResponse({"detail": str(exc)}, status_code=400)(
+                scope, receive, send
+            )
+            return
+        tenant = self.pool.acquire(tenant_id)
+        if tenant is None:
+            tenant = await run_in_threadpool(self.pool.open, tenant_id)
+        scope.setdefault("state", {})["tenant"] = tenant
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.pool.release(tenant)
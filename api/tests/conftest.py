@@ -1,44 +1,125 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from contextlib import AbstractContextManager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Callable, Iterator
+from uuid import uuid4
 
+import os
 import sys
 
 import pytest
 import pytest_asyncio
+from alembic.config import Config
+from fastapi import FastAPI
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy.engine import Engine, make_url
 from sqlmodel import Session, SQLModel, create_engine
 
 ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from api.db import get_session  # noqa: E402
-from api import models  # noqa: F401,E402
+from api.db import (  # noqa: E402
+    create_db_engine,
+    get_session,
+    normalize_database_url,
+)
+from api import migrate, models  # noqa: F401,E402
+from api.instrumentation import QueryStats, count_queries  # noqa: E402
 from api.main import create_app  # noqa: E402
+from api.models import Log  # noqa: E402
+
+SEED_BASE = datetime(2025, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def database_url(monkeypatch, tmp_path) -> str:
+    """Keep ``DATABASE_URL`` (and its ``-version`` file) under ``tmp_path``."""
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    return url
 
 
 @pytest.fixture()
-def engine():
-    engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+def engine(database_url):
+    engine = create_db_engine(database_url)
     SQLModel.metadata.create_all(engine)
-    return engine
+    yield engine
+    engine.dispose()
 
 
 @pytest.fixture()
-def app(engine):
-    app = create_app()
+def database(database_url, engine) -> tuple[Path, Engine]:
+    """``(path, engine)`` for tests that also touch the SQLite file directly."""
+    return Path(make_url(database_url).database), engine
+
+
+def _seed_logs(
+    engine: Engine,
+    count: int,
+    *,
+    start: int = 0,
+    note_bytes: int = 0,
+    deleted_every: int = 0,
+) -> None:
+    with Session(engine) as session:
+        for index in range(start, start + count):
+            deleted = deleted_every and index % deleted_every == 0
+            session.add(
+                Log(
+                    id=f"log-{index:04d}",
+                    start_at=SEED_BASE + timedelta(days=index),
+                    end_at=SEED_BASE + timedelta(days=index, hours=1),
+                    note="x" * note_bytes if note_bytes else f"Note {index}",
+                    # Pairs share a timestamp so keysets must split on the id too.
+                    updated_at_server=SEED_BASE + timedelta(seconds=index // 2),
+                    deleted_at_server=SEED_BASE if deleted else None,
+                )
+            )
+        session.commit()
 
-    def get_test_session() -> Iterator[Session]:
-        with Session(engine) as session:
-            yield session
 
-    app.dependency_overrides[get_session] = get_test_session
-    app.state.now_override: Callable[[], datetime] | None = None
-    app.state.engine = engine
-    return app
+@pytest.fixture()
+def seed_logs() -> Callable[..., None]:
+    """``seed_logs(engine, n)``: commit logs ``log-0000`` onwards.
+
+    Log ``i`` starts ``i`` days after ``SEED_BASE``; ``start`` offsets the
+    ids, ``note_bytes`` pads notes and ``deleted_every`` tombstones every
+    n-th log.
+    """
+    return _seed_logs
+
+
+@pytest.fixture()
+def make_app(engine, monkeypatch) -> Callable[..., FastAPI]:
+    """``make_app(**env)``: a fresh app on ``engine``, created after ``env`` is set.
+
+    ``make_app(other_engine)`` serves another database instead.
+    """
+
+    def _make(bind: Engine | None = None, **env: str) -> FastAPI:
+        bind = bind or engine
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        app = create_app()
+
+        def get_test_session() -> Iterator[Session]:
+            with Session(bind) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_test_session
+        app.state.now_override: Callable[[], datetime] | None = None
+        app.state.engine = bind
+        return app
+
+    return _make
+
+
+@pytest.fixture()
+def app(make_app):
+    return make_app()
 
 
 @pytest_asyncio.fixture()
@@ -54,3 +135,98 @@ def fixed_time() -> Callable[[int], datetime]:
         return datetime(2026, 1, 1, 12, 0, seconds, tzinfo=timezone.utc)
 
     return _make
+
+
+def _push_payload(
+    op_count: int,
+    device_id: str | None = None,
+    *,
+    log_id: str | None = None,
+    note: str | None = None,
+) -> dict:
+    ops = []
+    for index in range(op_count):
+        record_id = log_id or str(uuid4())
+        if index % 3 == 2:
+            ops.append(
+                {
+                    "op_id": str(uuid4()),
+                    "entity": "log",
+                    "action": "delete",
+                    "record_id": record_id,
+                    "payload": {
+                        "id": record_id,
+                        "deleted_at_local": "2026-01-01T10:00:00Z",
+                    },
+                }
+            )
+            continue
+        ops.append(
+            {
+                "op_id": str(uuid4()),
+                "entity": "log",
+                "action": "upsert",
+                "record_id": record_id,
+                "payload": {
+                    "id": record_id,
+                    "start_at": "2026-01-01T09:00:00Z",
+                    "end_at": "2026-01-01T10:00:00Z",
+                    "note": note or f"Log {index}",
+                    "updated_at_local": "2026-01-01T10:00:00Z",
+                    "deleted_at_local": None,
+                    "updated_at_server": None,
+                    "deleted_at_server": None,
+                },
+            }
+        )
+    return {
+        "device_id": device_id or str(uuid4()),
+        "client_time": "2026-01-01T12:00:00Z",
+        "ops": ops,
+    }
+
+
+@pytest.fixture()
+def push_payload() -> Callable[..., dict]:
+    """``push_payload(n)``: a push of ``n`` new ops; every third is a delete.
+
+    ``log_id`` points every op at one record and ``note`` fixes its note.
+    """
+    return _push_payload
+
+
+@pytest.fixture()
+def query_counter() -> Callable[..., AbstractContextManager[QueryStats]]:
+    """``with query_counter() as stats:`` counts statements run by requests."""
+    return count_queries
+
+
+@pytest.fixture()
+def alembic_config(monkeypatch) -> Callable[[str], Config]:
+    def _make(database_url: str) -> Config:
+        monkeypatch.setenv("DATABASE_URL", database_url)
+        return migrate.alembic_config(database_url)
+
+    return _make
+
+
+@pytest.fixture()
+def postgres_url() -> Iterator[str]:
+    """A throwaway Postgres database, created per test from TEST_POSTGRES_URL."""
+    admin_url = os.getenv("TEST_POSTGRES_URL")
+    if not admin_url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+
+    url = make_url(normalize_database_url(admin_url))
+    database = f"wildlings_test_{uuid4().hex[:12]}"
+    admin_engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    with admin_engine.connect() as connection:
+        connection.exec_driver_sql(f'CREATE DATABASE "{database}"')
+    try:
+        yield url.set(database=database).render_as_string(hide_password=False)
+    finally:
+        with admin_engine.connect() as connection:
+            connection.exec_driver_sql(
+                f'DROP DATABASE IF EXISTS "{database}" WITH (FORCE)'
+            )
+        admin_engine.dispose()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from api.admission import AdmissionController
+
+
+@pytest.mark.asyncio
+async def test_writes_beyond_capacity_wait_for_a_slot():
+    admission = AdmissionController(max_concurrent=1, queue_timeout_s=1)
+    await admission.acquire("a")
+
+    waiter = asyncio.create_task(admission.acquire("b"))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    assert admission.stats()["waiting"] == 1
+
+    admission.release("a")
+    await asyncio.wait_for(waiter, 1)
+    assert admission.stats()["active"] == 1
+    admission.release("b")
+    stats = admission.stats()
+    assert (stats["admitted"], stats["queued"], stats["active"]) == (2, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline_sheds_with_retry_after():
+    admission = AdmissionController(
+        max_concurrent=1, queue_timeout_s=0.01, retry_after_s=3
+    )
+    await admission.acquire("a")
+
+    with pytest.raises(HTTPException) as excinfo:
+        await admission.acquire("b")
+
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers == {"Retry-After": "3"}
+    assert admission.stats()["shed_timeout"] == 1
+    assert admission.stats()["waiting"] == 0
+
+    admission.release("a")
+    await admission.acquire("b")
+
+
+@pytest.mark.asyncio
+async def test_device_cannot_queue_more_than_its_share():
+    admission = AdmissionController(max_concurrent=1, queue_timeout_s=1)
+    await admission.acquire("a")
+    queued = asyncio.create_task(admission.acquire("a"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException):
+        await admission.acquire("a")
+    assert admission.stats()["shed_device_busy"] == 1
+
+    admission.release("a")
+    await asyncio.wait_for(queued, 1)
+    admission.release("a")
+
+
+@pytest.mark.asyncio
+async def test_released_slot_goes_to_other_devices_first():
+    admission = AdmissionController(max_concurrent=1, queue_timeout_s=1)
+    order: list[str] = []
+
+    async def write(device_id: str) -> None:
+        async with admission.write_slot(device_id):
+            order.append(device_id)
+            await asyncio.sleep(0)
+
+    await admission.acquire("big")
+    tasks = [
+        asyncio.create_task(write("big")),
+        asyncio.create_task(write("small-1")),
+        asyncio.create_task(write("small-2")),
+    ]
+    await asyncio.sleep(0)
+    admission.release("big")
+    await asyncio.gather(*tasks)
+
+    assert order == ["small-1", "small-2", "big"]
+
+
+@pytest.mark.asyncio
+async def test_push_returns_503_when_writes_are_saturated(client, app):
+    admission = AdmissionController(max_concurrent=1, queue_timeout_s=0.01)
+    app.state.admission = admission
+    await admission.acquire("someone-else")
+
+    response = await client.post(
+        "/sync/push",
+        json={
+            "device_id": str(uuid4()),
+            "client_time": "2026-01-01T12:00:00Z",
+            "ops": [],
+        },
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
+    admission.release("someone-else")
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import gzip
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlmodel import Session, select
+
+from api import backup
+from api.backup import (
+    BackupError,
+    BackupInProgressError,
+    backup_database,
+    restore_database,
+    snapshots,
+)
+from api.cli import main as cli_main
+from api.db import create_db_engine
+from api.main import create_app
+from api.models import Log
+
+
+def test_backup_runs_alongside_writers_and_restores(database, seed_logs, tmp_path):
+    path, engine = database
+    seed_logs(engine, 2000, note_bytes=200)
+    stop = threading.Event()
+    writing = threading.Event()
+    written: list[int] = []
+
+    def writer() -> None:
+        index = 10_000
+        while not stop.is_set():
+            seed_logs(engine, 1, start=index, note_bytes=200)
+            written.append(index)
+            writing.set()
+            index += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    writing.wait(5)
+    try:
+        result = backup_database(
+            str(path), tmp_path / "backups", pages_per_step=8, step_sleep_s=0
+        )
+    finally:
+        stop.set()
+        thread.join()
+
+    snapshot = Path(result.path)
+    assert snapshot.name.endswith(".db.gz")
+    with gzip.open(snapshot, "rb") as handle:
+        assert handle.read(16) == b"SQLite format 3\x00"
+
+    engine.dispose()
+    previous = restore_database(snapshot, str(path))
+    assert previous == path.with_name(f"{path.name}.pre-restore")
+
+    restored = create_db_engine(f"sqlite:///{path}")
+    try:
+        with Session(restored) as session:
+            ids = set(session.exec(select(Log.id)).all())
+    finally:
+        restored.dispose()
+    assert {f"log-{index:04d}" for index in range(2000)} <= ids
+    with sqlite3.connect(previous) as connection:
+        kept = connection.execute("SELECT COUNT(*) FROM log").fetchone()[0]
+    assert kept == 2000 + len(written)
+
+
+def test_backups_rotate_and_do_not_overlap(database, seed_logs, tmp_path):
+    path, engine = database
+    seed_logs(engine, 10)
+    directory = tmp_path / "backups"
+
+    results = [backup_database(str(path), directory, keep=2) for _ in range(3)]
+
+    assert [snapshot.name for snapshot in snapshots(directory)] == [
+        Path(result.path).name for result in results[1:]
+    ]
+    assert results[2].pruned == [Path(results[0].path).name]
+    assert not list(directory.glob(".*"))
+
+    with backup._backup_lock:
+        with pytest.raises(BackupInProgressError):
+            backup_database(str(path), directory)
+
+
+def test_cli_backup_and_restore(database, seed_logs, tmp_path, capsys):
+    path, engine = database
+    seed_logs(engine, 5)
+    url = f"sqlite:///{path}"
+    directory = tmp_path / "backups"
+
+    assert (
+        cli_main(["--database-url", url, "backup", "--directory", str(directory)]) == 0
+    )
+    snapshot = snapshots(directory)[0]
+    seed_logs(engine, 5, start=5)
+    engine.dispose()
+
+    assert cli_main(["--database-url", url, "restore", str(snapshot)]) == 0
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM log").fetchone()[0] == 5
+    assert "previous database kept at" in capsys.readouterr().out
+
+
+async def _post_backup():
+    transport = ASGITransport(app=create_app())
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/admin/backup")
+
+
+@pytest.mark.asyncio
+async def test_admin_backup_endpoint(database, seed_logs, tmp_path, monkeypatch):
+    path, engine = database
+    seed_logs(engine, 3)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{path}")
+
+    response = await _post_backup()
+    assert response.status_code == 404
+
+    monkeypatch.setenv("BACKUP_DIR", str(tmp_path / "backups"))
+    response = await _post_backup()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert Path(body["path"]).is_file()
+    assert body["compressed_bytes"] < body["database_bytes"]
+
+    with backup._backup_lock:
+        response = await _post_backup()
+    assert response.status_code == 409
+
+    def corrupt(path):
+        raise BackupError(f"integrity_check failed for {path}: page 2 is bad")
+
+    monkeypatch.setattr(backup, "_verify", corrupt)
+    response = await _post_backup()
+    assert response.status_code == 500
+    assert "integrity_check failed" in response.json()["detail"]
+    assert len(snapshots(tmp_path / "backups")) == 1
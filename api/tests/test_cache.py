@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlmodel import Session
+
+from api.cache import CachedPage, PullPageCache
+from api.models import Log
+
+
+def make_page(version: int, size: int = 10) -> CachedPage:
+    return CachedPage(version=version, next_cursor=None, changes_json=b"x" * size)
+
+
+def test_pull_cache_evicts_least_recently_used_by_count_and_bytes():
+    cache = PullPageCache(max_entries=2, max_bytes=25)
+    cache.put("a", make_page(0), 0)
+    cache.put("b", make_page(0), 0)
+    assert cache.get("a", 0) is not None
+    cache.put("c", make_page(0), 0)
+
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) is not None
+    cache.put("d", make_page(0, size=20), 0)
+
+    stats = cache.stats()
+    assert stats["evictions"] == 3
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 20
+
+
+def test_pull_cache_never_serves_or_stores_stale_versions():
+    cache = PullPageCache()
+    cache.put("a", make_page(1), 1)
+    assert cache.get("a", 2) is None
+    assert cache.stats()["stale"] == 1
+
+    cache.put("b", make_page(1), current_version=2)
+    assert cache.get("b", 1) is None
+    assert cache.stats()["stores"] == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_pulls_skip_the_database(
+    client, app, engine, fixed_time, monkeypatch
+):
+    with Session(engine) as session:
+        session.add(
+            Log(
+                id="log-1",
+                start_at=datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc),
+                note="Cached",
+                updated_at_server=datetime(2026, 1, 1, 10, 0, tzinfo=timezone.utc),
+            )
+        )
+        session.commit()
+
+    app.state.now_override = lambda: fixed_time(1)
+    first = await client.get("/sync/pull", params={"limit": 10})
+
+    def fail_query(*_args, **_kwargs):
+        raise AssertionError("pull page should be served from cache")
+
+    monkeypatch.setattr("api.routes.sync.query_pull_page", fail_query)
+    app.state.now_override = lambda: fixed_time(2)
+    second = await client.get("/sync/pull", params={"limit": 10})
+
+    assert second.status_code == 200
+    assert second.json()["changes"] == first.json()["changes"]
+    assert second.json()["server_time"] == "2026-01-01T12:00:02Z"
+
+    response = await client.get("/admin/stats")
+    assert response.json()["pull_cache"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_push_invalidates_cached_pull_pages(
+    client, app, fixed_time, push_payload
+):
+    log_id = str(uuid4())
+    app.state.now_override = lambda: fixed_time(1)
+    await client.post("/sync/push", json=push_payload(1, log_id=log_id, note="Before"))
+
+    response = await client.get("/sync/pull")
+    assert response.json()["changes"]["logs"][0]["note"] == "Before"
+
+    app.state.now_override = lambda: fixed_time(2)
+    await client.post("/sync/push", json=push_payload(1, log_id=log_id, note="After"))
+
+    response = await client.get("/sync/pull")
+    logs = response.json()["changes"]["logs"]
+    assert [log["note"] for log in logs] == ["After"]
+    assert response.json()["next_cursor"] == f"2026-01-01T12:00:02Z|{log_id}"
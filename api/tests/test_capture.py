@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlmodel import Session, SQLModel, select
+
+from api.capture import CaptureMiddleware, CaptureWriter, capture_files, read_capture
+from api.cli import main as cli_main
+from api.db import create_db_engine
+from api.models import Log
+from api.replay import replay
+
+TOKEN = "s3cret-token"
+
+
+async def _drive(app, push_payload) -> None:
+    headers = {"X-Internal-Token": TOKEN}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        cursor = None
+        for _ in range(3):
+            payload = push_payload(4)
+            response = await client.post("/sync/push", json=payload, headers=headers)
+            assert response.status_code == 200
+            # A replayed op and a pull that pages from the previous cursor.
+            await client.post("/sync/push", json=payload, headers=headers)
+            params = {"cursor": cursor} if cursor else {}
+            pulled = await client.get("/sync/pull", params=params, headers=headers)
+            cursor = pulled.json()["next_cursor"]
+        stats = await client.get("/admin/stats", headers=headers)
+        assert stats.status_code == 200
+
+
+def _rows(engine) -> list[tuple]:
+    with Session(engine) as session:
+        return [
+            (log.id, log.note, log.updated_at_server, log.deleted_at_server)
+            for log in session.exec(select(Log).order_by(Log.id)).all()
+        ]
+
+
+def test_capture_is_not_installed_by_default(monkeypatch, make_app):
+    monkeypatch.delenv("CAPTURE_DIR", raising=False)
+    app = make_app()
+    assert all(m.cls is not CaptureMiddleware for m in app.user_middleware)
+
+
+@pytest.mark.asyncio
+async def test_captured_traffic_replays_identically_on_a_fresh_database(
+    engine, monkeypatch, tmp_path, make_app, push_payload
+):
+    capture_dir = tmp_path / "capture"
+    app = make_app(
+        CAPTURE_DIR=str(capture_dir),
+        INTERNAL_SYNC_TOKEN=TOKEN,
+    )
+    await _drive(app, push_payload)
+
+    records = list(read_capture([capture_dir]))
+    assert len(records) == 9
+    assert {record["path"] for record in records} == {"/sync/push", "/sync/pull"}
+    assert all(
+        record["headers"]["x-internal-token"] == "[redacted]" for record in records
+    )
+    assert TOKEN not in capture_files(capture_dir)[0].read_text()
+    assert json.loads(records[0]["body"])["ops"]
+
+    monkeypatch.delenv("CAPTURE_DIR")
+    fresh = create_db_engine(f"sqlite:///{tmp_path / 'replay.db'}")
+    SQLModel.metadata.create_all(fresh)
+    try:
+        report = await replay(make_app(fresh), records)
+        assert report.replayed == 9
+        assert report.status_mismatches == 0
+        assert report.body_mismatches == 0
+        assert report.routes["POST /sync/push"].requests == 6
+        assert _rows(fresh) == _rows(engine)
+    finally:
+        fresh.dispose()
+
+
+def test_capture_files_rotate(tmp_path):
+    writer = CaptureWriter(str(tmp_path), max_bytes=200, max_files=3)
+    for index in range(20):
+        writer.write({"seq": index, "received_us": index, "body": "x" * 100})
+
+    files = capture_files(tmp_path)
+    assert len(files) == 3
+    kept = [record["seq"] for record in read_capture([tmp_path])]
+    assert kept == list(range(17, 20))
+
+
+def test_read_capture_merges_files_in_arrival_order(tmp_path):
+    # A slow request finishes (and is written) after a later one, and a
+    # request straddles a rollover into the next file.
+    arrivals = {"a": [1, 4, 3, 7], "b": [2, 5, 6]}
+    for name, received in arrivals.items():
+        path = tmp_path / f"sync-capture-{name}.ndjson"
+        path.write_text(
+            "".join(
+                json.dumps({"seq": us, "received_us": us}) + "\n" for us in received
+            ),
+            encoding="utf-8",
+        )
+
+    records = read_capture([tmp_path])
+
+    assert [record["seq"] for record in records] == list(range(1, 8))
+
+
+def test_cli_replays_into_a_scratch_database(tmp_path, capsys, make_app, push_payload):
+    capture_dir = tmp_path / "capture"
+    asyncio.run(
+        _drive(
+            make_app(CAPTURE_DIR=str(capture_dir), INTERNAL_SYNC_TOKEN=TOKEN),
+            push_payload,
+        )
+    )
+
+    assert cli_main(["replay", str(capture_dir), "--strict"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["replayed"] == 9
+    assert report["body_mismatches"] == 0
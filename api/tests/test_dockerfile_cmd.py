@@ -7,5 +7,21 @@ def test_dockerfile_runs_binaries_from_venv() -> None:
 
     assert 'ENV PATH="/app/api/.venv/bin:$PATH"' in contents
     assert "ENV PYTHONPATH=/app" in contents
-    assert "cd /app/api && alembic -c /app/api/alembic.ini upgrade head" in contents
-    assert "uvicorn api.main:app" in contents
+    assert "uvicorn --factory api.main:create_app" in contents
+
+
+def test_dockerfile_migrates_in_app_lifespan() -> None:
+    dockerfile = Path(__file__).resolve().parents[2] / "Dockerfile"
+    contents = dockerfile.read_text(encoding="utf-8")
+
+    # No separate alembic process per boot; the app checks the revision itself.
+    assert "ENV MIGRATE_ON_STARTUP=1" in contents
+    assert "alembic" not in contents.split("CMD", 1)[1]
+
+
+def test_dockerfile_configures_workers_with_shared_data_version() -> None:
+    dockerfile = Path(__file__).resolve().parents[2] / "Dockerfile"
+    contents = dockerfile.read_text(encoding="utf-8")
+
+    assert "ENV WEB_CONCURRENCY=1" in contents
+    assert "ENV DATA_VERSION_FILE=/data/wildlings.db-version" in contents
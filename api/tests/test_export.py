@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlmodel import Session, SQLModel, select
+
+from api.cli import main
+from api.db import create_db_engine
+from api.exporter import export_logs, iter_log_rows
+from api.importer import import_logs
+from api.models import Log
+
+
+def test_iter_log_rows_pages_across_chunks_and_filters(engine, seed_logs):
+    seed_logs(engine, 25, deleted_every=5)
+
+    rows = list(iter_log_rows(engine, chunk_size=4))
+    assert [row.id for row in rows] == [
+        f"log-{index:04d}" for index in range(25) if index % 5
+    ]
+
+    rows = list(iter_log_rows(engine, include_deleted=True, chunk_size=4))
+    assert len(rows) == 25
+
+    rows = list(
+        iter_log_rows(
+            engine,
+            since=datetime(2025, 3, 3, tzinfo=timezone.utc),
+            until=datetime(2025, 3, 5, tzinfo=timezone.utc),
+            include_deleted=True,
+        )
+    )
+    assert [row.id for row in rows] == ["log-0002", "log-0003"]
+
+
+@pytest.mark.asyncio
+async def test_export_endpoint_streams_ndjson_and_csv(client, engine, seed_logs):
+    seed_logs(engine, 3)
+
+    response = await client.get("/admin/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == ["log-0000", "log-0001", "log-0002"]
+    assert lines[0]["start_at"] == "2025-03-01T09:00:00Z"
+    assert lines[0]["deleted_at_server"] is None
+
+    response = await client.get("/admin/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["note"] for row in rows] == ["Note 0", "Note 1", "Note 2"]
+
+
+@pytest.mark.asyncio
+async def test_export_endpoint_requires_token(client, app):
+    app.state.settings = type(app.state.settings)(internal_sync_token="secret")
+    response = await client.get("/admin/export")
+    assert response.status_code == 403
+
+
+def test_csv_export_round_trips_through_import(engine, tmp_path, seed_logs):
+    seed_logs(engine, 4, deleted_every=3)
+    target = tmp_path / "export.csv"
+    target.write_text(
+        "".join(export_logs(engine, "csv", include_deleted=True)), encoding="utf-8"
+    )
+
+    with Session(engine) as session:
+        for index in range(4):
+            session.delete(session.get(Log, f"log-{index:04d}"))
+        session.commit()
+
+    report = import_logs(engine, target)
+    assert report.invalid == 0
+    assert report.written == 4
+    with Session(engine) as session:
+        tombstones = {
+            log.id for log in session.exec(select(Log)) if log.deleted_at_server
+        }
+    assert tombstones == {"log-0000", "log-0003"}
+
+
+def test_rows_updated_mid_export_are_emitted_once(engine, seed_logs):
+    seed_logs(engine, 6)
+    rows = iter_log_rows(engine, chunk_size=2)
+    first = [next(rows).id, next(rows).id]
+
+    with Session(engine) as session:
+        for log_id in ("log-0000", "log-0005"):
+            log = session.get(Log, log_id)
+            log.note = "edited"
+            log.updated_at_server = datetime(2026, 1, 1, tzinfo=timezone.utc)
+            session.add(log)
+        session.commit()
+
+    rest = list(rows)
+    assert first + [row.id for row in rest] == [f"log-{i:04d}" for i in range(6)]
+    assert rest[-1].note == "edited"
+
+
+def test_cli_export_writes_file(tmp_path, seed_logs):
+    database_path = tmp_path / "export.db"
+    file_engine = create_db_engine(f"sqlite:///{database_path}")
+    SQLModel.metadata.create_all(file_engine)
+    seed_logs(file_engine, 2)
+    output = tmp_path / "logs.ndjson"
+
+    exit_code = main(
+        [
+            "--database-url",
+            f"sqlite:///{database_path}",
+            "export",
+            "--output",
+            str(output),
+            "--since",
+            "2025-03-02T00:00:00Z",
+        ]
+    )
+
+    assert exit_code == 0
+    assert [json.loads(line)["id"] for line in output.read_text().splitlines()] == [
+        "log-0001"
+    ]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlmodel import Session
+
+from api.idempotency import AppliedOpCache, BloomFilter
+from api.models import Log, SyncOp
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=5_000, error_rate=0.01)
+    keys = [str(uuid4()) for _ in range(5_000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    false_positives = sum(str(uuid4()) in bloom for _ in range(5_000))
+    assert false_positives < 150
+
+
+def test_applied_op_cache_is_bounded_and_splits_ops():
+    cache = AppliedOpCache(max_entries=2, filter_capacity=1_000)
+    cache.add("device", ["a", "b", "c"])
+
+    known, unknown = cache.split("device", ["a", "b", "c", "d"])
+    assert known == {"b", "c"}
+    # Unseeded filter cannot vouch for "a" or "d", so both are probed.
+    assert unknown == {"a", "d"}
+    assert cache.stats()["entries"] == 2
+
+
+def test_seed_pages_through_sync_op_and_can_be_stopped(engine):
+    applied_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with Session(engine) as session:
+        for device in ("a", "b"):
+            for index in range(5):
+                session.add(
+                    SyncOp(
+                        device_id=device,
+                        op_id=f"op-{index}",
+                        entity="log",
+                        action="upsert",
+                        applied_at=applied_at,
+                    )
+                )
+        session.commit()
+
+    stopped = AppliedOpCache()
+    stopped.stop_seeding()
+    stopped.seed(engine, batch_size=3)
+    assert stopped.stats()["seeded"] is False
+
+    cache = AppliedOpCache()
+    cache.seed(engine, batch_size=3)
+    assert cache.stats()["seeded"] is True
+    ops = [f"op-{index}" for index in range(5)]
+    assert cache.split("b", [*ops, "op-new"]) == (set(), set(ops))
+
+
+@pytest.mark.asyncio
+async def test_fresh_ops_skip_the_probe_once_seeded(
+    client, app, engine, query_counter, push_payload
+):
+    app.state.applied_ops.seed(engine)
+
+    with query_counter(record_statements=True) as stats:
+        response = await client.post("/sync/push", json=push_payload(10))
+
+    assert len(response.json()["ack_op_ids"]) == 10
+    selects = [
+        statement
+        for statement in stats.statements
+        if statement.lstrip().upper().startswith("SELECT")
+    ]
+    # Only the watermark read is left; the applied-op probe is skipped.
+    assert not any("FROM syncop" in statement for statement in selects)
+    assert len(selects) == 1
+    assert app.state.applied_ops.stats()["probes_skipped"] == 10
+
+
+@pytest.mark.asyncio
+async def test_op_committed_elsewhere_falls_back_to_the_database(
+    client, app, engine, push_payload
+):
+    app.state.applied_ops.seed(engine)
+
+    payload = push_payload(1)
+    op = payload["ops"][0]
+    applied_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    # Another worker applied this op; this process's filter never saw it.
+    with Session(engine) as session:
+        session.add(
+            SyncOp(
+                device_id=payload["device_id"],
+                op_id=op["op_id"],
+                entity="log",
+                action=op["action"],
+                applied_at=applied_at,
+            )
+        )
+        session.commit()
+
+    response = await client.post("/sync/push", json=payload)
+
+    assert response.status_code == 200
+    assert response.json()["ack_op_ids"] == [op["op_id"]]
+    assert app.state.applied_ops.stats()["fallbacks"] == 1
+    with Session(engine) as session:
+        assert session.get(Log, op["record_id"]) is None
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlmodel import Session, SQLModel, select
+
+from api.cli import main
+from api.db import create_db_engine
+from api.importer import import_logs, save_checkpoint
+from api.models import Log
+
+
+CSV_SOURCE = """id,start_at,end_at,note
+log-1,2024-05-01T09:00:00Z,2024-05-01T10:00:00Z,Park
+log-2,2024-05-02T09:00:00Z,2024-05-02T08:00:00Z,Backwards
+,2024-05-03T09:00:00Z,,Open ended
+log-4,not-a-date,,Broken
+"""
+
+
+def test_import_csv_validates_and_stamps_server_time(engine, tmp_path):
+    source = tmp_path / "history.csv"
+    source.write_text(CSV_SOURCE, encoding="utf-8")
+
+    report = import_logs(engine, source, batch_size=2)
+
+    assert report.processed == 4
+    assert report.written == 2
+    assert report.invalid == 2
+    assert "end_at must be >= start_at" in report.errors[0]
+    assert not (tmp_path / "history.csv.import-checkpoint.json").exists()
+
+    with Session(engine) as session:
+        logs = session.exec(select(Log).order_by(Log.start_at)).all()
+    assert [log.note for log in logs] == ["Park", "Open ended"]
+    assert logs[0].start_at == datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc)
+    assert logs[1].end_at is None
+    assert all(log.updated_at_server.year >= 2026 for log in logs)
+
+    again = import_logs(engine, source)
+    assert again.attempted == 2
+    assert again.written == 0
+    with Session(engine) as session:
+        assert len(session.exec(select(Log)).all()) == 2
+
+
+def test_import_json_array_resumes_from_checkpoint(engine, tmp_path):
+    records = [
+        {"id": f"log-{index}", "start_at": f"2024-06-0{index}T09:00:00Z"}
+        for index in range(1, 6)
+    ]
+    source = tmp_path / "history.json"
+    source.write_text(json.dumps(records, indent=2), encoding="utf-8")
+    checkpoint = tmp_path / "progress.json"
+    save_checkpoint(checkpoint, source, processed=3)
+
+    report = import_logs(engine, source, checkpoint=checkpoint)
+
+    assert report.resumed_from == 3
+    assert report.written == 2
+    with Session(engine) as session:
+        ids = sorted(log.id for log in session.exec(select(Log)).all())
+    assert ids == ["log-4", "log-5"]
+
+
+def test_import_rejects_checkpoint_for_modified_source(engine, tmp_path):
+    source = tmp_path / "history.ndjson"
+    source.write_text('{"start_at": "2024-06-01T09:00:00Z"}\n', encoding="utf-8")
+    checkpoint = tmp_path / "progress.json"
+    save_checkpoint(checkpoint, source, processed=1)
+    source.write_text(
+        '{"start_at": "2024-06-01T09:00:00Z"}\n{"start_at": "2024-06-02T09:00:00Z"}\n',
+        encoding="utf-8",
+    )
+
+    with pytest.raises(ValueError, match="different or modified source"):
+        import_logs(engine, source, checkpoint=checkpoint)
+
+
+def test_import_ndjson_counts_malformed_lines_as_invalid(engine, tmp_path):
+    source = tmp_path / "history.ndjson"
+    source.write_text(
+        '{"id": "a", "start_at": "2024-06-01T09:00:00Z"}\n'
+        '{"id": "b", "start_at": \n'
+        '{"id": "c", "start_at": "2024-06-03T09:00:00Z"}\n',
+        encoding="utf-8",
+    )
+
+    report = import_logs(engine, source)
+
+    assert report.processed == 3
+    assert report.written == 2
+    assert report.invalid == 1
+    assert report.errors[0].startswith("record 2: invalid JSON")
+    with Session(engine) as session:
+        assert sorted(log.id for log in session.exec(select(Log)).all()) == ["a", "c"]
+
+
+def test_cli_import_ndjson(tmp_path, capsys):
+    database_path = tmp_path / "cli.db"
+    source = tmp_path / "history.ndjson"
+    source.write_text(
+        '{"id": "a", "start_at": "2024-06-01T09:00:00Z", "note": "Hike"}\n\n'
+        '{"id": "b", "start_at": "2024-06-02T09:00:00Z"}\n',
+        encoding="utf-8",
+    )
+    engine = create_db_engine(f"sqlite:///{database_path}")
+    SQLModel.metadata.create_all(engine)
+
+    exit_code = main(
+        ["--database-url", f"sqlite:///{database_path}", "import", str(source)]
+    )
+
+    assert exit_code == 0
+    assert "written=2" in capsys.readouterr().out
+    with Session(engine) as session:
+        assert session.get(Log, "a") is not None
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from api.admission import AdmissionController
+from api.cli import main as cli_main
+from api.main import create_app
+from api.maintenance import MaintenanceScheduler
+
+
+def _step(scheduler: MaintenanceScheduler, name: str):
+    return next(step for step in scheduler.steps if step.name == name)
+
+
+def test_checkpoint_truncates_the_wal(database, seed_logs):
+    path, engine = database
+    seed_logs(engine, 200, note_bytes=2000)
+    wal = f"{path}-wal"
+    assert os.path.getsize(wal) > 0
+
+    scheduler = MaintenanceScheduler(str(path))
+    report = scheduler.run_step(_step(scheduler, "checkpoint"))
+
+    assert report.last_error is None
+    assert report.last_result["busy"] is False
+    assert os.path.getsize(wal) == 0
+    assert report.last_duration_ms is not None
+
+
+def test_incremental_vacuum_reclaims_deleted_pages(database, seed_logs):
+    path, engine = database
+    seed_logs(engine, 300, note_bytes=2000)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM log")
+    scheduler = MaintenanceScheduler(str(path), vacuum_pages=10_000)
+    scheduler.run_step(_step(scheduler, "checkpoint"))
+
+    report = scheduler.run_step(_step(scheduler, "incremental_vacuum"))
+
+    assert report.last_result["freed_pages"] > 0
+    assert report.last_result["free_pages"] == 0
+
+
+def test_analyze_gathers_statistics(database, seed_logs):
+    path, engine = database
+    seed_logs(engine, 50, note_bytes=10)
+    scheduler = MaintenanceScheduler(str(path))
+
+    report = scheduler.run_step(_step(scheduler, "analyze"))
+
+    assert report.last_result["tables"] >= 1
+    with sqlite3.connect(path) as connection:
+        tables = {
+            row[0]
+            for row in connection.execute("SELECT tbl FROM sqlite_stat1").fetchall()
+        }
+    assert "log" in tables
+
+
+@pytest.mark.asyncio
+async def test_steps_wait_for_in_flight_writes(database):
+    path, _engine = database
+    admission = AdmissionController()
+    scheduler = MaintenanceScheduler(str(path), admission=admission)
+
+    await admission.acquire("device-a")
+    task = asyncio.create_task(scheduler.run_due())
+    await asyncio.sleep(0.2)
+    assert scheduler.reports["checkpoint"].runs == 0
+
+    admission.release("device-a")
+    ran = await task
+    assert ran == ["checkpoint", "analyze", "incremental_vacuum"]
+
+
+def test_cli_converts_an_existing_file_to_incremental_vacuum(tmp_path, capsys):
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE t (x TEXT)")
+    url = f"sqlite:///{path}"
+
+    assert cli_main(["--database-url", url, "maintenance"]) == 0
+    assert "auto_vacuum is not INCREMENTAL" in capsys.readouterr().out
+
+    cli_main(["--database-url", url, "maintenance", "--enable-incremental-vacuum"])
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+@pytest.mark.asyncio
+async def test_admin_maintenance_runs_steps_and_reports_them(database, monkeypatch):
+    path, _engine = database
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{path}")
+    app = create_app()
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/admin/maintenance")
+        stats = (await client.get("/admin/stats")).json()["maintenance"]
+
+    assert response.status_code == 200
+    assert response.json()["steps"]["checkpoint"]["runs"] == 1
+    assert set(stats["steps"]) == {"checkpoint", "analyze", "incremental_vacuum"}
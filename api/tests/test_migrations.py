@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+from alembic import command
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+from sqlmodel import Session
+
+from api import migrate
+from api.main import create_app
+from api.models import Log
+from api.time import to_epoch_us
+
+
+def test_epoch_migration_backfills_existing_logs(tmp_path, alembic_config):
+    database_url = f"sqlite:///{tmp_path / 'wildlings.db'}"
+    config = alembic_config(database_url)
+    command.upgrade(config, "0001_init_sync_tables")
+
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO log (id, start_at, end_at, note, updated_at_server, "
+                "deleted_at_server) VALUES ('log-1', '2026-01-01 09:00:00.000000', "
+                "'2026-01-01 10:00:00.000000', 'Legacy', "
+                "'2026-01-01 10:30:00.250000', NULL)"
+            )
+        )
+
+    command.upgrade(config, "head")
+
+    with engine.connect() as connection:
+        raw = connection.execute(
+            text("SELECT start_at, updated_at_server, deleted_at_server FROM log")
+        ).one()
+    assert raw.start_at == to_epoch_us(datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc))
+    assert isinstance(raw.updated_at_server, int)
+    assert raw.deleted_at_server is None
+
+    with Session(engine) as session:
+        stored = session.get(Log, "log-1")
+        assert stored is not None
+        assert stored.updated_at_server == datetime(
+            2026, 1, 1, 10, 30, 0, 250000, tzinfo=timezone.utc
+        )
+        assert stored.end_at == datetime(2026, 1, 1, 10, 0, tzinfo=timezone.utc)
+
+    command.downgrade(config, "0001_init_sync_tables")
+    with engine.connect() as connection:
+        restored = connection.execute(text("SELECT end_at FROM log")).scalar_one()
+    assert restored.startswith("2026-01-01 10:00:00")
+
+
+def test_ensure_schema_upgrades_once_then_skips_alembic(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'wildlings.db'}"
+
+    first = migrate.ensure_schema(database_url)
+    assert first.upgraded is True
+    assert first.before == ()
+    # The explicit URL wins over DATABASE_URL (test.db, from conftest).
+    assert not (tmp_path / "test.db").exists()
+
+    def fail_upgrade(*_args, **_kwargs):
+        raise AssertionError("alembic upgrade should be skipped")
+
+    monkeypatch.setattr(migrate.command, "upgrade", fail_upgrade)
+    second = migrate.ensure_schema(database_url)
+    assert second.upgraded is False
+    assert second.before == second.head == first.head
+
+
+@pytest.mark.asyncio
+async def test_lifespan_migrates_and_reports_startup_timings(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'wildlings.db'}")
+    monkeypatch.setenv("MIGRATE_ON_STARTUP", "1")
+    monkeypatch.setenv("INTERNAL_SYNC_TOKEN", "token")
+    app = create_app()
+
+    async with app.router.lifespan_context(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(
+                "/admin/stats", headers={"X-Internal-Token": "token"}
+            )
+            pulled = await client.get(
+                "/sync/pull", headers={"X-Internal-Token": "token"}
+            )
+
+    startup = response.json()["startup"]
+    assert startup["migrated"] is True
+    assert startup["schema_revision"] == "0002_epoch_timestamps"
+    assert {"create_app_ms", "migrate_ms", "engine_ms", "startup_ms"} <= set(startup)
+    assert pulled.status_code == 200
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+import pytest
+from alembic import command
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+from api.db import begin_write, create_db_engine
+from api.models import Log
+from api.settings import load_settings
+from api.tenants import TenantPool
+from api.time import utc_now
+
+
+def test_migrations_round_trip_on_postgres(postgres_url, alembic_config):
+    config = alembic_config(postgres_url)
+    command.upgrade(config, "head")
+
+    engine = create_db_engine(postgres_url)
+    try:
+        inspector = inspect(engine)
+        assert {"log", "syncop"} <= set(inspector.get_table_names())
+        columns = {column["name"]: column for column in inspector.get_columns("log")}
+        assert "BIGINT" in str(columns["updated_at_server"]["type"]).upper()
+
+        command.downgrade(config, "base")
+        assert "log" not in inspect(engine).get_table_names()
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_push_and_pull_on_postgres(
+    postgres_url, alembic_config, fixed_time, make_app
+):
+    command.upgrade(alembic_config(postgres_url), "head")
+    engine = create_db_engine(postgres_url)
+    app = make_app(engine)
+    app.state.now_override = lambda: fixed_time(1)
+
+    log_id = str(uuid4())
+    upsert = {
+        "op_id": str(uuid4()),
+        "entity": "log",
+        "action": "upsert",
+        "record_id": log_id,
+        "payload": {
+            "id": log_id,
+            "start_at": "2026-01-01T09:00:00Z",
+            "end_at": "2026-01-01T10:00:00Z",
+            "note": "Postgres",
+            "updated_at_local": "2026-01-01T10:00:00Z",
+            "deleted_at_local": None,
+            "updated_at_server": None,
+            "deleted_at_server": None,
+        },
+    }
+    payload = {
+        "device_id": str(uuid4()),
+        "client_time": "2026-01-01T12:00:00Z",
+        "ops": [upsert],
+    }
+
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/sync/push", json=payload)
+            assert response.status_code == 200
+            assert response.json()["ack_op_ids"] == [upsert["op_id"]]
+
+            response = await client.post("/sync/push", json=payload)
+            assert response.json()["ack_op_ids"] == [upsert["op_id"]]
+
+            response = await client.get("/sync/pull")
+            logs = response.json()["changes"]["logs"]
+            assert [log["id"] for log in logs] == [log_id]
+            assert logs[0]["updated_at_server"] == "2026-01-01T12:00:01Z"
+
+        with Session(engine) as session:
+            stored = session.get(Log, log_id)
+            assert stored is not None
+            assert stored.note == "Postgres"
+    finally:
+        engine.dispose()
+
+
+def test_schema_tenants_hold_separate_write_locks(postgres_url):
+    pool = TenantPool(postgres_url, load_settings())
+    smiths, joneses = pool.open("smiths"), pool.open("joneses")
+    first = Session(smiths.engine)
+    try:
+        begin_write(first)
+        first.add(Log(id="smiths-1", start_at=utc_now(), updated_at_server=utc_now()))
+
+        # The smiths' writer is mid-transaction; the joneses still commit.
+        with Session(joneses.engine) as other:
+            other.connection().exec_driver_sql("SET LOCAL lock_timeout = '1s'")
+            begin_write(other)
+            other.add(
+                Log(id="joneses-1", start_at=utc_now(), updated_at_server=utc_now())
+            )
+            other.commit()
+
+        # A second smiths writer still waits for the first.
+        with Session(smiths.engine) as same:
+            same.connection().exec_driver_sql("SET LOCAL lock_timeout = '100ms'")
+            with pytest.raises(OperationalError):
+                begin_write(same)
+
+        first.commit()
+        with Session(joneses.engine) as session:
+            assert session.exec(select(Log.id)).all() == ["joneses-1"]
+    finally:
+        first.close()
+        pool.close()
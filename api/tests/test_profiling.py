@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import pstats
+from uuid import uuid4
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from api.profiling import ProfilingMiddleware, annotate
+
+
+def test_profiling_middleware_is_not_installed_by_default(monkeypatch, make_app):
+    monkeypatch.delenv("PROFILE_DIR", raising=False)
+    app = make_app()
+    assert all(m.cls is not ProfilingMiddleware for m in app.user_middleware)
+
+
+@pytest.mark.asyncio
+async def test_sampled_requests_dump_profile_and_metadata(tmp_path, make_app):
+    profile_dir = tmp_path / "profiles"
+    app = make_app(
+        PROFILE_DIR=str(profile_dir),
+        PROFILE_SAMPLE_RATE="1",
+        PROFILE_MAX_FILES="2",
+    )
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/sync/push",
+            json={
+                "device_id": str(uuid4()),
+                "client_time": "2026-01-01T12:00:00Z",
+                "ops": [],
+            },
+        )
+        assert response.status_code == 200
+        for _ in range(2):
+            response = await client.get("/sync/pull")
+            assert response.status_code == 200
+
+    profiles = sorted(profile_dir.glob("*.prof"))
+    assert len(profiles) == 2
+    assert len(list(profile_dir.glob("*.json"))) == 2
+
+    metadata = json.loads(profiles[-1].with_suffix(".json").read_text())
+    assert metadata["route"] == "/sync/pull"
+    assert metadata["status_code"] == 200
+    assert metadata["reason"] == "sampled"
+    assert "cache_hit" in metadata
+    assert pstats.Stats(str(profiles[-1])).total_calls > 0
+
+
+@pytest.mark.asyncio
+async def test_latency_threshold_only_keeps_slow_requests(tmp_path, make_app):
+    profile_dir = tmp_path / "profiles"
+    app = make_app(
+        PROFILE_DIR=str(profile_dir),
+        PROFILE_SLOW_MS="60000",
+    )
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/sync/pull")
+        assert response.status_code == 200
+
+    assert not profile_dir.exists()
+
+
+@pytest.mark.asyncio
+async def test_overlapping_slow_requests_are_all_recorded(tmp_path):
+    async def slow_app(scope, receive, send):
+        await asyncio.sleep(0.05)
+        annotate(ops=1)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    profile_dir = tmp_path / "profiles"
+    app = ProfilingMiddleware(slow_app, str(profile_dir), slow_ms=10)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = await asyncio.gather(*(client.get("/slow") for _ in range(3)))
+
+    assert all(response.status_code == 200 for response in responses)
+    records = [
+        json.loads(path.read_text()) for path in sorted(profile_dir.glob("*.json"))
+    ]
+    assert len(records) == 3
+    assert all(record["reason"] == "slow" and record["ops"] == 1 for record in records)
+    # One profiler per event loop: the overlapping requests are timed only.
+    assert sorted(record["profiled"] for record in records) == [False, False, True]
+    assert len(list(profile_dir.glob("*.prof"))) == 1
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session
+
+from api.models import Log
+
+BASE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def _fetch_partition(client, partition: dict) -> list[dict]:
+    logs: list[dict] = []
+    cursor = partition["cursor"]
+    while True:
+        params = {"limit": 50, "until": partition["until"]}
+        if cursor:
+            params["cursor"] = cursor
+        data = (await client.get("/sync/pull", params=params)).json()
+        if not data["changes"]["logs"]:
+            return logs
+        logs.extend(data["changes"]["logs"])
+        cursor = data["next_cursor"]
+
+
+async def _pull_all(client, cursor: str) -> list[dict]:
+    logs: list[dict] = []
+    while True:
+        data = (
+            await client.get("/sync/pull", params={"cursor": cursor, "limit": 1000})
+        ).json()
+        if not data["changes"]["logs"]:
+            return logs
+        logs.extend(data["changes"]["logs"])
+        cursor = data["next_cursor"]
+
+
+@pytest.mark.asyncio
+async def test_partitions_cover_every_change_exactly_once(client, engine, seed_logs):
+    seed_logs(engine, 301)
+
+    plan = (await client.get("/sync/pull/plan", params={"partitions": 4})).json()
+
+    assert plan["total"] == 301
+    assert len(plan["partitions"]) == 4
+    assert sum(partition["count"] for partition in plan["partitions"]) == 301
+    assert plan["partitions"][-1]["until"] == plan["snapshot_cursor"]
+    results = await asyncio.gather(
+        *(_fetch_partition(client, partition) for partition in plan["partitions"])
+    )
+    assert [len(logs) for logs in results] == [
+        partition["count"] for partition in plan["partitions"]
+    ]
+    ids = [log["id"] for logs in results for log in logs]
+    assert sorted(ids) == [f"log-{index:04d}" for index in range(301)]
+
+
+@pytest.mark.asyncio
+async def test_writes_during_bootstrap_arrive_via_the_snapshot_cursor(
+    client, engine, seed_logs
+):
+    seed_logs(engine, 100)
+    plan = (await client.get("/sync/pull/plan", params={"partitions": 3})).json()
+
+    later = BASE + timedelta(days=1)
+    with Session(engine) as session:
+        edited = session.get(Log, "log-0001")
+        edited.note = "v2"
+        edited.updated_at_server = later
+        session.add(Log(id="log-new", start_at=BASE, updated_at_server=later))
+        session.commit()
+
+    state: dict[str, dict] = {}
+    for logs in await asyncio.gather(
+        *(_fetch_partition(client, partition) for partition in plan["partitions"])
+    ):
+        state.update({log["id"]: log for log in logs})
+    for log in await _pull_all(client, plan["snapshot_cursor"]):
+        state[log["id"]] = log
+
+    assert len(state) == 101
+    assert state["log-0001"]["note"] == "v2"
+    assert "log-new" in state
+
+
+@pytest.mark.asyncio
+async def test_plan_handles_small_and_empty_ranges(
+    client, engine, app, fixed_time, seed_logs
+):
+    app.state.now_override = lambda: fixed_time(5)
+    plan = (await client.get("/sync/pull/plan", params={"partitions": 4})).json()
+    assert plan == {
+        "server_time": "2026-01-01T12:00:05Z",
+        "snapshot_cursor": "1970-01-01T00:00:00Z|",
+        "total": 0,
+        "partitions": [],
+    }
+
+    seed_logs(engine, 2)
+    plan = (await client.get("/sync/pull/plan", params={"partitions": 4})).json()
+    assert [partition["count"] for partition in plan["partitions"]] == [1, 1]
+
+    plan = (
+        await client.get(
+            "/sync/pull/plan",
+            params={"partitions": 4, "cursor": plan["snapshot_cursor"]},
+        )
+    ).json()
+    assert plan["partitions"] == []
+
+    response = await client.get("/sync/pull/plan", params={"partitions": 99})
+    assert response.status_code == 422
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import Session, func, select
+
+from api.models import Log
+from api.routes import sync
+from api.push_stream import PushStreamError, read_ndjson_lines
+
+
+def ndjson_body(payload: dict, extra_lines: tuple[str, ...] = ()) -> list[bytes]:
+    header = {"device_id": payload["device_id"], "client_time": payload["client_time"]}
+    lines = [json.dumps(header)] + [json.dumps(op) for op in payload["ops"]]
+    return [(line + "\n").encode() for line in [*lines, *extra_lines]]
+
+
+async def _pieces(lines: list[bytes], size: int = 37):
+    # Arbitrary network-sized pieces, so lines arrive split across chunks.
+    body = b"".join(lines)
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+async def _stream(app, lines: list[bytes]) -> tuple[int, list[dict]]:
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/sync/push/stream",
+            content=_pieces(lines),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    return response.status_code, [json.loads(line) for line in response.iter_lines()]
+
+
+def _log_count(engine) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(Log)).one()
+
+
+@pytest.mark.asyncio
+async def test_stream_commits_and_acks_each_chunk(engine, make_app, push_payload):
+    app = make_app(SYNC_STREAM_CHUNK_OPS="4")
+    payload = push_payload(10)
+
+    status, lines = await _stream(app, ndjson_body(payload))
+
+    assert status == 200
+    *chunks, end = lines
+    assert [chunk["ops"] for chunk in chunks] == [4, 4, 2]
+    assert [op_id for chunk in chunks for op_id in chunk["ack_op_ids"]] == [
+        op["op_id"] for op in payload["ops"]
+    ]
+    assert end == {
+        "done": True,
+        "chunks": 3,
+        "ops": 10,
+        "acked": 10,
+        "complete": True,
+        "error": None,
+    }
+    assert _log_count(engine) == 10
+
+    # Resending after a lost response only acks; nothing is written twice.
+    status, lines = await _stream(app, ndjson_body(payload))
+    assert lines[-1]["acked"] == 10
+    assert all(not chunk["applied"]["logs"] for chunk in lines[:-1])
+
+
+@pytest.mark.asyncio
+async def test_malformed_line_keeps_the_ops_before_it(engine, make_app, push_payload):
+    app = make_app(SYNC_STREAM_CHUNK_OPS="4")
+    payload = push_payload(5)
+    tail = push_payload(2)["ops"]
+
+    status, lines = await _stream(
+        app, ndjson_body(payload, ('{"op_id": "broken"}', *map(json.dumps, tail)))
+    )
+
+    assert status == 200
+    end = lines[-1]
+    assert [chunk["ops"] for chunk in lines[:-1]] == [4, 1]
+    assert end["complete"] is False
+    assert end["error"]["status"] == 400
+    assert end["error"]["line"] == 7
+    assert end["acked"] == 5
+    assert _log_count(engine) == 5
+
+
+@pytest.mark.asyncio
+async def test_rejected_chunk_stops_the_stream(engine, make_app, push_payload):
+    app = make_app(SYNC_STREAM_CHUNK_OPS="2")
+    payload = push_payload(6)
+    upsert = payload["ops"][0]["payload"]
+    upsert["end_at"] = "2026-01-01T08:00:00Z"
+    payload["ops"][2]["payload"]["end_at"] = "2026-01-01T08:00:00Z"
+
+    status, lines = await _stream(app, ndjson_body(payload))
+
+    assert status == 200
+    assert len(lines) == 2
+    assert lines[0]["rejected"][0]["code"] == "VALIDATION_ERROR"
+    assert lines[-1]["error"]["status"] == 422
+    assert _log_count(engine) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("failure", "status"),
+    [
+        (OperationalError("COMMIT", {}, Exception("database is locked")), 503),
+        (IntegrityError("INSERT", {}, Exception("constraint failed")), 500),
+    ],
+)
+async def test_failure_after_a_commit_ends_the_stream(
+    engine, monkeypatch, failure, status, make_app, push_payload
+):
+    app = make_app(SYNC_STREAM_CHUNK_OPS="2")
+    apply_push = sync.apply_push
+    calls = []
+
+    def fail_after_first_chunk(*args):
+        calls.append(1)
+        if len(calls) > 1:
+            raise failure
+        return apply_push(*args)
+
+    monkeypatch.setattr(sync, "apply_push", fail_after_first_chunk)
+
+    status_code, lines = await _stream(app, ndjson_body(push_payload(6)))
+
+    assert status_code == 200
+    assert [chunk["ops"] for chunk in lines[:-1]] == [2]
+    end = lines[-1]
+    assert end["complete"] is False
+    assert end["acked"] == 2
+    assert end["error"]["status"] == status
+    assert (end["error"]["retry_after"] is not None) == (status == 503)
+    assert _log_count(engine) == 2
+
+
+@pytest.mark.asyncio
+async def test_bad_header_fails_before_streaming(make_app):
+    app = make_app()
+
+    status, lines = await _stream(app, [b'{"client_time": "2026-01-01T00:00:00Z"}\n'])
+
+    assert status == 400
+    assert "device_id" in lines[0]["detail"]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_lines_are_bounded():
+    async def chunks(*parts: bytes):
+        for part in parts:
+            yield part
+
+    lines = [item async for item in read_ndjson_lines(chunks(b"a\n\nb", b"c\nd"), 8)]
+    assert lines == [(1, b"a"), (3, b"bc"), (4, b"d")]
+
+    with pytest.raises(PushStreamError, match="line 2: line too long"):
+        async for _ in read_ndjson_lines(chunks(b"ok\n", b"x" * 5, b"x" * 5), 8):
+            pass
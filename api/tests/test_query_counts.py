@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+
+@pytest.mark.asyncio
+async def test_push_query_count_does_not_grow_with_batch_size(
+    client, query_counter, push_payload
+):
+    counts = []
+    for op_count in (3, 30, 300):
+        with query_counter() as stats:
+            response = await client.post("/sync/push", json=push_payload(op_count))
+        assert response.status_code == 200
+        assert len(response.json()["ack_op_ids"]) == op_count
+        counts.append(stats.count)
+
+    assert counts[0] == counts[1] == counts[2]
+    # Write lock and timestamp read, then at most probe, upsert, tombstone, ops.
+    assert counts[0] <= 6
+
+
+@pytest.mark.asyncio
+async def test_replayed_push_is_answered_from_the_applied_op_cache(
+    client, query_counter, push_payload
+):
+    payload = push_payload(30)
+    await client.post("/sync/push", json=payload)
+
+    with query_counter() as stats:
+        response = await client.post("/sync/push", json=payload)
+
+    assert len(response.json()["ack_op_ids"]) == 30
+    assert stats.count == 0
+
+
+@pytest.mark.asyncio
+async def test_replayed_push_only_probes_without_the_cache(
+    client, app, query_counter, push_payload
+):
+    app.state.applied_ops.max_entries = 0
+    payload = push_payload(30)
+    await client.post("/sync/push", json=payload)
+
+    with query_counter(record_statements=True) as stats:
+        response = await client.post("/sync/push", json=payload)
+
+    assert len(response.json()["ack_op_ids"]) == 30
+    assert stats.count == 1
+    assert stats.statements[0].lstrip().upper().startswith("SELECT")
+
+
+@pytest.mark.asyncio
+async def test_pull_uses_a_fixed_number_of_statements(
+    client, app, engine, query_counter, seed_logs
+):
+    seed_logs(engine, 250)
+    app.state.pull_cache.max_entries = 0
+
+    cursor = None
+    counts = []
+    while True:
+        params = {"cursor": cursor} if cursor else {}
+        with query_counter() as stats:
+            response = await client.get("/sync/pull", params=params)
+        counts.append(stats.count)
+        data = response.json()
+        if not data["changes"]["logs"]:
+            break
+        cursor = data["next_cursor"]
+
+    assert counts == [1] * len(counts)
+    assert len(counts) == 4
+
+
+@pytest.mark.asyncio
+async def test_debug_headers_report_query_counts(make_app):
+    app = make_app(DEBUG_QUERY_HEADERS="1")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/sync/pull")
+        assert response.headers["x-query-count"] == "1"
+        assert float(response.headers["x-query-time-ms"]) >= 0
+
+        response = await client.get("/sync/pull")
+        assert response.headers["x-query-count"] == "0"
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import gzip
 from pathlib import Path
 
 import pytest
@@ -33,3 +34,82 @@ async def test_static_serves_index_and_assets(tmp_path: Path, monkeypatch) -> No
         response = await client.get("/logs")
         assert response.status_code == 200
         assert "Wildlings" in response.text
+
+
+def _build_dist(root: Path) -> None:
+    (root / "index.html").write_text(
+        "<html><body>Wildlings</body></html>", encoding="utf-8"
+    )
+    (root / "sw.js").write_text("self.addEventListener('fetch', () => {});")
+    assets_dir = root / "assets"
+    assets_dir.mkdir()
+    (assets_dir / "index-DdT3x9Qa.js").write_text("console.log('plain');")
+    (assets_dir / "index-DdT3x9Qa.js.gz").write_bytes(
+        gzip.compress(b"console.log('gzip');")
+    )
+    (assets_dir / "index-DdT3x9Qa.js.br").write_bytes(b"brotli-bytes")
+    (assets_dir / "logo.svg").write_text("<svg></svg>")
+
+
+@pytest.mark.asyncio
+async def test_static_assets_prefer_precompressed_siblings(
+    tmp_path: Path, monkeypatch
+) -> None:
+    _build_dist(tmp_path)
+    monkeypatch.setenv("STATIC_DIR", str(tmp_path))
+    app = create_app()
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        path = "/assets/index-DdT3x9Qa.js"
+        # Headers only: the placeholder brotli body is not decodable.
+        async with client.stream(
+            "GET", path, headers={"Accept-Encoding": "gzip, br"}
+        ) as response:
+            assert response.status_code == 200
+            assert response.headers["content-encoding"] == "br"
+            assert response.headers["content-type"].startswith("text/javascript")
+            assert response.headers["cache-control"] == (
+                "public, max-age=31536000, immutable"
+            )
+            assert "Accept-Encoding" in response.headers["vary"]
+
+        response = await client.get(path, headers={"Accept-Encoding": "gzip, br;q=0"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == "console.log('gzip');"
+
+        response = await client.get(path, headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.text == "console.log('plain');"
+
+        response = await client.get(
+            "/assets/logo.svg", headers={"Accept-Encoding": "identity"}
+        )
+        assert response.headers["cache-control"] == "no-cache"
+
+
+@pytest.mark.asyncio
+async def test_index_is_cached_in_memory_with_etag(tmp_path: Path, monkeypatch) -> None:
+    _build_dist(tmp_path)
+    monkeypatch.setenv("STATIC_DIR", str(tmp_path))
+    app = create_app()
+    # Served from memory: the file is no longer consulted after startup.
+    (tmp_path / "index.html").unlink()
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/logs", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["cache-control"] == "no-cache"
+        assert "Wildlings" in response.text
+        etag = response.headers["etag"]
+
+        response = await client.get("/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = await client.get("/sw.js", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert "addEventListener" in response.text
+        assert response.headers["cache-control"] == "no-cache"
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import pytest
+
+from api.benchmarks.stress import StressConfig, run_stress
+
+
+@pytest.mark.asyncio
+async def test_concurrent_pushes_and_pulls_keep_sync_semantics(tmp_path):
+    config = StressConfig(devices=12, rounds=6)
+
+    report = await run_stress(tmp_path / "stress.db", config)
+
+    summary = report.summary()
+    assert report.violations == []
+    duplicates = config.devices * len(range(0, config.rounds, config.duplicate_every))
+    assert report.pushes == config.devices * config.rounds + duplicates
+    assert summary["locks"]["write_locks"] > 0
+    assert report.pulled_rows > 0
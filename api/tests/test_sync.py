@@ -4,9 +4,10 @@ from datetime import datetime, timezone
 from uuid import uuid4
 
 import pytest
-from sqlmodel import Session
+from sqlmodel import Session, select
 
 from api.models import Log
+from api.routes import sync
 
 
 def isoformat_z(value: datetime) -> str:
@@ -351,3 +352,90 @@ async def test_push_uses_server_time_for_updated_at(client, app, engine, fixed_t
         stored = session.get(Log, log_id)
         assert stored is not None
         assert isoformat_z(stored.updated_at_server) == "2026-01-01T12:00:07Z"
+
+
+@pytest.mark.asyncio
+async def test_push_applies_ops_for_same_record_in_order(
+    client, app, engine, fixed_time
+):
+    device_id = str(uuid4())
+    log_id = str(uuid4())
+    upsert_op_id = str(uuid4())
+    delete_op_id = str(uuid4())
+
+    payload = {
+        "device_id": device_id,
+        "client_time": "2026-01-01T12:00:00Z",
+        "ops": [
+            {
+                "op_id": upsert_op_id,
+                "entity": "log",
+                "action": "upsert",
+                "record_id": log_id,
+                "payload": {
+                    "id": log_id,
+                    "start_at": "2026-01-01T08:00:00Z",
+                    "end_at": "2026-01-01T09:00:00Z",
+                    "note": "Short-lived",
+                    "updated_at_local": "2026-01-01T09:00:00Z",
+                    "deleted_at_local": None,
+                    "updated_at_server": None,
+                    "deleted_at_server": None,
+                },
+            },
+            {
+                "op_id": delete_op_id,
+                "entity": "log",
+                "action": "delete",
+                "record_id": log_id,
+                "payload": {"id": log_id, "deleted_at_local": "2026-01-01T09:30:00Z"},
+            },
+        ],
+    }
+
+    app.state.now_override = lambda: fixed_time(8)
+    response = await client.post("/sync/push", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ack_op_ids"] == [upsert_op_id, delete_op_id]
+
+    with Session(engine) as session:
+        stored = session.get(Log, log_id)
+        assert stored is not None
+        assert stored.note == "Short-lived"
+        assert stored.deleted_at_server is not None
+        assert isoformat_z(stored.deleted_at_server) == "2026-01-01T12:00:08Z"
+
+
+@pytest.mark.asyncio
+async def test_postgres_style_push_stamps_rows_after_writing_them(
+    client, app, engine, fixed_time, push_payload, monkeypatch
+):
+    with Session(engine) as session:
+        session.add(
+            Log(id="newest", start_at=fixed_time(0), updated_at_server=fixed_time(9))
+        )
+        session.commit()
+    written_before_lock: list[int] = []
+
+    def begin_write(session):
+        # SQLite cannot take BEGIN IMMEDIATE mid-transaction; record instead.
+        written_before_lock.append(len(session.exec(select(Log)).all()))
+
+    monkeypatch.setattr(sync, "stamps_at_commit", lambda session: True)
+    monkeypatch.setattr(sync, "begin_write", begin_write)
+    app.state.now_override = lambda: fixed_time(5)
+
+    response = await client.post("/sync/push", json=push_payload(3))
+
+    assert written_before_lock == [4]
+    stamp = "2026-01-01T12:00:09.000001Z"
+    applied = response.json()["applied"]["logs"]
+    assert [log["updated_at_server"] for log in applied] == [stamp] * 3
+    assert [log["deleted_at_server"] for log in applied] == [None, None, stamp]
+    with Session(engine) as session:
+        rows = {log.id: log for log in session.exec(select(Log))}
+    tombstone = rows[applied[2]["id"]]
+    assert isoformat_z(tombstone.updated_at_server) == stamp
+    assert isoformat_z(tombstone.deleted_at_server) == stamp
+    assert rows[applied[0]["id"]].deleted_at_server is None
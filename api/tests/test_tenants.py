@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from api.main import create_app
+from api.settings import load_settings
+from api.tenants import Tenant, TenantError, TenantPool, tenant_database_url
+
+
+def tenant_app(monkeypatch, tmp_path, pool_size: int = 4):
+    monkeypatch.setenv(
+        "TENANT_DATABASE_URL", f"sqlite:///{tmp_path}/tenants/{{tenant}}.db"
+    )
+    monkeypatch.setenv("TENANT_POOL_SIZE", str(pool_size))
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "200")
+    return create_app()
+
+
+async def _pull_ids(client: AsyncClient, tenant: str) -> set[str]:
+    response = await client.get("/sync/pull", headers={"X-Tenant-Id": tenant})
+    assert response.status_code == 200
+    return {log["id"] for log in response.json()["changes"]["logs"]}
+
+
+@pytest.mark.asyncio
+async def test_tenants_get_separate_migrated_databases(
+    monkeypatch, tmp_path, push_payload
+):
+    app = tenant_app(monkeypatch, tmp_path)
+    payload = push_payload(3, device_id="shared-device")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        for tenant in ("alpha", "beta"):
+            response = await client.post(
+                "/sync/push", json=payload, headers={"X-Tenant-Id": tenant}
+            )
+            assert response.status_code == 200
+            # Same device and op ids: each tenant applies them on its own.
+            assert len(response.json()["applied"]["logs"]) == 3
+        other = push_payload(1)
+        await client.post("/sync/push", json=other, headers={"X-Tenant-Id": "beta"})
+
+        alpha = await _pull_ids(client, "alpha")
+        beta = await _pull_ids(client, "beta")
+        stats = (await client.get("/admin/stats")).json()["tenants"]
+
+    assert beta - alpha == {other["ops"][0]["record_id"]}
+    assert len(alpha) == 3
+    assert stats["open"] == 2
+    for tenant in ("alpha", "beta"):
+        with sqlite3.connect(tmp_path / "tenants" / f"{tenant}.db") as connection:
+            assert connection.execute(
+                "SELECT version_num FROM alembic_version"
+            ).fetchone()
+
+
+@pytest.mark.asyncio
+async def test_tenant_header_is_required_and_validated(monkeypatch, tmp_path):
+    app = tenant_app(monkeypatch, tmp_path)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        missing = await client.get("/sync/pull")
+        invalid = await client.get("/sync/pull", headers={"X-Tenant-Id": "../etc"})
+        health = await client.get("/admin/stats")
+
+    assert missing.status_code == 400
+    assert invalid.status_code == 400
+    assert health.status_code == 200
+    assert not (tmp_path / "tenants").exists()
+
+
+@pytest.mark.asyncio
+async def test_pool_evicts_least_recently_used_tenant(
+    monkeypatch, tmp_path, push_payload
+):
+    app = tenant_app(monkeypatch, tmp_path, pool_size=2)
+    payload = push_payload(2)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/sync/push", json=payload, headers={"X-Tenant-Id": "one"})
+        await _pull_ids(client, "two")
+        await _pull_ids(client, "one")
+        await _pull_ids(client, "three")
+        stats = app.state.tenants.stats()
+        assert stats["tenants"] == ["one", "three"]
+        assert stats["evictions"] == 1
+
+        await _pull_ids(client, "two")
+        assert await _pull_ids(client, "one") == {
+            op["record_id"] for op in payload["ops"]
+        }
+    # The middleware releases every tenant it acquired.
+    assert all(tenant.users == 0 for tenant in app.state.tenants._tenants.values())
+
+
+@pytest.mark.asyncio
+async def test_a_locked_tenant_does_not_block_another(
+    monkeypatch, tmp_path, push_payload
+):
+    app = tenant_app(monkeypatch, tmp_path)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await _pull_ids(client, "busy")
+        blocker = sqlite3.connect(tmp_path / "tenants" / "busy.db")
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            busy = await client.post(
+                "/sync/push", json=push_payload(1), headers={"X-Tenant-Id": "busy"}
+            )
+            free = await client.post(
+                "/sync/push", json=push_payload(1), headers={"X-Tenant-Id": "free"}
+            )
+        finally:
+            blocker.rollback()
+            blocker.close()
+
+    assert busy.status_code == 503
+    assert free.status_code == 200
+
+
+def test_evicted_tenant_closes_after_its_last_request(monkeypatch, tmp_path):
+    closed = []
+    monkeypatch.setattr(Tenant, "close", lambda tenant: closed.append(tenant.tenant_id))
+    pool = TenantPool(
+        f"sqlite:///{tmp_path}/{{tenant}}.db", load_settings(), max_open=1
+    )
+
+    one = pool.open("one")
+    two = pool.open("two")
+    assert pool.stats()["tenants"] == ["two"]
+    # "one" is still serving a request: evicted, but not closed under it.
+    assert one.evicted and closed == []
+    one.data_version.bump()
+
+    pool.release(one)
+    assert closed == ["one"]
+    pool.release(two)
+    pool.open("three")
+    assert closed == ["one", "two"]
+
+
+def test_failed_open_does_not_leak_its_lock(monkeypatch, tmp_path):
+    pool = TenantPool(f"sqlite:///{tmp_path}/{{tenant}}.db", load_settings())
+
+    def broken(tenant_id):
+        raise RuntimeError("migration failed")
+
+    monkeypatch.setattr(pool, "_create", broken)
+    with pytest.raises(RuntimeError):
+        pool.open("broken")
+
+    assert pool._opening == {}
+    assert pool.stats()["open"] == 0
+
+
+def test_tenant_database_urls():
+    assert (
+        tenant_database_url("sqlite:////data/{tenant}.db", "smiths")
+        == "sqlite:////data/smiths.db"
+    )
+    url = tenant_database_url("postgresql://u:p@db/wildlings", "the-smiths")
+    assert url.startswith("postgresql+psycopg://u:p@db/wildlings?")
+    assert "search_path%3Dtenant_the_smiths" in url
+    with pytest.raises(TenantError):
+        tenant_database_url("sqlite:///./wildlings.db", "smiths")
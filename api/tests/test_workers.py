@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from api.cache import DataVersion, SharedDataVersion
+from api.cli import main
+from api.db import retry_on_lock
+from api.main import create_app
+
+
+def locked_error() -> OperationalError:
+    return OperationalError("COMMIT", {}, Exception("database is locked"))
+
+
+def test_shared_data_version_is_visible_across_handles(tmp_path):
+    path = str(tmp_path / "wildlings.db-version")
+    first = SharedDataVersion(path)
+    second = SharedDataVersion(path)
+
+    assert first.current() == 0
+    assert second.bump() == 1
+    assert first.current() == 1
+    assert first.bump() == 2
+    assert second.current() == 2
+
+
+@pytest.mark.asyncio
+async def test_workers_sharing_a_version_file_never_serve_stale_pages(
+    monkeypatch, tmp_path, make_app, push_payload
+):
+    monkeypatch.setenv("DATA_VERSION_FILE", str(tmp_path / "version"))
+    worker_a = make_app()
+    worker_b = make_app()
+    log_id = str(uuid4())
+
+    async with (
+        AsyncClient(transport=ASGITransport(app=worker_a), base_url="http://a") as a,
+        AsyncClient(transport=ASGITransport(app=worker_b), base_url="http://b") as b,
+    ):
+        await a.post("/sync/push", json=push_payload(1, log_id=log_id, note="First"))
+        response = await a.get("/sync/pull")
+        assert response.json()["changes"]["logs"][0]["note"] == "First"
+
+        await b.post("/sync/push", json=push_payload(1, log_id=log_id, note="Second"))
+
+        response = await a.get("/sync/pull")
+        assert response.json()["changes"]["logs"][0]["note"] == "Second"
+
+
+def test_no_shared_version_disables_pull_cache(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://wildlings@localhost/wildlings")
+    monkeypatch.delenv("DATA_VERSION_FILE", raising=False)
+
+    app = create_app()
+
+    assert isinstance(app.state.data_version, DataVersion)
+    assert not app.state.pull_cache.enabled
+
+
+def test_multiple_workers_on_sqlite_share_a_version_file(monkeypatch, tmp_path):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'wildlings.db'}")
+    monkeypatch.delenv("DATA_VERSION_FILE", raising=False)
+
+    app = create_app()
+
+    assert isinstance(app.state.data_version, SharedDataVersion)
+    assert app.state.data_version.path == f"{tmp_path / 'wildlings.db'}-version"
+    assert app.state.pull_cache.enabled
+
+
+@pytest.mark.asyncio
+async def test_single_worker_sees_rows_imported_by_the_cli(
+    app, client, database_url, tmp_path, push_payload
+):
+    assert isinstance(app.state.data_version, SharedDataVersion)
+    log_id = str(uuid4())
+    await client.post("/sync/push", json=push_payload(1, log_id=log_id, note="Pushed"))
+    first = await client.get("/sync/pull")
+    assert len(first.json()["changes"]["logs"]) == 1
+
+    source = tmp_path / "history.ndjson"
+    source.write_text('{"id": "imported", "start_at": "2024-06-01T09:00:00Z"}\n')
+    assert main(["--database-url", database_url, "import", str(source)]) == 0
+
+    response = await client.get("/sync/pull")
+    assert {log["id"] for log in response.json()["changes"]["logs"]} == {
+        log_id,
+        "imported",
+    }
+
+
+def test_retry_on_lock_retries_lock_conflicts_only(engine):
+    calls = []
+
+    def flaky(session, fail_times):
+        calls.append(1)
+        if len(calls) <= fail_times:
+            raise locked_error()
+        return "ok"
+
+    with Session(engine) as session:
+        assert retry_on_lock(session, flaky, 2, base_delay_s=0) == "ok"
+        assert len(calls) == 3
+
+        def broken(session):
+            raise OperationalError("SELECT", {}, Exception("no such table: log"))
+
+        with pytest.raises(OperationalError):
+            retry_on_lock(session, broken, base_delay_s=0)
+
+
+@pytest.mark.asyncio
+async def test_persistent_lock_conflict_returns_503(client, monkeypatch, push_payload):
+    def always_locked(*_args, **_kwargs):
+        raise locked_error()
+
+    monkeypatch.setattr("api.routes.sync.apply_push", always_locked)
+
+    response = await client.post("/sync/push", json=push_payload(1))
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
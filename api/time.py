@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Callable
 
 from fastapi import Request
 
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
 def ensure_utc(value: datetime) -> datetime:
+    if value.tzinfo is timezone.utc:
+        return value
     if value.tzinfo is None:
         return value.replace(tzinfo=timezone.utc)
     return value.astimezone(timezone.utc)
@@ -16,6 +21,15 @@ def format_iso(value: datetime) -> str:
     return ensure_utc(value).isoformat().replace("+00:00", "Z")
 
 
+def to_epoch_us(value: datetime) -> int:
+    delta = ensure_utc(value) - EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_epoch_us(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
 def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -26,4 +40,8 @@ def get_now(request: Request) -> datetime:
     )
     if override is not None:
         return ensure_utc(override())
+    # Pinned by ``CaptureMiddleware`` so the recorded instant is the one used.
+    pinned: datetime | None = getattr(request.state, "now", None)
+    if pinned is not None:
+        return pinned
     return utc_now()
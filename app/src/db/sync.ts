@@ -1,10 +1,15 @@
-import type { WildlingsDb, LogRecord } from './db';
+import type { WildlingsDb, LogRecord, SyncQueueRecord } from './db';
 import { getMetadata, getOrCreateDeviceId } from './db';
 import {
+  syncPullPlanSchema,
   syncPullResponseSchema,
   syncPushResponseSchema,
+  syncPushStreamChunkSchema,
+  syncPushStreamEndSchema,
   type SyncPullLog,
+  type SyncPullPlan,
   type SyncPushResponse,
+  type SyncPushStreamEnd,
 } from './syncSchemas';
 import { nowIso, nowMs, parseInstantMs, toIsoFromMs } from '../lib/datetime';
 
@@ -12,6 +17,7 @@ const BASE_BACKOFF_MS = 1000;
 const MAX_BACKOFF_MS = 60000;
 const JITTER_RATIO = 0.2;
 const DEFAULT_BATCH_SIZE = 50;
+const BOOTSTRAP_PAGE_SIZE = 1000;
 
 type SyncOptions = {
   baseUrl?: string;
@@ -19,6 +25,11 @@ type SyncOptions = {
   now?: () => string;
   random?: () => number;
   batchSize?: number;
+  // First sync only: fetch this many server-planned ranges concurrently.
+  pullPartitions?: number;
+  // An outbox longer than batchSize goes up as one NDJSON stream of at most
+  // this many ops, committed and acked by the server chunk by chunk.
+  streamPushLimit?: number;
 };
 
 type SyncOutcome = {
@@ -27,6 +38,33 @@ type SyncOutcome = {
   pulled: number;
 };
 
+class SyncHttpError extends Error {
+  readonly status: number;
+  readonly retryAfterMs: number | null;
+
+  constructor(message: string, status: number, retryAfterMs: number | null) {
+    super(message);
+    this.name = 'SyncHttpError';
+    this.status = status;
+    this.retryAfterMs = retryAfterMs;
+  }
+}
+
+const parseRetryAfterMs = (value: string | null) => {
+  if (!value) {
+    return null;
+  }
+  const seconds = Number(value);
+  return Number.isFinite(seconds) && seconds >= 0 ? seconds * 1000 : null;
+};
+
+const httpError = (label: string, response: Response) =>
+  new SyncHttpError(
+    `${label} failed with status ${response.status}`,
+    response.status,
+    parseRetryAfterMs(response.headers.get('Retry-After')),
+  );
+
 const resolveUrl = (baseUrl: string | undefined, path: string) =>
   baseUrl ? new URL(path, baseUrl).toString() : path;
 
@@ -55,11 +93,14 @@ const computeNextSyncAt = (nowMs: number, backoffMs: number, random: () => numbe
 
 const touchSyncFailure = async (
   db: WildlingsDb,
-  params: { nowIso: string; random: () => number },
+  params: { nowIso: string; random: () => number; retryAfterMs: number | null },
 ) => {
   const metadata = await getMetadata(db);
   const currentMs = parseInstantMs(params.nowIso) ?? nowMs();
-  const backoffMs = computeBackoffMs(metadata.sync_backoff_ms);
+  const backoffMs = Math.min(
+    MAX_BACKOFF_MS,
+    Math.max(computeBackoffMs(metadata.sync_backoff_ms), params.retryAfterMs ?? 0),
+  );
   const nextSyncAt = computeNextSyncAt(currentMs, backoffMs, params.random);
   await db.metadata.update(metadata.id, {
     sync_backoff_ms: backoffMs,
@@ -126,27 +167,125 @@ const applyPushResponse = async (db: WildlingsDb, response: SyncPushResponse, op
   });
 };
 
+const toSyncOp = (op: SyncQueueRecord) => ({
+  op_id: op.op_id,
+  entity: op.entity,
+  action: op.action,
+  record_id: op.record_id,
+  payload: op.payload,
+});
+
+async function* readLines(response: Response) {
+  if (!response.body) {
+    yield* (await response.text()).split('\n').filter((line) => line.trim());
+    return;
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split('\n');
+    buffered = lines.pop() ?? '';
+    yield* lines.filter((line) => line.trim());
+    if (done) {
+      break;
+    }
+  }
+  if (buffered.trim()) {
+    yield buffered;
+  }
+}
+
+// Each ack line settles its own slice of the outbox as soon as it arrives, so a
+// dropped connection only leaves the unacked tail queued for the next sync.
+// `pushed` counts the settled ops, which is fewer than `ops` after a 422 stop.
+const pushOutboxStream = async (
+  db: WildlingsDb,
+  ops: SyncQueueRecord[],
+  deviceId: string,
+  options: SyncOptions,
+) => {
+  const fetcher = options.fetcher ?? fetch;
+  const now = options.now ?? nowIso;
+  const opIds = ops.map((op) => op.op_id);
+  const lines = [
+    JSON.stringify({ device_id: deviceId, client_time: now() }),
+    ...ops.map((op) => JSON.stringify(toSyncOp(op))),
+  ];
+
+  let settled = 0;
+  let last: SyncPushResponse | null = null;
+  let end: SyncPushStreamEnd | null = null;
+  try {
+    const response = await fetcher(resolveUrl(options.baseUrl, '/sync/push/stream'), {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/x-ndjson' },
+      body: `${lines.join('\n')}\n`,
+    });
+    if (!response.ok) {
+      throw httpError('Push', response);
+    }
+
+    for await (const line of readLines(response)) {
+      const message: unknown = JSON.parse(line);
+      if (typeof message === 'object' && message !== null && 'done' in message) {
+        end = syncPushStreamEndSchema.parse(message);
+        break;
+      }
+      const chunk = syncPushStreamChunkSchema.parse(message);
+      await applyPushResponse(db, chunk, opIds.slice(settled, settled + chunk.ops));
+      settled += chunk.ops;
+      last = chunk;
+    }
+
+    // A rejected chunk is reported like a rejected /sync/push batch; the ops
+    // after it were never tried and simply stay queued.
+    if (!end?.complete && end?.error?.status !== 422) {
+      const error = end?.error;
+      throw new SyncHttpError(
+        `Push stream stopped: ${error?.detail ?? 'connection closed'}`,
+        error?.status ?? 0,
+        error?.retry_after ? error.retry_after * 1000 : null,
+      );
+    }
+  } catch (error) {
+    const message = error instanceof Error ? error.message : 'Push failed';
+    await recordOpFailure(db, opIds.slice(settled), message);
+    throw error;
+  }
+
+  return {
+    pushed: settled,
+    serverTime: last?.server_time ?? null,
+    nextCursor: last?.next_cursor ?? null,
+  };
+};
+
 export const pushOutbox = async (db: WildlingsDb, options: SyncOptions = {}) => {
   const fetcher = options.fetcher ?? fetch;
   const now = options.now ?? nowIso;
   const batchSize = options.batchSize ?? DEFAULT_BATCH_SIZE;
+  const streamPushLimit = options.streamPushLimit ?? 0;
 
-  const ops = await db.sync_queue.orderBy('created_at_local').limit(batchSize).toArray();
+  const ops = await db.sync_queue
+    .orderBy('created_at_local')
+    .limit(Math.max(batchSize, streamPushLimit))
+    .toArray();
   if (ops.length === 0) {
     return { pushed: 0, serverTime: null, nextCursor: null };
   }
 
   const deviceId = await getOrCreateDeviceId(db);
+  if (ops.length > batchSize) {
+    return pushOutboxStream(db, ops, deviceId, options);
+  }
+
   const payload = {
     device_id: deviceId,
     client_time: now(),
-    ops: ops.map((op) => ({
-      op_id: op.op_id,
-      entity: op.entity,
-      action: op.action,
-      record_id: op.record_id,
-      payload: op.payload,
-    })),
+    ops: ops.map(toSyncOp),
   };
 
   const opIds = ops.map((op) => op.op_id);
@@ -159,7 +298,7 @@ export const pushOutbox = async (db: WildlingsDb, options: SyncOptions = {}) =>
     });
 
     if (!response.ok) {
-      throw new Error(`Push failed with status ${response.status}`);
+      throw httpError('Push', response);
     }
 
     const data = syncPushResponseSchema.parse(await response.json());
@@ -213,20 +352,96 @@ const upsertServerLog = async (db: WildlingsDb, log: SyncPullLog, editingLogId:
   return true;
 };
 
-export const pullChanges = async (db: WildlingsDb, options: SyncOptions = {}) => {
+const resolveBase = (options: SyncOptions) =>
+  options.baseUrl ??
+  (typeof window !== 'undefined' ? window.location.origin : 'http://localhost');
+
+const applyServerLogs = async (
+  db: WildlingsDb,
+  logs: SyncPullLog[],
+  editingLogId: string | null,
+) => {
+  await db.transaction('rw', db.logs, db.sync_queue, async () => {
+    for (const log of logs) {
+      await upsertServerLog(db, log, editingLogId);
+    }
+  });
+};
+
+const pullPartition = async (
+  db: WildlingsDb,
+  fetcher: typeof fetch,
+  base: string,
+  partition: SyncPullPlan['partitions'][number],
+  editingLogId: string | null,
+) => {
+  let cursor = partition.cursor;
+  let pulled = 0;
+  for (;;) {
+    const url = new URL('/sync/pull', base);
+    if (cursor) {
+      url.searchParams.set('cursor', cursor);
+    }
+    url.searchParams.set('until', partition.until);
+    url.searchParams.set('limit', String(BOOTSTRAP_PAGE_SIZE));
+
+    const response = await fetcher(url.toString(), { method: 'GET' });
+    if (!response.ok) {
+      throw httpError('Pull', response);
+    }
+    const data = syncPullResponseSchema.parse(await response.json());
+    if (data.changes.logs.length === 0) {
+      return pulled;
+    }
+    await applyServerLogs(db, data.changes.logs, editingLogId);
+    pulled += data.changes.logs.length;
+    cursor = data.next_cursor;
+  }
+};
+
+// Initial sync: the server splits everything up to a snapshot into independent
+// ranges which are fetched concurrently; anything written meanwhile sorts after
+// the snapshot and arrives through the regular pull that follows.
+const bootstrapPull = async (db: WildlingsDb, options: SyncOptions, partitions: number) => {
   const fetcher = options.fetcher ?? fetch;
   const metadata = await getMetadata(db);
-  const base =
-    options.baseUrl ??
-    (typeof window !== 'undefined' ? window.location.origin : 'http://localhost');
-  const url = new URL('/sync/pull', base);
+  const base = resolveBase(options);
+  const url = new URL('/sync/pull/plan', base);
+  url.searchParams.set('partitions', String(partitions));
+
+  const response = await fetcher(url.toString(), { method: 'GET' });
+  if (!response.ok) {
+    throw httpError('Pull plan', response);
+  }
+  const plan = syncPullPlanSchema.parse(await response.json());
+
+  const counts = await Promise.all(
+    plan.partitions.map((partition) =>
+      pullPartition(db, fetcher, base, partition, metadata.editing_log_id),
+    ),
+  );
+  await db.metadata.update(metadata.id, { last_sync_cursor: plan.snapshot_cursor });
+  return counts.reduce((total, count) => total + count, 0);
+};
+
+export const pullChanges = async (db: WildlingsDb, options: SyncOptions = {}) => {
+  const fetcher = options.fetcher ?? fetch;
+  let metadata = await getMetadata(db);
+  let bootstrapped = 0;
+  const partitions = options.pullPartitions ?? 1;
+  if (!metadata.last_sync_cursor && partitions > 1) {
+    bootstrapped = await bootstrapPull(db, options, partitions);
+    metadata = await getMetadata(db);
+  }
+
+  const url = new URL('/sync/pull', resolveBase(options));
   if (metadata.last_sync_cursor) {
     url.searchParams.set('cursor', metadata.last_sync_cursor);
   }
 
   const response = await fetcher(url.toString(), { method: 'GET' });
   if (!response.ok) {
-    throw new Error(`Pull failed with status ${response.status}`);
+    throw httpError('Pull', response);
   }
 
   const data = syncPullResponseSchema.parse(await response.json());
@@ -238,7 +453,7 @@ export const pullChanges = async (db: WildlingsDb, options: SyncOptions = {}) =>
     await db.metadata.update(metadata.id, { last_sync_cursor: data.next_cursor });
   });
 
-  return { pulled: data.changes.logs.length, serverTime: data.server_time };
+  return { pulled: bootstrapped + data.changes.logs.length, serverTime: data.server_time };
 };
 
 export const syncOnce = async (
@@ -267,9 +482,14 @@ export const syncOnce = async (
       pulled: pullResult.pulled,
     };
   } catch (error) {
-    await touchSyncFailure(db, { nowIso: currentIso, random });
+    await touchSyncFailure(db, {
+      nowIso: currentIso,
+      random,
+      retryAfterMs: error instanceof SyncHttpError ? error.retryAfterMs : null,
+    });
     throw error;
   }
 };
 
+export { SyncHttpError };
 export type { SyncOutcome, SyncOptions };
@@ -63,6 +63,27 @@ const pushResponseSchema = z.object({
   next_cursor: z.string(),
 });
 
+const pushStreamChunkSchema = pushResponseSchema.extend({
+  chunk: z.number().int().positive(),
+  ops: z.number().int().nonnegative(),
+});
+
+const pushStreamEndSchema = z.object({
+  done: z.literal(true),
+  chunks: z.number().int().nonnegative(),
+  ops: z.number().int().nonnegative(),
+  acked: z.number().int().nonnegative(),
+  complete: z.boolean(),
+  error: z
+    .object({
+      status: z.number().int(),
+      detail: z.string(),
+      line: z.number().int().nullable().optional(),
+      retry_after: z.number().int().nullable().optional(),
+    })
+    .nullable(),
+});
+
 const pullLogSchema = z.object({
   id: z.string().uuid(),
   start_at: isoInstant,
@@ -80,17 +101,36 @@ const pullResponseSchema = z.object({
   }),
 });
 
+const pullPlanSchema = z.object({
+  server_time: isoInstant,
+  snapshot_cursor: z.string(),
+  total: z.number().int().nonnegative(),
+  partitions: z.array(
+    z.object({
+      cursor: z.string().nullable(),
+      until: z.string(),
+      count: z.number().int().nonnegative(),
+    }),
+  ),
+});
+
 export type SyncPushRequest = z.infer<typeof pushRequestSchema>;
 export type SyncPushResponse = z.infer<typeof pushResponseSchema>;
+export type SyncPushStreamChunk = z.infer<typeof pushStreamChunkSchema>;
+export type SyncPushStreamEnd = z.infer<typeof pushStreamEndSchema>;
 export type SyncPullResponse = z.infer<typeof pullResponseSchema>;
 export type SyncOp = z.infer<typeof syncOpSchema>;
 export type SyncPullLog = z.infer<typeof pullLogSchema>;
+export type SyncPullPlan = z.infer<typeof pullPlanSchema>;
 
 export {
   logPayloadSchema,
   pushRequestSchema as syncPushRequestSchema,
   pushResponseSchema as syncPushResponseSchema,
+  pushStreamChunkSchema as syncPushStreamChunkSchema,
+  pushStreamEndSchema as syncPushStreamEndSchema,
   pullResponseSchema as syncPullResponseSchema,
+  pullPlanSchema as syncPullPlanSchema,
   syncOpSchema,
   pullLogSchema,
 };
@@ -16,11 +16,15 @@ type UseSyncResult = {
 };
 
 const DEFAULT_DEBOUNCE_MS = 1500;
+const DEFAULT_PULL_PARTITIONS = 4;
+const DEFAULT_STREAM_PUSH_LIMIT = 20000;
 
 export const useSync = (db: WildlingsDb, options: UseSyncOptions = {}): UseSyncResult => {
   const [isSyncing, setIsSyncing] = useState(false);
   const [lastError, setLastError] = useState<string | null>(null);
   const { baseUrl, fetcher, now, random, batchSize, debounceMs, syncFn } = options;
+  const pullPartitions = options.pullPartitions ?? DEFAULT_PULL_PARTITIONS;
+  const streamPushLimit = options.streamPushLimit ?? DEFAULT_STREAM_PUSH_LIMIT;
   const resolvedDebounceMs = debounceMs ?? DEFAULT_DEBOUNCE_MS;
   const resolvedSyncFn = syncFn ?? syncOnce;
   const timerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
@@ -34,7 +38,15 @@ export const useSync = (db: WildlingsDb, options: UseSyncOptions = {}): UseSyncR
     setIsSyncing(true);
 
     try {
-      await resolvedSyncFn(db, { baseUrl, fetcher, now, random, batchSize });
+      await resolvedSyncFn(db, {
+        baseUrl,
+        fetcher,
+        now,
+        random,
+        batchSize,
+        pullPartitions,
+        streamPushLimit,
+      });
       setLastError(null);
     } catch (error) {
       const message = error instanceof Error ? error.message : 'Sync failed';
@@ -43,7 +55,17 @@ export const useSync = (db: WildlingsDb, options: UseSyncOptions = {}): UseSyncR
       syncingRef.current = false;
       setIsSyncing(false);
     }
-  }, [db, resolvedSyncFn, baseUrl, fetcher, now, random, batchSize]);
+  }, [
+    db,
+    resolvedSyncFn,
+    baseUrl,
+    fetcher,
+    now,
+    random,
+    batchSize,
+    pullPartitions,
+    streamPushLimit,
+  ]);
 
   const scheduleSync = useCallback(() => {
     if (timerRef.current) {
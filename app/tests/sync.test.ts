@@ -3,8 +3,8 @@ import { randomUUID } from 'node:crypto';
 import { setupServer } from 'msw/node';
 import { http, HttpResponse } from 'msw';
 import { createDb, getMetadata, setEditingLogId, upsertLogWithOutbox } from '../src/db/db';
-import type { LogRecord } from '../src/db/db';
-import { pullChanges, syncOnce } from '../src/db/sync';
+import type { LogRecord, SyncQueueRecord } from '../src/db/db';
+import { pullChanges, pushOutbox, syncOnce } from '../src/db/sync';
 
 const server = setupServer();
 
@@ -20,6 +20,35 @@ const makeLog = (overrides?: Partial<LogRecord>): LogRecord => ({
   ...overrides,
 });
 
+const ndjson = (...messages: unknown[]) =>
+  new HttpResponse(messages.map((message) => `${JSON.stringify(message)}\n`).join(''), {
+    headers: { 'Content-Type': 'application/x-ndjson' },
+  });
+
+const streamChunk = (
+  chunk: number,
+  acked: SyncQueueRecord[],
+  rejected: SyncQueueRecord[] = [],
+) => ({
+  chunk,
+  ops: acked.length + rejected.length,
+  server_time: '2026-01-01T12:00:01Z',
+  ack_op_ids: acked.map((op) => op.op_id),
+  rejected: rejected.map((op) => ({
+    op_id: op.op_id,
+    code: 'VALIDATION_ERROR',
+    message: 'end_at must be >= start_at',
+  })),
+  applied: {
+    logs: acked.map((op) => ({
+      id: op.record_id,
+      updated_at_server: '2026-01-01T12:00:01Z',
+      deleted_at_server: null,
+    })),
+  },
+  next_cursor: '2026-01-01T12:00:01Z',
+});
+
 describe('sync engine', () => {
   let dbName: string;
 
@@ -207,4 +236,175 @@ describe('sync engine', () => {
     expect(metadata.sync_backoff_ms).toBe(1000);
     expect(metadata.next_sync_at).toBe('2026-01-04T10:00:01.000Z');
   });
+
+  it('honours Retry-After when the server sheds load', async () => {
+    const db = createDb(dbName);
+
+    server.use(
+      http.get(
+        'http://localhost/sync/pull',
+        () =>
+          new HttpResponse('Server busy', {
+            status: 503,
+            headers: { 'Retry-After': '5' },
+          }),
+      ),
+    );
+
+    await expect(
+      syncOnce(db, {
+        baseUrl: 'http://localhost',
+        now: () => '2026-01-04T10:00:00.000Z',
+        random: () => 0,
+      }),
+    ).rejects.toThrow('Pull failed with status 503');
+
+    const metadata = await getMetadata(db);
+    expect(metadata.sync_backoff_ms).toBe(5000);
+    expect(metadata.next_sync_at).toBe('2026-01-04T10:00:05.000Z');
+  });
+
+  it('bootstraps an empty store from concurrently pulled partitions', async () => {
+    const db = createDb(dbName);
+    const serverLog = (id: string, at: string) => ({
+      id,
+      start_at: '2026-01-02T08:00:00Z',
+      end_at: null,
+      note: `Server ${id}`,
+      updated_at_server: at,
+      deleted_at_server: null,
+    });
+    const ranges: Record<string, ReturnType<typeof serverLog>[]> = {
+      'a|': [serverLog('a', '2026-01-01T00:00:01Z')],
+      'snapshot|z': [serverLog('b', '2026-01-01T00:00:02Z')],
+    };
+    const requested: string[] = [];
+
+    server.use(
+      http.get('http://localhost/sync/pull/plan', () =>
+        HttpResponse.json({
+          server_time: '2026-01-01T12:00:00Z',
+          snapshot_cursor: 'snapshot|z',
+          total: 2,
+          partitions: [
+            { cursor: null, until: 'a|', count: 1 },
+            { cursor: 'a|', until: 'snapshot|z', count: 1 },
+          ],
+        }),
+      ),
+      http.get('http://localhost/sync/pull', ({ request }) => {
+        const url = new URL(request.url);
+        const cursor = url.searchParams.get('cursor');
+        const until = url.searchParams.get('until');
+        requested.push(`${cursor ?? ''}..${until ?? ''}`);
+        const done = until === null || cursor === until;
+        return HttpResponse.json({
+          server_time: '2026-01-01T12:00:01Z',
+          next_cursor: done ? (cursor ?? 'end') : until,
+          changes: { logs: done ? [] : ranges[until] },
+        });
+      }),
+    );
+
+    const result = await pullChanges(db, { baseUrl: 'http://localhost', pullPartitions: 2 });
+
+    expect(result.pulled).toBe(2);
+    expect((await db.logs.get('a'))?.note).toBe('Server a');
+    expect((await db.logs.get('b'))?.note).toBe('Server b');
+    expect(requested).toContain('snapshot|z..');
+    const metadata = await getMetadata(db);
+    expect(metadata.last_sync_cursor).toBe('snapshot|z');
+  });
+
+  it('streams a long outbox and settles each acked chunk', async () => {
+    const db = createDb(dbName);
+    for (let index = 0; index < 3; index += 1) {
+      await upsertLogWithOutbox(db, makeLog({ note: `Queued ${index}` }));
+    }
+    const ops = await db.sync_queue.orderBy('created_at_local').toArray();
+    let receivedLines: string[] = [];
+
+    server.use(
+      http.post('http://localhost/sync/push/stream', async ({ request }) => {
+        receivedLines = (await request.text()).trim().split('\n');
+        return ndjson(streamChunk(1, ops.slice(0, 2)), {
+          done: true,
+          chunks: 1,
+          ops: 2,
+          acked: 2,
+          complete: false,
+          error: { status: 503, detail: 'Server busy, retry later', retry_after: 5 },
+        });
+      }),
+    );
+
+    await expect(
+      pushOutbox(db, { baseUrl: 'http://localhost', batchSize: 1, streamPushLimit: 10 }),
+    ).rejects.toThrow('Push stream stopped');
+
+    expect(receivedLines).toHaveLength(4);
+    expect(JSON.parse(receivedLines[1]).op_id).toBe(ops[0].op_id);
+    const remaining = await db.sync_queue.toArray();
+    expect(remaining.map((op) => op.op_id)).toEqual([ops[2].op_id]);
+    expect(remaining[0].attempts).toBe(1);
+    expect((await db.logs.get(ops[0].record_id))?.updated_at_server).toBe('2026-01-01T12:00:01Z');
+  });
+
+  it('stops a streamed push at a rejected chunk and keeps the rest queued', async () => {
+    const db = createDb(dbName);
+    for (let index = 0; index < 3; index += 1) {
+      await upsertLogWithOutbox(db, makeLog({ note: `Queued ${index}` }));
+    }
+    const ops = await db.sync_queue.orderBy('created_at_local').toArray();
+
+    server.use(
+      http.post('http://localhost/sync/push/stream', () =>
+        ndjson(streamChunk(1, [ops[0]], [ops[1]]), {
+          done: true,
+          chunks: 1,
+          ops: 2,
+          acked: 1,
+          complete: false,
+          error: { status: 422, detail: 'chunk 1 was rejected' },
+        }),
+      ),
+    );
+
+    const result = await pushOutbox(db, {
+      baseUrl: 'http://localhost',
+      batchSize: 1,
+      streamPushLimit: 10,
+    });
+
+    expect(result.pushed).toBe(2);
+    const remaining = await db.sync_queue.orderBy('created_at_local').toArray();
+    expect(remaining.map((op) => op.op_id)).toEqual([ops[1].op_id, ops[2].op_id]);
+    expect(remaining[0].last_error).toBe('end_at must be >= start_at');
+    // Never tried: the server stopped before reaching it.
+    expect(remaining[1].attempts).toBe(0);
+  });
+
+  it('keeps acked chunks when the stream ends without an end line', async () => {
+    const db = createDb(dbName);
+    for (let index = 0; index < 3; index += 1) {
+      await upsertLogWithOutbox(db, makeLog({ note: `Queued ${index}` }));
+    }
+    const ops = await db.sync_queue.orderBy('created_at_local').toArray();
+
+    server.use(
+      http.post('http://localhost/sync/push/stream', () =>
+        ndjson(streamChunk(1, ops.slice(0, 2))),
+      ),
+    );
+
+    await expect(
+      pushOutbox(db, { baseUrl: 'http://localhost', batchSize: 1, streamPushLimit: 10 }),
+    ).rejects.toThrow('Push stream stopped: connection closed');
+
+    const remaining = await db.sync_queue.toArray();
+    expect(remaining.map((op) => op.op_id)).toEqual([ops[2].op_id]);
+    expect(remaining[0].attempts).toBe(1);
+    expect(remaining[0].last_error).toBe('Push stream stopped: connection closed');
+    expect((await db.logs.get(ops[1].record_id))?.updated_at_server).toBe('2026-01-01T12:00:01Z');
+  });
 });